@@ -0,0 +1,78 @@
+"""
+API stress benchmark for AI Live Genie
+Drives the Flask app from many threads through test clients and reports
+request throughput and whether the stores stayed consistent.
+
+Usage:
+    python benchmarks/api_stress.py [--threads 16] [--requests 200] [--write-ratio 0.2]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ai_live_genie.api_server import app, close_memory_managers
+
+API_KEY = "bench-key"
+HEADERS = {"X-API-Key": API_KEY, "Content-Type": "application/json"}
+
+
+def worker(n: int, requests: int, write_ratio: float, errors: list):
+    client = app.test_client()
+    rng = random.Random(n)
+    for i in range(requests):
+        if rng.random() < write_ratio:
+            response = client.post("/api/memory/fact", headers=HEADERS,
+                                   json={"fact": f"Worker {n} fact {i}", "category": f"w{n}"})
+        else:
+            response = client.get("/api/memory/search?query=fact&top_k=10", headers=HEADERS)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the API from many threads")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--durability", choices=["sync", "deferred"], default="deferred")
+    args = parser.parse_args()
+
+    os.environ["AI_GENIE_API_KEY"] = API_KEY
+    data_dir = tempfile.mkdtemp(prefix="genie-stress-")
+    app.config.update(DATA_DIR=data_dir, MEMORY_DURABILITY=args.durability)
+    errors: list = []
+    try:
+        threads = [threading.Thread(target=worker,
+                                    args=(n, args.requests, args.write_ratio, errors))
+                   for n in range(args.threads)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        total = args.threads * args.requests
+        facts = app.memory_manager.long_term.retrieve_facts()
+        close_memory_managers()
+        with open(os.path.join(data_dir, "long_term_memory.json")) as f:
+            on_disk = len(json.load(f)["facts"])
+        print(f"{total} requests from {args.threads} threads in {elapsed:.2f}s "
+              f"({total / elapsed:.0f} req/s)")
+        print(f"errors: {len(errors)}, facts in memory: {len(facts)}, on disk: {on_disk}, "
+              f"unique ids: {len({fact['id'] for fact in facts}) == len(facts)}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Conversation buffer benchmark for AI Live Genie
+Times ``ConversationalMemory.add_message`` at steady state (history full)
+against the previous list that was re-sliced on every add, and reads of the
+newest messages with ``get_history(last_n=...)``. Also times choosing a
+500-token window with ``get_history(max_tokens=500)`` against fetching the
+whole history and re-tokenizing it from the newest message, as clients did.
+
+Usage:
+    python benchmarks/conversation_buffer.py [--messages 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ai_live_genie import ConversationalMemory
+from ai_live_genie.locking import ReadWriteLock
+from ai_live_genie.records import MessageRecord
+from ai_live_genie.tokens import estimate_tokens
+
+TOKEN_BUDGET = 500
+
+
+def sliced_list_adds(max_history: int, count: int) -> float:
+    """Time the previous append-then-slice history; returns seconds."""
+    history = []
+    lock = ReadWriteLock()
+    start = time.perf_counter()
+    for i in range(count):
+        with lock.write_lock:
+            history.append(MessageRecord(i, "user", "Message", time.time()))
+            if len(history) > max_history:
+                history = history[-max_history:]
+    return time.perf_counter() - start
+
+
+def ring_buffer_adds(max_history: int, count: int) -> float:
+    """Time adds to ConversationalMemory; returns seconds."""
+    memory = ConversationalMemory(max_history=max_history)
+    start = time.perf_counter()
+    for _ in range(count):
+        memory.add_message("user", "Message")
+    return time.perf_counter() - start
+
+
+def rescan_window(memory: ConversationalMemory, max_tokens: int):
+    """Fetch the whole history and keep the newest messages that fit ``max_tokens``."""
+    history = memory.get_history()
+    used = 0
+    for i in range(len(history) - 1, -1, -1):
+        used += estimate_tokens(history[i]["content"])
+        if used > max_tokens:
+            return history[i + 1:]
+    return history
+
+
+def time_reads(fn, runs: int = 1000) -> float:
+    """Return the mean time of ``fn()`` in microseconds."""
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare conversation history buffers")
+    parser.add_argument("--messages", type=int, default=100000, help="Messages added per run")
+    args = parser.parse_args()
+
+    print(f"{'max_history':>12}{'sliced us/add':>16}{'ring us/add':>14}{'last 10 us':>12}"
+          f"{'tokens us':>11}{'rescan us':>11}")
+    for max_history in (50, 1000, 10000):
+        sliced = sliced_list_adds(max_history, args.messages) / args.messages * 1e6
+        ring = ring_buffer_adds(max_history, args.messages) / args.messages * 1e6
+        memory = ConversationalMemory(max_history=max_history)
+        for _ in range(max_history):
+            memory.add_message("user", "Message")
+        read = time_reads(lambda: memory.get_history(last_n=10))
+        window = time_reads(lambda: memory.get_history(max_tokens=TOKEN_BUDGET))
+        rescan = time_reads(lambda: rescan_window(memory, TOKEN_BUDGET), runs=100)
+        print(f"{max_history:>12}{sliced:>16.2f}{ring:>14.2f}{read:>12.2f}"
+              f"{window:>11.1f}{rescan:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
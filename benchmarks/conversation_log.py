@@ -0,0 +1,69 @@
+"""
+Conversation log benchmark for AI Live Genie
+Times restoring a ``ConversationalMemory`` from its log, which reads only the
+newest ``max_history`` lines, against decoding the whole log, for logs of
+growing length. Also times ``add_message`` with and without a log.
+
+Usage:
+    python benchmarks/conversation_log.py [--max-history 50] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ai_live_genie import ConversationalMemory, codec
+from ai_live_genie.records import MessageRecord, json_default
+
+sys.path.insert(0, os.path.dirname(__file__))
+from json_codec import best_of
+
+
+def write_log(path: str, count: int):
+    """Write a log of ``count`` messages, as if it had never been truncated."""
+    now = time.time()
+    with open(path, 'wb') as f:
+        for i in range(1, count + 1):
+            message = MessageRecord(i, "user" if i % 2 else "assistant",
+                                    f"Message {i} about tonight's stream schedule", now + i)
+            f.write(codec.dumps(message, default=json_default) + b"\n")
+
+
+def full_replay(path: str, max_history: int):
+    """Decode every line of the log and keep the newest ``max_history``."""
+    with open(path, 'rb') as f:
+        messages = [MessageRecord.from_dict(codec.loads(line)) for line in f]
+    return messages[-max_history:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time conversation log restores")
+    parser.add_argument("--max-history", type=int, default=50, help="Messages kept per session")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.log")
+        print(f"{'Log lines':>10}{'tail ms':>10}{'full ms':>10}")
+        for count in (1000, 100000, 1000000):
+            write_log(path, count)
+            tail_ms = best_of(args.repeat, lambda: ConversationalMemory(
+                args.max_history, log_path=path))
+            full_ms = best_of(1, lambda: full_replay(path, args.max_history))
+            print(f"{count:>10}{tail_ms:>10.2f}{full_ms:>10.1f}")
+
+        os.remove(path)
+        logged = ConversationalMemory(args.max_history, log_path=path)
+        plain = ConversationalMemory(args.max_history)
+        for label, memory in (("in memory", plain), ("logged", logged)):
+            ms = best_of(args.repeat, lambda: [memory.add_message("user", "Hello chat")
+                                               for _ in range(1000)])
+            print(f"add_message {label}: {ms:.1f} us/add")
+
+
+if __name__ == "__main__":
+    main()
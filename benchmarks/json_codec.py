@@ -0,0 +1,68 @@
+"""
+JSON codec benchmark for AI Live Genie
+Times saving and loading a long-term memory store of realistic size with each
+installed codec in ``codec.py``, against the previous stdlib ``indent=2``
+output.
+
+Usage:
+    python benchmarks/json_codec.py [--facts 1000 10000 100000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ai_live_genie.codec import CODECS
+from ai_live_genie.records import FactRecord, json_default
+
+CATEGORIES = ["general", "schedule", "chat", "platform"]
+
+
+def build_store(count: int):
+    """Return a store shaped like LongTermMemory.memory with ``count`` facts."""
+    now = time.time()
+    facts = [FactRecord(i, f"Fact number {i}: streams {CATEGORIES[i % 4]} content on Fridays",
+                        CATEGORIES[i % 4], now + i) for i in range(1, count + 1)]
+    entities = {f"channel_{i}": {"data": {"platform": "YouTube", "subscribers": i * 10},
+                                 "timestamp": "2025-10-23T12:00:00"}
+                for i in range(count // 10)}
+    preferences = {f"pref_{i}": {"value": i, "timestamp": "2025-10-23T12:00:00"}
+                   for i in range(100)}
+    return {"facts": facts, "preferences": preferences, "entities": entities}
+
+
+def best_of(repeat: int, fn):
+    """Return the fastest of ``repeat`` timed calls, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON codecs on store snapshots")
+    parser.add_argument("--facts", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Store sizes to measure")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    variants = [("json indent=2", CODECS["json"], True)]
+    variants += [(name, codec, False) for name, codec in CODECS.items()]
+    print(f"{'Facts':>8}  {'Codec':<14}{'dump ms':>10}{'load ms':>10}{'size KB':>10}")
+    for count in args.facts:
+        store = build_store(count)
+        for label, codec, indent in variants:
+            data = codec.dumps(store, json_default, indent)
+            dump_ms = best_of(args.repeat, lambda: codec.dumps(store, json_default, indent))
+            load_ms = best_of(args.repeat, lambda: codec.loads(data))
+            print(f"{count:>8}  {label:<14}{dump_ms:>10.1f}{load_ms:>10.1f}"
+                  f"{len(data) / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Record memory benchmark for AI Live Genie
+Compares the heap used by facts, messages and goals held as plain dicts with
+ISO-8601 timestamps against the slotted record types in ``records.py``.
+
+Usage:
+    python benchmarks/record_memory.py [--count 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ai_live_genie.records import FactRecord, GoalRecord, MessageRecord
+
+CATEGORIES = ["general", "schedule", "chat", "platform"]
+ROLES = ["user", "assistant"]
+
+
+def fact_dict(i: int, now: float):
+    return {"id": i, "content": f"Fact number {i}", "category": CATEGORIES[i % 4],
+            "timestamp": datetime.fromtimestamp(now + i).isoformat()}
+
+
+def fact_record(i: int, now: float):
+    return FactRecord(i, f"Fact number {i}", CATEGORIES[i % 4], now + i)
+
+
+def message_dict(i: int, now: float):
+    return {"id": i, "role": ROLES[i % 2], "content": f"Message {i}",
+            "timestamp": datetime.fromtimestamp(now + i).isoformat(), "metadata": {}}
+
+
+def message_record(i: int, now: float):
+    return MessageRecord(i, ROLES[i % 2], f"Message {i}", now + i)
+
+
+def goal_dict(i: int, now: float):
+    return {"id": i, "title": f"Goal {i}", "description": "Grow the channel",
+            "priority": "medium", "target_date": None, "status": "active", "progress": 0,
+            "created_at": datetime.fromtimestamp(now + i).isoformat(), "milestones": []}
+
+
+def goal_record(i: int, now: float):
+    return GoalRecord(i, f"Goal {i}", "Grow the channel", created_at=now + i)
+
+
+def measure(make, count: int) -> int:
+    """Return the bytes allocated while holding ``count`` records."""
+    now = time.time()
+    tracemalloc.start()
+    records = [make(i, now) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-record memory")
+    parser.add_argument("--count", type=int, default=100000, help="Records per type")
+    args = parser.parse_args()
+    scale = 1_000_000 / args.count
+
+    print(f"{'Type':<10}{'dict MB/1M':>14}{'record MB/1M':>16}{'saved MB/1M':>15}")
+    for name, as_dict, as_record in (("fact", fact_dict, fact_record),
+                                     ("message", message_dict, message_record),
+                                     ("goal", goal_dict, goal_record)):
+        dict_mb = measure(as_dict, args.count) * scale / 1e6
+        record_mb = measure(as_record, args.count) * scale / 1e6
+        print(f"{name:<10}{dict_mb:>14.1f}{record_mb:>16.1f}{dict_mb - record_mb:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Segment format benchmark for AI Live Genie
+Compares the binary segment format in ``segments.py`` with JSON store files:
+file size, time to load the whole store, and time to open the file and read
+one fact by id or one category.
+
+Usage:
+    python benchmarks/segment_format.py [--facts 100000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ai_live_genie import codec
+from ai_live_genie.records import json_default
+from ai_live_genie.segments import SegmentReader, encode_segment
+
+from json_codec import CATEGORIES, best_of, build_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare segment and JSON store files")
+    parser.add_argument("--facts", type=int, default=100000, help="Facts in the store")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    store = build_store(args.facts)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"json indent=2": os.path.join(tmp, "indented.json"),
+                 "json": os.path.join(tmp, "compact.json"),
+                 "segment": os.path.join(tmp, "memory.seg")}
+        with open(paths["json indent=2"], 'wb') as f:
+            f.write(codec.dumps(store, json_default, indent=True))
+        with open(paths["json"], 'wb') as f:
+            f.write(codec.dumps(store, json_default))
+        with open(paths["segment"], 'wb') as f:
+            f.write(encode_segment(store, json_default))
+
+        ids = [random.randint(1, args.facts) for _ in range(100)]
+
+        def read_segment():
+            with SegmentReader(paths["segment"]) as reader:
+                return reader.to_dict()
+
+        def segment_get():
+            with SegmentReader(paths["segment"]) as reader:
+                for fact_id in ids:
+                    reader.get("facts", fact_id)
+
+        def segment_category():
+            with SegmentReader(paths["segment"]) as reader:
+                return list(reader.by_category("facts", CATEGORIES[0]))
+
+        print(f"{args.facts} facts, codec {codec.active_codec().name}")
+        print(f"{'Format':<16}{'size KB':>10}{'load all ms':>14}")
+        for label, path in paths.items():
+            if label == "segment":
+                load_ms = best_of(args.repeat, read_segment)
+            else:
+                load_ms = best_of(args.repeat, lambda: codec.load_file(path))
+            print(f"{label:<16}{os.path.getsize(path) / 1024:>10.0f}{load_ms:>14.1f}")
+        print(f"segment open + 100 reads by id: {best_of(args.repeat, segment_get):.2f} ms")
+        print(f"segment open + one category:    {best_of(args.repeat, segment_category):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
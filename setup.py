@@ -38,11 +38,17 @@ setup(
     install_requires=[],
     extras_require={
         "api": [
-            "Flask>=2.0.0",
+            "Flask>=2.2.0",
             "Flask-CORS>=3.0.0",
         ],
+        "vector": [
+            "numpy>=1.17.0",
+        ],
+        "fast-json": [
+            "orjson>=3.6.0",
+        ],
         "dev": [
-            "Flask>=2.0.0",
+            "Flask>=2.2.0",
             "Flask-CORS>=3.0.0",
             "black>=22.0.0",
             "pylint>=2.12.0",
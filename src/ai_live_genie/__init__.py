@@ -9,16 +9,25 @@ __license__ = "MIT"
 
 from .memory_manager import (
     ConversationalMemory,
+    ConversationSessions,
     LongTermMemory,
     GoalsManager,
     MemoryManager
 )
+from .retention import RetentionPolicy
+from .sharded_storage import ShardedLongTermMemory
+from .sqlite_storage import SQLiteLongTermMemory, SQLiteGoalsManager
 from .streaming_data import StreamingPlatformData
 
 __all__ = [
     "ConversationalMemory",
+    "ConversationSessions",
     "LongTermMemory",
     "GoalsManager",
     "MemoryManager",
+    "RetentionPolicy",
+    "ShardedLongTermMemory",
+    "SQLiteLongTermMemory",
+    "SQLiteGoalsManager",
     "StreamingPlatformData",
 ]
@@ -3,26 +3,139 @@ REST API Server for AI Live Genie
 Provides HTTP endpoints for memory management and streaming data access.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, has_request_context, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from functools import wraps
 import os
-from .memory_manager import MemoryManager
+import threading
+from . import codec
+from .memory_manager import MemoryManager, validate_session_id
+from .records import (
+    ndjson_lines,
+    normalize_entity_item,
+    normalize_fact_item,
+    normalize_preference_item,
+)
 from .streaming_data import StreamingPlatformData
+from .tenants import TenantPool, validate_tenant_id
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by the fastest installed codec.
+    
+    Responses are compact and keep the key order of the returned dicts;
+    values the codec cannot encode fall back to Flask's default conversions.
+    """
+    
+    def dumps(self, obj, **kwargs):
+        return codec.dumps(obj, default=self.default).decode("utf-8")
+    
+    def loads(self, s, **kwargs):
+        return codec.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(codec.dumps(obj, default=self.default) + b"\n",
+                                        mimetype=self.mimetype)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
 CORS(app)  # Enable CORS for cross-origin requests
 
+# Guards lazy creation of the shared managers when first requests arrive together
+_init_lock = threading.Lock()
+
 # Initialize memory and streaming data systems
 # Use a factory pattern to allow for testing with different data directories
+def create_memory_manager(data_dir):
+    """Create a memory manager for ``data_dir`` from the app config."""
+    backend = app.config.get('MEMORY_BACKEND', 'json')
+    # Append each long-term write to a log instead of rewriting the whole json store
+    journal = app.config.get('MEMORY_JOURNAL', False)
+    # "deferred" acknowledges writes from memory and group-commits them to disk
+    durability = app.config.get('MEMORY_DURABILITY', 'sync')
+    dedup = app.config.get('MEMORY_DEDUP', False)
+    # {category: {"max_age": ..., "max_count": ..., "ttl": ...}}; "*" matches any category
+    retention = app.config.get('MEMORY_RETENTION')
+    retention_interval = app.config.get('MEMORY_RETENTION_INTERVAL')
+    # Semantic search needs the optional NumPy dependency
+    vector = app.config.get('MEMORY_VECTOR', False)
+    # Set when several worker processes serve the same data directory
+    shared = app.config.get('MEMORY_SHARED', False)
+    # "segment" stores the json backend's files in the binary segment format
+    file_format = app.config.get('MEMORY_FORMAT', 'json')
+    # Budget shared by all conversation sessions; idle sessions are evicted beyond it
+    session_max_messages = app.config.get('MEMORY_SESSION_MAX_MESSAGES', 1_000_000)
+    session_max_bytes = app.config.get('MEMORY_SESSION_MAX_BYTES', 256 * 1024 * 1024)
+    # Log each session's messages under DATA_DIR/conversations so history survives restarts
+    conversation_log = app.config.get('MEMORY_CONVERSATION_LOG', False)
+    # Callable counting tokens in a message for max_tokens; None uses the built-in estimate
+    tokenizer = app.config.get('MEMORY_TOKENIZER')
+    return MemoryManager(data_dir=data_dir, journal=journal, backend=backend,
+                         durability=durability,
+                         dedup=dedup, retention=retention,
+                         retention_interval=retention_interval, vector=vector,
+                         shared=shared, file_format=file_format,
+                         session_max_messages=session_max_messages,
+                         session_max_bytes=session_max_bytes,
+                         conversation_log=conversation_log, tokenizer=tokenizer)
+
+def get_tenant_pool():
+    """Get or create the pool of per-tenant memory managers."""
+    if not hasattr(app, 'tenant_pool'):
+        with _init_lock:
+            if not hasattr(app, 'tenant_pool'):
+                tenants_dir = os.path.join(app.config.get('DATA_DIR', './data'), 'tenants')
+                # Idle tenants beyond this many are unloaded, least recently used first
+                max_tenants = app.config.get('MEMORY_MAX_TENANTS', 100)
+                # Conversation budget shared by loaded tenants; idle ones are unloaded beyond it
+                max_messages = app.config.get('MEMORY_TENANTS_MAX_MESSAGES', 1_000_000)
+                max_bytes = app.config.get('MEMORY_TENANTS_MAX_BYTES', 256 * 1024 * 1024)
+                def factory(tenant_id):
+                    return create_memory_manager(os.path.join(tenants_dir, tenant_id))
+                app.tenant_pool = TenantPool(factory, max_tenants=max_tenants,
+                                             max_messages=max_messages, max_bytes=max_bytes)
+    return app.tenant_pool
+
 def get_memory_manager():
-    """Get or create memory manager instance."""
+    """Get the memory manager for the current request's tenant.
+    
+    Requests carrying an ``X-Tenant-ID`` header use that tenant's manager from
+    the tenant pool for the rest of the request; other requests share the
+    default manager.
+    """
+    tenant_id = request.headers.get('X-Tenant-ID') if has_request_context() else None
+    if tenant_id:
+        if 'memory_manager' not in g:
+            g.memory_manager = get_tenant_pool().acquire(tenant_id)
+            g.tenant_id = tenant_id
+        return g.memory_manager
     if not hasattr(app, 'memory_manager'):
-        data_dir = app.config.get('DATA_DIR', './data')
-        app.memory_manager = MemoryManager(data_dir=data_dir)
+        with _init_lock:
+            if not hasattr(app, 'memory_manager'):
+                memory_manager = create_memory_manager(app.config.get('DATA_DIR', './data'))
+                # Warm the stores in the background instead of on the first request
+                if app.config.get('MEMORY_PREFETCH', False):
+                    memory_manager.prefetch()
+                app.memory_manager = memory_manager
     return app.memory_manager
 
+@app.teardown_request
+def release_tenant(exc=None):
+    """Return the request's tenant manager to the pool."""
+    tenant_id = g.pop('tenant_id', None)
+    if tenant_id is not None:
+        g.pop('memory_manager', None)
+        get_tenant_pool().release(tenant_id)
+
+def close_memory_managers():
+    """Flush and close the default manager and every pooled tenant."""
+    if hasattr(app, 'memory_manager'):
+        app.memory_manager.close()
+    if hasattr(app, 'tenant_pool'):
+        app.tenant_pool.close()
+
 def get_streaming_data():
     """Get or create streaming data instance."""
     if not hasattr(app, 'streaming_data'):
@@ -39,10 +152,105 @@ def require_api_key(f):
         api_key = request.headers.get('X-API-Key') or request.args.get('api_key')
         if not api_key or api_key != api_key_expected:
             return jsonify({"error": "Invalid or missing API key"}), 401
+        tenant_id = request.headers.get('X-Tenant-ID')
+        if tenant_id:
+            try:
+                validate_tenant_id(tenant_id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
         return f(*args, **kwargs)
     return decorated_function
 
 
+def get_bulk_items():
+    """Parse a bulk request body given as a JSON array or as NDJSON lines.
+    
+    Returns None when the body is not a list of items. Unparseable NDJSON
+    lines are kept as None items so they are reported individually.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonlines'):
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(codec.loads(line))
+            except ValueError:
+                items.append(None)
+        return items
+    data = request.get_json(silent=True)
+    return data if isinstance(data, list) else None
+
+
+def get_json_object():
+    """Return the JSON request body, raising ValueError unless it is an object."""
+    data = request.get_json()
+    if not isinstance(data, dict):
+        raise ValueError("Body must be a JSON object")
+    return data
+
+
+def get_session_id(data=None):
+    """Read the conversation ``session_id`` from the JSON body or the query string.
+    
+    Returns None for the default session. Raises ValueError for a malformed id.
+    """
+    session_id = (data or {}).get('session_id') or request.args.get('session_id')
+    return validate_session_id(session_id) if session_id is not None else None
+
+
+def get_max_tokens():
+    """Read the ``max_tokens`` query parameter; None when it is not given.
+    
+    Raises ValueError unless it is a non-negative integer.
+    """
+    if 'max_tokens' not in request.args:
+        return None
+    try:
+        max_tokens = int(request.args['max_tokens'])
+    except ValueError:
+        raise ValueError("max_tokens must be a non-negative integer") from None
+    if max_tokens < 0:
+        raise ValueError("max_tokens must be a non-negative integer")
+    return max_tokens
+
+
+# Page sizes for cursor-paginated list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+
+def get_page_args():
+    """Read the ``limit`` and ``cursor`` query parameters.
+    
+    Returns None when neither is given, so list endpoints keep returning the
+    full list to clients that do not paginate. Raises ValueError for a bad
+    ``limit``.
+    """
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return None
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be a positive integer") from None
+    if limit <= 0:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, MAX_PAGE_SIZE), request.args.get('cursor')
+
+
+def bulk_response(results):
+    """Summarize per-item bulk results."""
+    stored = sum(1 for result in results if result["status"] == "stored")
+    duplicates = sum(1 for result in results if result["status"] == "duplicate")
+    return jsonify({
+        "status": "success",
+        "stored": stored,
+        "duplicates": duplicates,
+        "failed": len(results) - stored - duplicates,
+        "results": results
+    })
+
+
 # Health check endpoint
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -64,8 +272,13 @@ def add_conversation_message():
     if not role or not content:
         return jsonify({"error": "Role and content are required"}), 400
     
+    try:
+        session_id = get_session_id(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     memory_manager = get_memory_manager()
-    memory_manager.conversational.add_message(role, content, metadata)
+    memory_manager.conversational.session(session_id).add_message(role, content, metadata)
     return jsonify({"status": "success", "message": "Message added"})
 
 
@@ -80,8 +293,13 @@ def process_interaction():
     if not user_input or not assistant_response:
         return jsonify({"error": "Both user_input and assistant_response are required"}), 400
     
+    try:
+        session_id = get_session_id(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     memory_manager = get_memory_manager()
-    memory_manager.process_interaction(user_input, assistant_response)
+    memory_manager.process_interaction(user_input, assistant_response, session_id)
     return jsonify({"status": "success", "message": "Interaction processed"})
 
 
@@ -89,9 +307,19 @@ def process_interaction():
 @require_api_key
 def get_conversation_history():
     """Get conversation history."""
-    last_n = request.args.get('last_n', type=int)
     memory_manager = get_memory_manager()
-    history = memory_manager.conversational.get_history(last_n=last_n)
+    try:
+        session = memory_manager.conversational.session(get_session_id())
+        page_args = get_page_args()
+        if page_args:
+            history, next_cursor = session.page_history(*page_args)
+            return jsonify({"history": history, "next_cursor": next_cursor})
+        max_tokens = get_max_tokens()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    last_n = request.args.get('last_n', type=int)
+    history = session.get_history(last_n=last_n, max_tokens=max_tokens)
     return jsonify({"history": history})
 
 
@@ -99,8 +327,12 @@ def get_conversation_history():
 @require_api_key
 def get_conversation_summary():
     """Get conversation context summary."""
+    try:
+        session_id = get_session_id()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     memory_manager = get_memory_manager()
-    summary = memory_manager.conversational.get_context_summary()
+    summary = memory_manager.conversational.session(session_id).get_context_summary()
     return jsonify({"summary": summary})
 
 
@@ -108,55 +340,107 @@ def get_conversation_summary():
 @require_api_key
 def clear_conversation():
     """Clear conversation history."""
+    try:
+        session_id = get_session_id(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     memory_manager = get_memory_manager()
-    memory_manager.conversational.clear()
+    memory_manager.conversational.session(session_id).clear()
     return jsonify({"status": "success", "message": "Conversation history cleared"})
 
 
+@app.route('/api/conversation/sessions', methods=['GET'])
+@require_api_key
+def get_conversation_sessions():
+    """Get the loaded conversation sessions and the memory they hold."""
+    memory_manager = get_memory_manager()
+    conversational = memory_manager.conversational
+    return jsonify({"sessions": conversational.session_ids(), "usage": conversational.usage()})
+
+
 # ========== Long-term Memory Endpoints ==========
 
 @app.route('/api/memory/fact', methods=['POST'])
 @require_api_key
 def store_fact():
     """Store a fact in long-term memory."""
-    data = request.get_json()
-    fact = data.get('fact')
-    category = data.get('category', 'general')
-    
-    if not fact:
-        return jsonify({"error": "Fact is required"}), 400
+    try:
+        fact, category = normalize_fact_item(get_json_object())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     memory_manager = get_memory_manager()
     memory_manager.long_term.store_fact(fact, category)
     return jsonify({"status": "success", "message": "Fact stored"})
 
 
+@app.route('/api/memory/fact/bulk', methods=['POST'])
+@require_api_key
+def store_facts_bulk():
+    """Store many facts from a JSON array or NDJSON body."""
+    items = get_bulk_items()
+    if items is None:
+        return jsonify({"error": "Body must be a JSON array or NDJSON"}), 400
+    
+    memory_manager = get_memory_manager()
+    results = memory_manager.long_term.store_facts_bulk(items)
+    return bulk_response(results)
+
+
 @app.route('/api/memory/fact', methods=['GET'])
 @require_api_key
 def retrieve_facts():
     """Retrieve facts from long-term memory."""
     category = request.args.get('category')
     memory_manager = get_memory_manager()
+    try:
+        page_args = get_page_args()
+        if page_args:
+            facts, next_cursor = memory_manager.long_term.page_facts(category, *page_args)
+            return jsonify({"facts": facts, "next_cursor": next_cursor})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     facts = memory_manager.long_term.retrieve_facts(category=category)
     return jsonify({"facts": facts})
 
 
+@app.route('/api/memory/categories', methods=['GET'])
+@require_api_key
+def get_fact_categories():
+    """Get the number of stored facts per category."""
+    memory_manager = get_memory_manager()
+    counts = memory_manager.long_term.category_counts()
+    return jsonify({"categories": counts})
+
+
 @app.route('/api/memory/preference', methods=['POST'])
 @require_api_key
 def store_preference():
     """Store a user preference."""
-    data = request.get_json()
-    key = data.get('key')
-    value = data.get('value')
-    
-    if not key or value is None:
-        return jsonify({"error": "Key and value are required"}), 400
+    try:
+        key, value = normalize_preference_item(get_json_object())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     memory_manager = get_memory_manager()
     memory_manager.long_term.store_preference(key, value)
     return jsonify({"status": "success", "message": "Preference stored"})
 
 
+@app.route('/api/memory/preference/bulk', methods=['POST'])
+@require_api_key
+def store_preferences_bulk():
+    """Store many preferences from a JSON array or NDJSON body."""
+    items = get_bulk_items()
+    if items is None:
+        return jsonify({"error": "Body must be a JSON array or NDJSON"}), 400
+    
+    memory_manager = get_memory_manager()
+    results = memory_manager.long_term.store_preferences_bulk(items)
+    return bulk_response(results)
+
+
 @app.route('/api/memory/preference/<key>', methods=['GET'])
 @require_api_key
 def retrieve_preference(key):
@@ -172,18 +456,51 @@ def retrieve_preference(key):
 @require_api_key
 def store_entity():
     """Store an entity in long-term memory."""
-    data = request.get_json()
-    entity_name = data.get('entity_name')
-    entity_data = data.get('entity_data')
-    
-    if not entity_name or not entity_data:
-        return jsonify({"error": "Entity name and data are required"}), 400
+    try:
+        entity_name, entity_data = normalize_entity_item(get_json_object())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     memory_manager = get_memory_manager()
     memory_manager.long_term.store_entity(entity_name, entity_data)
     return jsonify({"status": "success", "message": "Entity stored"})
 
 
+@app.route('/api/memory/entity/bulk', methods=['POST'])
+@require_api_key
+def store_entities_bulk():
+    """Store many entities from a JSON array or NDJSON body."""
+    items = get_bulk_items()
+    if items is None:
+        return jsonify({"error": "Body must be a JSON array or NDJSON"}), 400
+    
+    memory_manager = get_memory_manager()
+    results = memory_manager.long_term.store_entities_bulk(items)
+    return bulk_response(results)
+
+
+@app.route('/api/memory/entity', methods=['GET'])
+@require_api_key
+def lookup_entities():
+    """Autocomplete entity names by prefix, or find them by fuzzy name."""
+    prefix = request.args.get('prefix')
+    query = request.args.get('query')
+    if prefix is None and not query:
+        return jsonify({"error": "prefix or query parameter is required"}), 400
+    
+    limit = request.args.get('limit', 10, type=int)
+    if limit <= 0:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = min(limit, MAX_PAGE_SIZE)
+    
+    memory_manager = get_memory_manager()
+    if prefix is not None:
+        entities = memory_manager.long_term.complete_entities(prefix, limit)
+    else:
+        entities = memory_manager.long_term.find_entities(query, limit)
+    return jsonify({"entities": entities})
+
+
 @app.route('/api/memory/entity/<entity_name>', methods=['GET'])
 @require_api_key
 def retrieve_entity(entity_name):
@@ -195,6 +512,16 @@ def retrieve_entity(entity_name):
     return jsonify({"entity_name": entity_name, "data": entity})
 
 
+@app.route('/api/memory/export', methods=['GET'])
+@require_api_key
+def export_memory():
+    """Stream all long-term memory records as NDJSON."""
+    memory_manager = get_memory_manager()
+    records = memory_manager.long_term.export_records()
+    return Response(stream_with_context(ndjson_lines(records)),
+                    mimetype='application/x-ndjson')
+
+
 @app.route('/api/memory/search', methods=['GET'])
 @require_api_key
 def search_memory():
@@ -203,11 +530,61 @@ def search_memory():
     if not query:
         return jsonify({"error": "Query parameter is required"}), 400
     
+    top_k = request.args.get('top_k', type=int)
+    if top_k is not None and top_k <= 0:
+        return jsonify({"error": "top_k must be a positive integer"}), 400
+    # Asking for top_k implies ranking unless explicitly disabled
+    ranked = request.args.get('ranked', 'true' if top_k else 'false').lower() == 'true'
+    semantic = request.args.get('semantic', 'false').lower() == 'true'
+    
+    memory_manager = get_memory_manager()
+    try:
+        page_args = get_page_args()
+        if page_args:
+            results, next_cursor = memory_manager.long_term.page_search(
+                query, *page_args, ranked=ranked, semantic=semantic)
+            return jsonify({"results": results, "next_cursor": next_cursor})
+        results = memory_manager.long_term.search_memory(query, top_k=top_k, ranked=ranked,
+                                                         semantic=semantic)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"results": results})
+
+
+@app.route('/api/memory/archive/search', methods=['GET'])
+@require_api_key
+def search_archive():
+    """Search facts moved to the cold archive by retention."""
+    query = request.args.get('query')
+    if not query:
+        return jsonify({"error": "Query parameter is required"}), 400
+    
+    top_k = request.args.get('top_k', type=int)
+    if top_k is not None and top_k <= 0:
+        return jsonify({"error": "top_k must be a positive integer"}), 400
+    
     memory_manager = get_memory_manager()
-    results = memory_manager.long_term.search_memory(query)
+    results = memory_manager.long_term.search_archive(query, top_k=top_k)
     return jsonify({"results": results})
 
 
+@app.route('/api/memory/retention', methods=['POST'])
+@require_api_key
+def apply_retention():
+    """Run a retention pass now, archiving facts that break their policy."""
+    memory_manager = get_memory_manager()
+    archived = memory_manager.long_term.apply_retention()
+    return jsonify({"status": "success", "archived": archived})
+
+
+@app.route('/api/memory/stats', methods=['GET'])
+@require_api_key
+def get_memory_stats():
+    """Get hot and cold storage sizes for long-term memory."""
+    memory_manager = get_memory_manager()
+    return jsonify(memory_manager.long_term.stats())
+
+
 # ========== Goals Management Endpoints ==========
 
 @app.route('/api/goals', methods=['POST'])
@@ -233,10 +610,28 @@ def add_goal():
 def get_goals():
     """Get all active goals."""
     memory_manager = get_memory_manager()
+    try:
+        page_args = get_page_args()
+        if page_args:
+            goals, next_cursor = memory_manager.goals.page_goals(*page_args)
+            return jsonify({"goals": goals, "next_cursor": next_cursor})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     goals = memory_manager.goals.get_active_goals()
     return jsonify({"goals": goals})
 
 
+@app.route('/api/goals/export', methods=['GET'])
+@require_api_key
+def export_goals():
+    """Stream all active and completed goals as NDJSON."""
+    memory_manager = get_memory_manager()
+    records = memory_manager.goals.export_records()
+    return Response(stream_with_context(ndjson_lines(records)),
+                    mimetype='application/x-ndjson')
+
+
 @app.route('/api/goals/<int:goal_id>', methods=['GET'])
 @require_api_key
 def get_goal(goal_id):
@@ -407,8 +802,13 @@ def get_factors(platform):
 @require_api_key
 def get_full_context():
     """Get complete context from all memory types."""
+    try:
+        session_id = get_session_id()
+        max_tokens = get_max_tokens()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     memory_manager = get_memory_manager()
-    context = memory_manager.get_full_context()
+    context = memory_manager.get_full_context(session_id, max_tokens)
     return jsonify(context)
 
 
@@ -445,4 +845,9 @@ if __name__ == '__main__':
     print(f"Debug: {debug}")
     print("\nAPI Documentation: See docs/API_DOCUMENTATION.md")
     
-    app.run(host=host, port=port, debug=debug)
+    app.config.setdefault('MEMORY_PREFETCH', True)
+    get_memory_manager()
+    try:
+        app.run(host=host, port=port, debug=debug)
+    finally:
+        close_memory_managers()
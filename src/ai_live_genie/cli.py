@@ -6,12 +6,14 @@ Command-line interface for AI Live Genie.
 import sys
 import argparse
 from .memory_manager import MemoryManager
+from .records import ndjson_lines
+from .segments import is_segment, json_to_segment, segment_to_json
 from .streaming_data import StreamingPlatformData
 
 
 def serve_api(args):
     """Start the API server."""
-    from .api_server import app
+    from .api_server import app, close_memory_managers, get_memory_manager
     import os
     
     # Set API key if provided
@@ -34,7 +36,14 @@ def serve_api(args):
     print(f"   Debug mode: {args.debug}")
     print()
     
-    app.run(host=args.host, port=args.port, debug=args.debug)
+    # Load the memory stores in the background while the server starts
+    app.config.setdefault('MEMORY_PREFETCH', True)
+    get_memory_manager()
+    try:
+        app.run(host=args.host, port=args.port, debug=args.debug)
+    finally:
+        # Flush any deferred memory writes before exiting
+        close_memory_managers()
 
 
 def calculate_earnings(args):
@@ -121,6 +130,40 @@ def list_goals(args):
         print()
 
 
+def export_data(args):
+    """Export stored memory and/or goals as NDJSON."""
+    memory = MemoryManager(data_dir=args.data_dir)
+    sources = []
+    if args.what in ('memory', 'all'):
+        sources.append(memory.long_term.export_records())
+    if args.what in ('goals', 'all'):
+        sources.append(memory.goals.export_records())
+    
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        count = 0
+        for records in sources:
+            for line in ndjson_lines(records):
+                out.write(line)
+                count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    
+    if args.output:
+        print(f"\n📦 Exported {count:,} records to {args.output}")
+
+
+def convert_store(args):
+    """Convert a store file between JSON and the binary segment format."""
+    if is_segment(args.source):
+        segment_to_json(args.source, args.destination, indent=args.indent)
+        print(f"\n📦 Converted segment {args.source} to JSON {args.destination}")
+    else:
+        json_to_segment(args.source, args.destination)
+        print(f"\n📦 Converted JSON {args.source} to segment {args.destination}")
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -145,6 +188,12 @@ Examples:
 
   # List goals
   ai-live-genie goal list
+
+  # Export everything as NDJSON
+  ai-live-genie export all --output backup.ndjson
+
+  # Convert a JSON store file to the binary segment format
+  ai-live-genie convert data/long_term_memory.json data/long_term_memory.seg
         """
     )
     
@@ -186,6 +235,23 @@ Examples:
     goal_list = goal_subparsers.add_parser('list', help='List all active goals')
     goal_list.set_defaults(func=list_goals)
     
+    # Export command
+    export_parser = subparsers.add_parser('export', help='Export memory and goals as NDJSON')
+    export_parser.add_argument('what', nargs='?', default='all', choices=['memory', 'goals', 'all'],
+                               help='What to export (default: all)')
+    export_parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+    export_parser.add_argument('--data-dir', default='./data', help='Data directory')
+    export_parser.set_defaults(func=export_data)
+    
+    # Convert command
+    convert_parser = subparsers.add_parser(
+        'convert', help='Convert a store file between JSON and the binary segment format')
+    convert_parser.add_argument('source', help='Store file to read (format is detected)')
+    convert_parser.add_argument('destination', help='File to write in the other format')
+    convert_parser.add_argument('--indent', action='store_true',
+                                help='Indent JSON output')
+    convert_parser.set_defaults(func=convert_store)
+    
     # Parse args
     args = parser.parse_args()
     
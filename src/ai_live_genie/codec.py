@@ -0,0 +1,128 @@
+"""
+JSON codec for AI Live Genie
+Encodes and decodes JSON with orjson or msgspec when one is installed and with
+the standard library otherwise, for the store files and the API responses.
+
+Install the ``fast-json`` extra for orjson. Set ``AI_GENIE_JSON_CODEC`` to
+``orjson``, ``msgspec`` or ``json`` to pick a codec explicitly.
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Raised by loads() for malformed input, whichever codec is active
+JSONDecodeError = json.JSONDecodeError
+
+# Tried in this order when no codec is configured
+PREFERRED_CODECS = ("orjson", "msgspec", "json")
+
+
+class Codec:
+    """One JSON library behind a common interface.
+
+    ``dumps(obj, default=None, indent=False)`` returns UTF-8 bytes, compact
+    unless ``indent`` asks for two-space indentation; ``default`` converts
+    objects the library cannot encode itself. ``loads`` accepts bytes or str
+    and raises JSONDecodeError on malformed input.
+    """
+
+    __slots__ = ("name", "dumps", "loads")
+
+    def __init__(self, name: str, dumps: Callable[..., bytes], loads: Callable[[Any], Any]):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self) -> str:
+        return f"Codec({self.name!r})"
+
+
+def _stdlib_dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None,
+                  indent: bool = False) -> bytes:
+    if indent:
+        text = json.dumps(obj, default=default, indent=2, ensure_ascii=False)
+    else:
+        text = json.dumps(obj, default=default, separators=(",", ":"), ensure_ascii=False)
+    return text.encode("utf-8")
+
+
+def _orjson_dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None,
+                  indent: bool = False) -> bytes:
+    # Non-string keys are stringified, as the standard library does
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+    return orjson.dumps(obj, default=default, option=option)
+
+
+def _msgspec_dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None,
+                   indent: bool = False) -> bytes:
+    data = msgspec.json.encode(obj, enc_hook=default)
+    return msgspec.json.format(data, indent=2) if indent else data
+
+
+def _msgspec_loads(data: Union[bytes, str]) -> Any:
+    try:
+        return msgspec.json.decode(data)
+    except msgspec.DecodeError as e:
+        raise JSONDecodeError(str(e), data if isinstance(data, str) else "", 0) from None
+
+
+CODECS: Dict[str, Codec] = {"json": Codec("json", _stdlib_dumps, json.loads)}
+if orjson is not None:
+    # orjson.JSONDecodeError already subclasses json.JSONDecodeError
+    CODECS["orjson"] = Codec("orjson", _orjson_dumps, orjson.loads)
+if msgspec is not None:
+    CODECS["msgspec"] = Codec("msgspec", _msgspec_dumps, _msgspec_loads)
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """Return the named codec, or the fastest installed one when ``name`` is None."""
+    if name is None:
+        return next(CODECS[name] for name in PREFERRED_CODECS if name in CODECS)
+    if name not in PREFERRED_CODECS:
+        raise ValueError(f"Unknown JSON codec '{name}'; expected one of {PREFERRED_CODECS}")
+    if name not in CODECS:
+        raise ImportError(f"JSON codec '{name}' is not installed")
+    return CODECS[name]
+
+
+_codec = get_codec(os.environ.get("AI_GENIE_JSON_CODEC") or None)
+
+
+def set_codec(name: Optional[str] = None) -> Codec:
+    """Switch the codec used by ``dumps``/``loads``; None picks the fastest installed."""
+    global _codec
+    _codec = get_codec(name)
+    return _codec
+
+
+def active_codec() -> Codec:
+    """Return the codec used by ``dumps``/``loads``."""
+    return _codec
+
+
+def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None,
+          indent: bool = False) -> bytes:
+    """Encode ``obj`` as UTF-8 JSON bytes with the active codec."""
+    return _codec.dumps(obj, default, indent)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON bytes or text with the active codec."""
+    return _codec.loads(data)
+
+
+def load_file(path: str) -> Any:
+    """Read and decode a JSON file."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
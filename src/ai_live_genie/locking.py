@@ -0,0 +1,188 @@
+"""
+Locking for AI Live Genie
+Reader-writer locks that let the in-memory stores serve concurrent reads
+while serializing writes, and file locks that keep stores shared by several
+processes consistent.
+"""
+
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Generation counter stored at the start of a shared store's lock file
+_GENERATION = struct.Struct("<Q")
+
+
+class _Guard:
+    """Context manager over one side of a ReadWriteLock."""
+
+    __slots__ = ("acquire", "release")
+
+    def __init__(self, acquire: Callable[[], None], release: Callable[[], None]):
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class ReadWriteLock:
+    """Any number of readers or a single writer.
+
+    Use ``with lock.read_lock:`` and ``with lock.write_lock:``. The write side
+    is reentrant and its holder may also take the read side. Waiting writers
+    hold back new readers so a steady stream of reads cannot starve them,
+    except for threads that already hold a read lock, which may nest reads.
+    Upgrading a read lock to a write lock would deadlock and raises
+    RuntimeError instead.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers: Dict[int, int] = {}
+        self._writer = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self.read_lock = _Guard(self.acquire_read, self.release_read)
+        self.write_lock = _Guard(self.acquire_write, self.release_write)
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me and me not in self._readers:
+                while self._writer is not None or self._writers_waiting:
+                    self._cond.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            count = self._readers[me] - 1
+            if count:
+                self._readers[me] = count
+            else:
+                del self._readers[me]
+                if not self._readers:
+                    self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+
+class SharedStore:
+    """Cross-process coordination for a store kept in a single file.
+
+    Processes sharing a store agree through ``<path>.lock``: writers hold an
+    exclusive ``fcntl`` lock while they reload, mutate and save, then bump a
+    generation counter kept in the lock file. ``sync()`` compares that
+    counter with the generation last seen by this process (one small read)
+    and calls ``reload`` only when another process has written since.
+
+    Where ``fcntl`` is unavailable (Windows) the file lock is skipped and only
+    threads within one process are coordinated.
+    """
+
+    def __init__(self, path: str, reload: Callable[[], None]):
+        self.lock_path = path + ".lock"
+        self.reload = reload
+        self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        # flock belongs to the open file, which all threads share, so threads
+        # take turns through this lock and only the outermost holder flocks
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        # None until the first sync(), which performs the initial load
+        self.generation: Optional[int] = None
+
+    def read_generation(self) -> int:
+        """Return the generation last committed by any process."""
+        if hasattr(os, "pread"):
+            # Positional reads need no lock, so readers never wait on a writer here
+            data = os.pread(self._fd, _GENERATION.size, 0)
+        else:
+            with self._thread_lock:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                data = os.read(self._fd, _GENERATION.size)
+        return _GENERATION.unpack(data)[0] if len(data) == _GENERATION.size else 0
+
+    @contextmanager
+    def _locked(self, mode: int):
+        with self._thread_lock:
+            if self._depth == 0 and fcntl is not None:
+                fcntl.flock(self._fd, mode)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _reload_if_changed(self):
+        generation = self.read_generation()
+        if generation != self.generation:
+            self.reload()
+            self.generation = generation
+
+    def sync(self):
+        """Reload the store if another process has committed since we last looked."""
+        if self.read_generation() == self.generation:
+            return
+        with self._locked(fcntl.LOCK_SH if fcntl is not None else 0):
+            self._reload_if_changed()
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the store for writing, starting from the latest committed state."""
+        with self._locked(fcntl.LOCK_EX if fcntl is not None else 0):
+            self._reload_if_changed()
+            yield
+
+    def commit(self):
+        """Record a write; call after saving, while holding ``exclusive()``."""
+        with self._thread_lock:
+            self.generation += 1
+            data = _GENERATION.pack(self.generation)
+            if hasattr(os, "pwrite"):
+                os.pwrite(self._fd, data, 0)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                os.write(self._fd, data)
+
+    def close(self):
+        """Release the lock file descriptor."""
+        with self._thread_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
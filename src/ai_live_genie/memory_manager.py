@@ -3,250 +3,1613 @@ Memory Manager for AI Live Genie
 Handles conversational memory, long-term memory, and goals tracking.
 """
 
-import json
+import bisect
+import functools
+import logging
 import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Tuple
+
+from . import codec
+from .locking import ReadWriteLock, SharedStore
+from .persistence import (
+    BackgroundFlusher,
+    DURABILITY_DEFERRED,
+    DURABILITY_MODES,
+    DURABILITY_SYNC,
+    read_tail_lines,
+    write_atomic,
+)
+from .records import (
+    FactRecord,
+    GoalRecord,
+    MessageRecord,
+    decode_cursor,
+    encode_cursor,
+    fact_hash,
+    format_timestamp,
+    json_default,
+    normalize_entity_item,
+    normalize_fact_item,
+    normalize_preference_item,
+    parse_timestamp,
+)
+from .retention import FactArchive, RetentionScheduler, policy_for, resolve_policies
+from .ring_buffer import RingBuffer
+from .search_index import NameIndex, TokenIndex, tokenize
+from .segments import (
+    FILE_FORMATS,
+    FORMAT_JSON,
+    FORMAT_SEGMENT,
+    SegmentError,
+    encode_segment,
+    load_document,
+)
+from .sqlite_storage import SQLiteLongTermMemory, SQLiteGoalsManager
+from .tokens import Tokenizer, estimate_tokens
+from .vector_index import VectorIndex, require_numpy
+
+logger = logging.getLogger(__name__)
+
+# A page of records and the cursor for the next page (None on the last page)
+Page = Tuple[List[Dict[str, Any]], Optional[str]]
+
+
+def _shared_read(method):
+    """Bring a shared store up to date with other processes before reading."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._shared is not None:
+            self._shared.sync()
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _shared_write(method):
+    """Run a write under a shared store's file lock, starting from the latest state."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._shared is None:
+            return method(self, *args, **kwargs)
+        with self._shared.exclusive():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _store_file(data_dir: str, name: str, file_format: str) -> str:
+    """Return the path of a store file, keeping an existing file in the other format.
+    
+    Stores read either format and save in their own, so an existing
+    ``name.json`` opened with ``file_format="segment"`` (or ``name.seg``
+    opened as JSON) is converted in place on its next save instead of being
+    shadowed by a new, empty file.
+    """
+    ext, other = (".seg", ".json") if file_format == FORMAT_SEGMENT else (".json", ".seg")
+    path = os.path.join(data_dir, name + ext)
+    existing = os.path.join(data_dir, name + other)
+    if not os.path.exists(path) and os.path.exists(existing):
+        return existing
+    return path
+
+
+def _page_after_id(items: List[Any], cursor: Optional[str], limit: int) -> Page:
+    """Return up to ``limit`` records whose id follows the cursor, plus the next cursor.
+    
+    ``items`` (a list or RingBuffer) must be ordered by ascending ``id``; the
+    start of the page is found by binary search, so a page costs
+    O(log n + limit). Records are returned in their public dict form.
+    """
+    last_id = decode_cursor(cursor)
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if items[mid].id <= last_id:
+            lo = mid + 1
+        else:
+            hi = mid
+    page = [item.to_dict() for item in items[lo:lo + limit]]
+    next_cursor = encode_cursor(page[-1]["id"]) if lo + limit < len(items) else None
+    return page, next_cursor
+
+
+def _token_window_start(messages: List[MessageRecord], max_tokens: int) -> int:
+    """Return the index where the newest run of messages within ``max_tokens`` starts.
+    
+    ``messages`` (a list or RingBuffer) must carry running ``token_end``
+    totals; the start is found by binary search over them, so choosing the
+    window costs O(log n) and re-tokenizes nothing. Returns ``len(messages)``
+    when even the newest message does not fit.
+    """
+    if not messages:
+        return 0
+    # A run starting at i costs messages[-1].token_end - (its token_end - its tokens)
+    floor = messages[-1].token_end - max_tokens
+    lo, hi = 0, len(messages)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if messages[mid].token_end - messages[mid].tokens < floor:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _message_bytes(message: MessageRecord) -> int:
+    """Estimate the memory held by one message; roles are interned and not counted."""
+    size = sys.getsizeof(message) + sys.getsizeof(message.content)
+    if message.metadata is not None:
+        size += sys.getsizeof(message.metadata)
+    return size
+
+
+def _journal_lines(records: List[Dict[str, Any]]) -> bytes:
+    """Encode journal records with the active codec, one per line."""
+    return b"".join(codec.dumps(record, default=json_default) + b"\n" for record in records)
 
 
 class ConversationalMemory:
-    """Manages short-term conversational memory for ongoing interactions."""
+    """Manages short-term conversational memory for ongoing interactions.
+    
+    Messages are held as MessageRecord objects in a ring buffer of
+    ``max_history`` slots and returned as dicts, so adding a message and
+    evicting the oldest are O(1). ``on_evict``, when given, receives each
+    message pushed out of the buffer (in its dict form) so it can be archived
+    or summarized; it runs in the adding thread after the lock is released.
+    ``clear()`` does not report the messages it drops. Reads run
+    concurrently and writes are serialized by a ReadWriteLock.
+    
+    ``size_bytes`` estimates the memory held by the buffer and its messages.
     
-    def __init__(self, max_history: int = 50):
-        self.max_history = max_history
-        self.conversation_history: List[Dict[str, Any]] = []
+    With ``log_path`` every message is also appended to that file as an
+    NDJSON line, and the history is restored from it on construction. The
+    log is rewritten to hold just the buffered messages once it reaches
+    twice ``max_history`` lines, and restoring reads only its last
+    ``max_history`` lines by seeking back from the end, so start-up time
+    does not grow with the number of messages ever logged. A torn trailing
+    line left by a crash is cut off on restore.
+    
+    Each message's token count is taken once, when it is added, with
+    ``tokenizer`` (``tokens.estimate_tokens`` by default), and kept with a
+    running total so ``get_history(max_tokens=...)`` picks the newest
+    messages that fit a token budget in O(log n).
+    """
+    
+    def __init__(self, max_history: int = 50,
+                 on_evict: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 log_path: Optional[str] = None, tokenizer: Optional[Tokenizer] = None):
+        self.conversation_history = RingBuffer(max_history)
+        self.on_evict = on_evict
+        self.log_path = log_path
+        self.tokenizer = tokenizer or estimate_tokens
+        self._token_total = 0
+        self._next_message_id = 1
+        self._log_lines = 0
+        self._bytes = sys.getsizeof(self.conversation_history)
+        # Set by ConversationSessions to hear (message delta, byte delta) after each write
+        self._listener: Optional[Callable[[int, int], None]] = None
+        self._lock = ReadWriteLock()
+        if log_path is not None:
+            self._restore_log()
+    
+    def __len__(self) -> int:
+        return len(self.conversation_history)
+    
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+    
+    @property
+    def max_history(self) -> int:
+        """Number of messages kept; lowering it evicts the oldest messages."""
+        return self.conversation_history.capacity
+    
+    @max_history.setter
+    def max_history(self, max_history: int):
+        with self._lock.write_lock:
+            before = self._bytes
+            evicted = self.conversation_history.resize(max_history)
+            self._bytes = (sys.getsizeof(self.conversation_history)
+                           + sum(_message_bytes(message) for message in self.conversation_history))
+            delta = self._bytes - before
+        self._notify(-len(evicted), delta)
+        self._report_evicted(evicted)
+    
+    def _restore_log(self):
+        """Load the newest ``max_history`` messages from the log."""
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'r+b') as f:
+            lines, end, whole = read_tail_lines(f, self.max_history)
+            if end < f.seek(0, os.SEEK_END):
+                f.truncate(end)
+        for line in lines:
+            try:
+                message = MessageRecord.from_dict(codec.loads(line))
+            except (ValueError, KeyError, TypeError):
+                # An unreadable line; the messages around it are intact
+                continue
+            message.tokens = self.tokenizer(message.content)
+            self._token_total += message.tokens
+            message.token_end = self._token_total
+            self.conversation_history.append(message)
+            self._bytes += _message_bytes(message)
+            self._next_message_id = message.id + 1
+        # Older lines may remain before the tail; rewrite the log on the next append
+        self._log_lines = len(lines) if whole else 2 * self.max_history
+    
+    def _append_log(self, message: MessageRecord):
+        """Append a message to the log, rewriting it once it is twice max_history long."""
+        self._log_lines += 1
+        if self._log_lines >= 2 * self.max_history:
+            write_atomic(self.log_path, b"".join(
+                codec.dumps(record, default=json_default) + b"\n"
+                for record in self.conversation_history))
+            self._log_lines = len(self.conversation_history)
+        else:
+            with open(self.log_path, 'ab') as f:
+                f.write(codec.dumps(message, default=json_default) + b"\n")
+    
+    def _notify(self, messages: int, size: int):
+        if self._listener is not None:
+            self._listener(messages, size)
+    
+    def _report_evicted(self, evicted: List[MessageRecord]):
+        if self.on_evict is not None:
+            for message in evicted:
+                self.on_evict(message.to_dict())
     
     def add_message(self, role: str, content: str, metadata: Optional[Dict[str, Any]] = None):
         """Add a message to conversational memory."""
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat(),
-            "metadata": metadata or {}
-        }
-        self.conversation_history.append(message)
+        tokens = self.tokenizer(content)
+        with self._lock.write_lock:
+            self._token_total += tokens
+            message = MessageRecord(self._next_message_id, role, content, time.time(), metadata,
+                                    tokens, self._token_total)
+            self._next_message_id += 1
+            evicted = self.conversation_history.append(message)
+            delta = _message_bytes(message)
+            if evicted is not None:
+                delta -= _message_bytes(evicted)
+            self._bytes += delta
+            if self.log_path is not None:
+                self._append_log(message)
+        self._notify(0 if evicted is not None else 1, delta)
+        if evicted is not None:
+            self._report_evicted([evicted])
+    
+    def get_history(self, last_n: Optional[int] = None,
+                    max_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Retrieve conversation history.
         
-        # Keep only the most recent messages
-        if len(self.conversation_history) > self.max_history:
-            self.conversation_history = self.conversation_history[-self.max_history:]
+        ``last_n`` keeps the newest messages by count and ``max_tokens`` the
+        newest messages whose token counts add up to at most that many.
+        """
+        with self._lock.read_lock:
+            messages = (self.conversation_history.tail(last_n) if last_n
+                        else self.conversation_history)
+            if max_tokens is not None:
+                messages = messages[_token_window_start(messages, max_tokens):]
+            return [message.to_dict() for message in messages]
     
-    def get_history(self, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Retrieve conversation history."""
-        if last_n:
-            return self.conversation_history[-last_n:]
-        return self.conversation_history
+    def page_history(self, limit: int, cursor: Optional[str] = None) -> Page:
+        """Return one page of history, oldest first, and the cursor for the next."""
+        with self._lock.read_lock:
+            return _page_after_id(self.conversation_history, cursor, limit)
     
     def clear(self):
-        """Clear conversational memory."""
-        self.conversation_history = []
+        """Clear conversational memory, emptying the log if there is one."""
+        with self._lock.write_lock:
+            count = len(self.conversation_history)
+            self.conversation_history.clear()
+            if self.log_path is not None:
+                write_atomic(self.log_path, b"")
+                self._log_lines = 0
+            delta = sys.getsizeof(self.conversation_history) - self._bytes
+            self._bytes += delta
+        self._notify(-count, delta)
     
     def get_context_summary(self) -> str:
         """Generate a summary of the current conversation context."""
-        if not self.conversation_history:
-            return "No conversation history."
+        with self._lock.read_lock:
+            if not self.conversation_history:
+                return "No conversation history."
+            
+            summary = f"Conversation with {len(self.conversation_history)} messages:\n"
+            for msg in self.conversation_history.tail(5):  # Last 5 messages
+                summary += f"- [{msg.role}]: {msg.content[:50]}...\n"
+            return summary
+
+
+# Session ids arrive from viewers' clients, so only a conservative character set is allowed
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.:-]{0,127}$")
+
+
+def validate_session_id(session_id: str) -> str:
+    """Return ``session_id`` if it is a well-formed conversation session id."""
+    if not isinstance(session_id, str) or not _SESSION_ID_RE.match(session_id):
+        raise ValueError("Session id must be 1-128 letters, digits, '_', '-', '.' or ':', "
+                         "starting with a letter or digit")
+    return session_id
+
+
+class ConversationSessions:
+    """Per-session conversational memories under one global budget.
+    
+    ``session(session_id)`` returns that session's ConversationalMemory,
+    creating it with ``max_history`` slots on first use. The
+    ConversationalMemory methods of the registry itself act on the
+    ``"default"`` session, so code written for a single conversation keeps
+    working.
+    
+    ``max_messages`` and ``max_bytes`` (estimated with ``sys.getsizeof``)
+    bound what all sessions hold together. When a write takes the total over
+    either budget, the least recently used sessions other than the one being
+    written are dropped whole until it fits again; a single session is
+    bounded by its own ``max_history``. ``on_evict``, when given, is called
+    as ``on_evict(session_id, messages)`` with the dict form of messages that
+    leave memory, whether pushed out of a session's ring buffer or dropped
+    with an idle session; it runs after the registry lock is released.
+    
+    With ``log_dir`` each session logs its messages to
+    ``<log_dir>/<session_id>.log`` (see ConversationalMemory), so history
+    survives restarts and a session evicted for the budget is restored from
+    its log the next time it is used. ``tokenizer`` is passed on to every
+    session for ``get_history(max_tokens=...)``.
+    """
+    
+    DEFAULT_SESSION = "default"
+    
+    def __init__(self, max_history: int = 50, max_messages: int = 1_000_000,
+                 max_bytes: int = 256 * 1024 * 1024,
+                 on_evict: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None,
+                 log_dir: Optional[str] = None, tokenizer: Optional[Tokenizer] = None):
+        if max_messages < 1 or max_bytes < 1:
+            raise ValueError("max_messages and max_bytes must be at least 1")
+        if log_dir is not None:
+            os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = log_dir
+        self.tokenizer = tokenizer
+        self._max_history = max_history
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, ConversationalMemory]" = OrderedDict()
+        # session id -> [messages, bytes] as last reported by the session
+        self._usage: Dict[str, List[int]] = {}
+        self._total_messages = 0
+        self._total_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+    
+    def session(self, session_id: Optional[str] = None) -> ConversationalMemory:
+        """Return the session's memory, creating it if needed, and mark it recently used."""
+        session_id = self.DEFAULT_SESSION if session_id is None else validate_session_id(session_id)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                return session
+        # Restoring a log reads from disk, so build the session outside the lock
+        log_path = (os.path.join(self.log_dir, session_id + ".log")
+                    if self.log_dir is not None else None)
+        created = ConversationalMemory(
+            self._max_history, on_evict=functools.partial(self._report_message, session_id),
+            log_path=log_path, tokenizer=self.tokenizer)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                # Another thread opened it first
+                self._sessions.move_to_end(session_id)
+                return session
+            session = created
+            session._listener = functools.partial(self._on_change, session_id, session)
+            self._sessions[session_id] = session
+            self._usage[session_id] = [len(session), session.size_bytes]
+            self._total_messages += len(session)
+            self._total_bytes += session.size_bytes
+            evicted = self._evict_idle(session_id)
+        self._report_sessions(evicted)
+        return session
+    
+    def session_ids(self) -> List[str]:
+        """Return the loaded session ids, least recently used first."""
+        with self._lock:
+            return list(self._sessions)
+    
+    def drop_session(self, session_id: str) -> bool:
+        """Unload a session without reporting its messages; return whether it was loaded.
         
-        summary = f"Conversation with {len(self.conversation_history)} messages:\n"
-        for msg in self.conversation_history[-5:]:  # Last 5 messages
-            summary += f"- [{msg['role']}]: {msg['content'][:50]}...\n"
-        return summary
+        The session's log, if any, is kept, so it is restored on its next use.
+        """
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None:
+                return False
+            self._release_usage(session_id)
+            return True
+    
+    def usage(self) -> Dict[str, int]:
+        """Return the number of sessions and the messages and bytes they hold."""
+        with self._lock:
+            return {"sessions": len(self._sessions), "messages": self._total_messages,
+                    "bytes": self._total_bytes}
+    
+    def _on_change(self, session_id: str, session: ConversationalMemory,
+                   messages: int, size: int):
+        with self._lock:
+            # A session evicted while a write to it was in flight is no longer counted
+            if self._sessions.get(session_id) is not session:
+                return
+            usage = self._usage[session_id]
+            usage[0] += messages
+            usage[1] += size
+            self._total_messages += messages
+            self._total_bytes += size
+            self._sessions.move_to_end(session_id)
+            evicted = self._evict_idle(session_id)
+        self._report_sessions(evicted)
+    
+    def _release_usage(self, session_id: str):
+        messages, size = self._usage.pop(session_id)
+        self._total_messages -= messages
+        self._total_bytes -= size
+    
+    def _evict_idle(self, active_id: str) -> List[Tuple[str, ConversationalMemory]]:
+        """Detach least recently used sessions while over budget; called with the lock held."""
+        evicted = []
+        while self._total_messages > self.max_messages or self._total_bytes > self.max_bytes:
+            # The active session was just moved to the end, so it is the last one left
+            session_id = next(iter(self._sessions))
+            if session_id == active_id:
+                break
+            evicted.append((session_id, self._sessions.pop(session_id)))
+            self._release_usage(session_id)
+        return evicted
+    
+    def _report_message(self, session_id: str, message: Dict[str, Any]):
+        if self.on_evict is not None:
+            self.on_evict(session_id, [message])
+    
+    def _report_sessions(self, evicted: List[Tuple[str, ConversationalMemory]]):
+        if self.on_evict is not None:
+            for session_id, session in evicted:
+                messages = session.get_history()
+                if messages:
+                    self.on_evict(session_id, messages)
+    
+    @property
+    def max_history(self) -> int:
+        """Number of messages kept per session; changing it resizes every session."""
+        return self._max_history
+    
+    @max_history.setter
+    def max_history(self, max_history: int):
+        with self._lock:
+            self._max_history = max_history
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            session.max_history = max_history
+    
+    def add_message(self, role: str, content: str, metadata: Optional[Dict[str, Any]] = None):
+        """Add a message to the default session."""
+        self.session().add_message(role, content, metadata)
+    
+    def get_history(self, last_n: Optional[int] = None,
+                    max_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Retrieve the default session's history."""
+        return self.session().get_history(last_n, max_tokens)
+    
+    def page_history(self, limit: int, cursor: Optional[str] = None) -> Page:
+        """Return one page of the default session's history."""
+        return self.session().page_history(limit, cursor)
+    
+    def clear(self):
+        """Clear the default session."""
+        self.session().clear()
+    
+    def get_context_summary(self) -> str:
+        """Summarize the default session."""
+        return self.session().get_context_summary()
 
 
 class LongTermMemory:
-    """Manages persistent long-term memory storage."""
+    """Manages persistent long-term memory storage.
+
+    By default every mutation rewrites the whole JSON file. With ``journal=True``
+    mutations are appended as single records to ``<storage_path>.log`` instead,
+    and the log is periodically compacted into the JSON snapshot in a background
+    thread once it holds ``compact_threshold`` records.
+    
+    With ``durability="deferred"`` writes only mark the store dirty and a
+    BackgroundFlusher persists them in groups; call ``flush()`` or ``close()``
+    to force them to disk. Snapshots are written to a temporary file and
+    renamed into place, so readers never see a torn file.
+    
+    Reads run concurrently and writes are serialized by a ReadWriteLock, so a
+    store can be shared by the threads of a threaded WSGI server.
+    
+    With ``dedup=True`` storing a fact whose normalized content and category
+    match an existing fact refreshes that fact's timestamp and ``hits`` count
+    instead of appending a copy.
+    
+    ``retention`` maps categories (or ``"*"`` for all others) to
+    RetentionPolicy rules. ``apply_retention()`` moves facts that break them to
+    a gzip archive at ``<storage_path>.archive.gz``, searchable through
+    ``search_archive()``; with ``retention_interval`` it runs every that many
+    seconds in the background.
+    
+    With ``vector=True`` (requires NumPy) ``search_memory(..., semantic=True)``
+    ranks facts by cosine similarity of hashed n-gram embeddings. The vectors
+    are kept in ``<storage_path>.vectors.npy``, memory-mapped on load and
+    saved on ``flush()``, ``close()`` and ``compact()``.
+    
+    ``id_allocator``, when given, supplies the id of each new fact in place of
+    the store's own counter, so several stores can share one id space.
+    
+    With ``shared=True`` several processes can use the same file: writes hold
+    an ``fcntl`` lock on ``<storage_path>.lock`` and reload first if another
+    process has written, and reads reload only when the generation counter
+    in the lock file has moved. Shared stores use ``journal=False`` and
+    ``durability="sync"``.
     
-    def __init__(self, storage_path: str = "data/long_term_memory.json"):
+    ``file_format="segment"`` saves the store in the binary segment format
+    (see ``segments.py``) instead of JSON. Either format is read on load, so
+    switching an existing store converts it on its next save.
+    """
+    
+    def __init__(self, storage_path: str = "data/long_term_memory.json",
+                 journal: bool = False, compact_threshold: int = 1000,
+                 durability: str = DURABILITY_SYNC, flush_interval_ms: int = 200,
+                 flush_max_pending: int = 100, dedup: bool = False,
+                 retention: Optional[Dict[str, Any]] = None,
+                 retention_interval: Optional[float] = None, vector: bool = False,
+                 id_allocator: Optional[Callable[[], int]] = None, shared: bool = False,
+                 file_format: str = FORMAT_JSON):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability '{durability}'; expected one of {DURABILITY_MODES}")
+        if file_format not in FILE_FORMATS:
+            raise ValueError(f"Unknown file format '{file_format}'; expected one of {FILE_FORMATS}")
+        if shared and (journal or durability != DURABILITY_SYNC):
+            raise ValueError("shared=True requires journal=False and durability='sync'")
+        if vector:
+            require_numpy()
         self.storage_path = storage_path
+        self.journal = journal
+        self.journal_path = storage_path + ".log"
+        self.compact_threshold = compact_threshold
+        self.durability = durability
+        self.file_format = file_format
+        self.dedup = dedup
+        self.retention = resolve_policies(retention)
+        self.archive = FactArchive(storage_path + ".archive.gz")
+        self.vector = vector
+        self.vector_path = storage_path + ".vectors.npy"
+        self._id_allocator = id_allocator
+        # Reads share the lock; writes, lazy index builds and compaction take it exclusively
+        self._lock = ReadWriteLock()
+        self._write_lock = self._lock.write_lock
+        self._save_lock = threading.Lock()
+        self._retention_lock = threading.Lock()
+        self._pending_records: List[Dict[str, Any]] = []
+        self._flusher: Optional[BackgroundFlusher] = None
+        if durability == DURABILITY_DEFERRED:
+            self._flusher = BackgroundFlusher(self._flush_pending, flush_interval_ms,
+                                              flush_max_pending)
+        self._journal_seq = 0
+        self._journal_records = 0
+        self._compacting = False
+        self._facts_by_id: Dict[int, Dict[str, Any]] = {}
+        self._facts_by_category: Dict[str, List[int]] = {}
+        self._next_fact_id = 1
+        self._fact_hashes: Dict[bytes, int] = {}
+        self._fact_index: Optional[TokenIndex] = None
+        self._entity_index: Optional[TokenIndex] = None
+        self._name_index: Optional[NameIndex] = None
+        self._vector_index: Optional[VectorIndex] = None
         # Ensure data directory exists
         os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
-        self.memory: Dict[str, Any] = self._load_memory()
+        self._shared: Optional[SharedStore] = None
+        if shared:
+            self._shared = SharedStore(storage_path, self._reload)
+            self._shared.sync()
+        else:
+            self.memory: Dict[str, Any] = self._load_memory()
+        self._retention_scheduler: Optional[RetentionScheduler] = None
+        if self.retention and retention_interval:
+            self._retention_scheduler = RetentionScheduler(self.apply_retention,
+                                                           retention_interval)
     
     def _load_memory(self) -> Dict[str, Any]:
-        """Load memory from persistent storage."""
+        """Load memory from persistent storage, replaying the journal if present."""
+        memory = {"facts": [], "preferences": {}, "entities": {}}
         if os.path.exists(self.storage_path):
             try:
-                with open(self.storage_path, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return {"facts": [], "preferences": {}, "entities": {}}
-        return {"facts": [], "preferences": {}, "entities": {}}
+                memory = load_document(self.storage_path)
+            except (codec.JSONDecodeError, SegmentError):
+                pass
+        self._journal_seq = memory.pop("_journal_seq", 0)
+        self.memory = memory
+        self._fact_index = None
+        self._entity_index = None
+        self._name_index = None
+        self._vector_index = None
+        self._facts_by_id = {}
+        self._facts_by_category = {}
+        self._fact_hashes = {}
+        self._next_fact_id = 1
+        facts = []
+        for entry in memory["facts"]:
+            fact = FactRecord.from_dict(entry, self._next_fact_id)
+            facts.append(fact)
+            self._facts_by_id[fact.id] = fact
+            self._facts_by_category.setdefault(fact.category, []).append(fact.id)
+            self._next_fact_id = max(self._next_fact_id, fact.id + 1)
+            if self.dedup:
+                self._fact_hashes.setdefault(fact_hash(fact.content, fact.category), fact.id)
+        memory["facts"] = facts
+        self._replay_journal()
+        return memory
+    
+    def _reload(self):
+        """Re-read the store after another process has written to it."""
+        with self._write_lock:
+            self._load_memory()
+    
+    def _replay_journal(self):
+        """Apply journal records newer than the loaded snapshot.
+        
+        A torn trailing write from a crash is cut off, so the next append
+        starts on a fresh line instead of being glued to the fragment.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r+b') as f:
+            good_offset = 0
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    record = codec.loads(line)
+                except ValueError:
+                    # Everything before the torn record is intact
+                    f.truncate(good_offset)
+                    break
+                good_offset += len(line)
+                self._journal_records += 1
+                if record["seq"] <= self._journal_seq:
+                    continue
+                self._apply_record(record)
+                self._journal_seq = record["seq"]
+    
+    def _apply_record(self, record: Dict[str, Any]):
+        """Apply a single mutation record to the in-memory store."""
+        op = record["op"]
+        if op == "fact":
+            fact = record["entry"]
+            if isinstance(fact, dict):
+                fact = FactRecord.from_dict(fact, self._next_fact_id)
+            elif fact.id is None:
+                fact.id = self._id_allocator() if self._id_allocator else self._next_fact_id
+            self.memory["facts"].append(fact)
+            self._facts_by_id[fact.id] = fact
+            self._facts_by_category.setdefault(fact.category, []).append(fact.id)
+            self._next_fact_id = max(self._next_fact_id, fact.id + 1)
+            if self.dedup:
+                self._fact_hashes.setdefault(fact_hash(fact.content, fact.category), fact.id)
+            if self._fact_index is not None:
+                self._fact_index.add(fact.id, fact.content)
+            if self._vector_index is not None:
+                self._vector_index.add(fact.id, fact.content)
+            if self.journal:
+                # Freeze the logged form; the live record may change before it is written
+                record["entry"] = fact.to_dict()
+        elif op == "fact_seen":
+            fact = self._facts_by_id.get(record["id"])
+            if fact is not None:
+                fact.timestamp = parse_timestamp(record["timestamp"])
+                fact.hits += 1
+        elif op == "archive":
+            self._evict_facts(record["ids"])
+        elif op == "preference":
+            self.memory["preferences"][record["key"]] = record["entry"]
+        elif op == "entity":
+            self.memory["entities"][record["name"]] = record["entry"]
+            if self._entity_index is not None:
+                self._entity_index.add(record["name"], record["name"])
+            if self._name_index is not None:
+                self._name_index.add(record["name"])
+    
+    def _evict_facts(self, fact_ids: List[int]):
+        """Drop facts from the hot store and every index over it."""
+        evicted = [self._facts_by_id.pop(fact_id) for fact_id in fact_ids
+                   if fact_id in self._facts_by_id]
+        if not evicted:
+            return
+        evicted_ids = {fact.id for fact in evicted}
+        self.memory["facts"] = [fact for fact in self.memory["facts"]
+                                if fact.id not in evicted_ids]
+        for category in {fact.category for fact in evicted}:
+            remaining = [fact_id for fact_id in self._facts_by_category[category]
+                         if fact_id not in evicted_ids]
+            if remaining:
+                self._facts_by_category[category] = remaining
+            else:
+                del self._facts_by_category[category]
+        for fact in evicted:
+            if self._fact_index is not None:
+                self._fact_index.remove(fact.id, fact.content)
+            if self.dedup:
+                key = fact_hash(fact.content, fact.category)
+                if self._fact_hashes.get(key) == fact.id:
+                    del self._fact_hashes[key]
+        if self._vector_index is not None:
+            self._vector_index.remove(evicted_ids)
+    
+    def _encode(self, document: Dict[str, Any]) -> bytes:
+        """Serialize a snapshot in the store's file format."""
+        if self.file_format == FORMAT_SEGMENT:
+            return encode_segment(document, default=json_default)
+        return codec.dumps(document, default=json_default)
     
     def _save_memory(self):
         """Save memory to persistent storage."""
-        with open(self.storage_path, 'w') as f:
-            json.dump(self.memory, f, indent=2)
+        # Saves are serialized so an older snapshot can never overwrite a newer one
+        with self._save_lock:
+            with self._lock.read_lock:
+                document = self.memory
+                if self._journal_seq:
+                    # A journal left by journal mode must not be replayed over this snapshot again
+                    document = dict(document, _journal_seq=self._journal_seq)
+                data = self._encode(document)
+            write_atomic(self.storage_path, data)
+            if self._shared is not None:
+                self._shared.commit()
+    
+    def _append_journal(self, records: List[Dict[str, Any]]):
+        """Append records to the journal, compacting in the background when it grows."""
+        with self._write_lock:
+            if not records:
+                return
+            with open(self.journal_path, 'ab') as f:
+                f.write(_journal_lines(records))
+            self._journal_records += len(records)
+            start_compaction = (self._journal_records >= self.compact_threshold
+                                and not self._compacting)
+            if start_compaction:
+                self._compacting = True
+        if start_compaction:
+            threading.Thread(target=self.compact, daemon=True).start()
+    
+    def _persist(self, record: Dict[str, Any]):
+        """Apply a mutation record and make it durable."""
+        self._persist_records([record])
+    
+    def _dedup_record(self, record: Dict[str, Any]):
+        """Turn a fact record into a ``fact_seen`` refresh if the fact is known."""
+        entry = record["entry"]
+        existing_id = self._fact_hashes.get(fact_hash(entry.content, entry.category))
+        if existing_id is None or existing_id not in self._facts_by_id:
+            return
+        record.clear()
+        record.update({"op": "fact_seen", "id": existing_id,
+                       "timestamp": format_timestamp(entry.timestamp)})
+    
+    @_shared_write
+    def _persist_records(self, records: List[Dict[str, Any]]):
+        """Apply mutation records and make them durable in one step."""
+        if not records:
+            return
+        with self._write_lock:
+            for record in records:
+                if self.dedup and record["op"] == "fact":
+                    self._dedup_record(record)
+                self._apply_record(record)
+                if self.journal:
+                    self._journal_seq += 1
+                    record["seq"] = self._journal_seq
+            if self.journal and self._flusher is not None:
+                self._pending_records.extend(records)
+            elif self.journal:
+                # Replay skips records at or below the last seq, so the log must stay in seq order
+                self._append_journal(records)
+        if self._flusher is not None:
+            self._flusher.mark_dirty()
+        elif not self.journal:
+            self._save_memory()
+    
+    def _flush_pending(self):
+        """Write everything mutated since the last flush in one step."""
+        if not self.journal:
+            self._save_memory()
+            return
+        with self._write_lock:
+            records, self._pending_records = self._pending_records, []
+            self._append_journal(records)
+    
+    def _save_vectors(self):
+        """Write the vector index, if one has been built, next to the store."""
+        if self._vector_index is not None:
+            self._vector_index.save(self.vector_path)
+    
+    def flush(self):
+        """Force deferred writes to disk."""
+        if self._flusher is not None:
+            self._flusher.flush()
+        self._save_vectors()
+    
+    def close(self):
+        """Stop background work and flush pending writes."""
+        if self._retention_scheduler is not None:
+            self._retention_scheduler.stop()
+        if self._flusher is not None:
+            self._flusher.close()
+        self._save_vectors()
+        if self._shared is not None:
+            self._shared.close()
+    
+    def compact(self):
+        """Fold the journal into the JSON snapshot and truncate the log.
+
+        The snapshot is written outside the write lock so appends continue
+        while it is serialized; records appended meanwhile are carried over
+        into the new log. Compactions are serialized with each other and with
+        snapshot saves, which share the temporary file.
+        """
+        with self._save_lock:
+            self._compact()
+    
+    def _compact(self):
+        with self._write_lock:
+            self._compacting = True
+            # Deferred records must reach the log before its offset is taken
+            records, self._pending_records = self._pending_records, []
+            if records:
+                with open(self.journal_path, 'ab') as f:
+                    f.write(_journal_lines(records))
+                self._journal_records += len(records)
+            # Facts are rendered now because records keep changing after the snapshot
+            snapshot = {
+                "facts": [fact.to_dict() for fact in self.memory["facts"]],
+                "preferences": dict(self.memory["preferences"]),
+                "entities": dict(self.memory["entities"]),
+                "_journal_seq": self._journal_seq,
+            }
+            snapshot_records = self._journal_records
+            offset = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        try:
+            tmp_path = self.storage_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(self._encode(snapshot))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.storage_path)
+            
+            with self._write_lock:
+                tail = b""
+                if os.path.exists(self.journal_path):
+                    with open(self.journal_path, 'rb') as f:
+                        f.seek(offset)
+                        tail = f.read()
+                tmp_log = self.journal_path + ".tmp"
+                with open(tmp_log, 'wb') as f:
+                    f.write(tail)
+                os.replace(tmp_log, self.journal_path)
+                self._journal_records -= snapshot_records
+            self._save_vectors()
+        finally:
+            self._compacting = False
+    
+    def _fact_entry(self, fact: str, category: str, timestamp: float) -> FactRecord:
+        """Build a fact record, stamping its expiry when the category has a TTL."""
+        policy = policy_for(self.retention, category)
+        expires_at = timestamp + policy.ttl if policy and policy.ttl is not None else None
+        return FactRecord(None, fact, category, timestamp, expires_at=expires_at)
     
     def store_fact(self, fact: str, category: str = "general"):
         """Store a fact in long-term memory."""
-        fact_entry = {
-            "content": fact,
-            "category": category,
-            "timestamp": datetime.now().isoformat()
-        }
-        self.memory["facts"].append(fact_entry)
-        self._save_memory()
+        fact_entry = self._fact_entry(fact, category, time.time())
+        self._persist({"op": "fact", "entry": fact_entry})
     
     def store_preference(self, key: str, value: Any):
         """Store a user preference."""
-        self.memory["preferences"][key] = {
+        self._persist({"op": "preference", "key": key, "entry": {
             "value": value,
             "timestamp": datetime.now().isoformat()
-        }
-        self._save_memory()
+        }})
     
     def store_entity(self, entity_name: str, entity_data: Dict[str, Any]):
         """Store information about an entity (person, place, thing)."""
-        self.memory["entities"][entity_name] = {
+        self._persist({"op": "entity", "name": entity_name, "entry": {
             "data": entity_data,
             "timestamp": datetime.now().isoformat()
-        }
-        self._save_memory()
+        }})
+    
+    def _store_bulk(self, items: Iterable[Any], normalize: Callable[[Any], tuple],
+                    make_record: Callable[..., Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Validate items, then apply and persist all valid ones together."""
+        results = []
+        stored = []
+        for index, item in enumerate(items):
+            try:
+                record = make_record(*normalize(item))
+            except ValueError as e:
+                results.append({"index": index, "status": "error", "error": str(e)})
+                continue
+            result = {"index": index, "status": "stored"}
+            results.append(result)
+            stored.append((result, record))
+        self._persist_records([record for _, record in stored])
+        for result, record in stored:
+            if record["op"] == "fact":
+                entry = record["entry"]
+                result["id"] = entry["id"] if isinstance(entry, dict) else entry.id
+            elif record["op"] == "fact_seen":
+                result["status"] = "duplicate"
+                result["id"] = record["id"]
+        return results
+    
+    def store_facts_bulk(self, items: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Store many facts with a single persistence step.
+        
+        Items are strings or ``{"fact": ..., "category": ...}`` dicts. Returns
+        one status dict per item, in input order; in dedup mode items matching
+        a stored fact are reported as ``"duplicate"`` with that fact's id.
+        """
+        timestamp = time.time()
+        return self._store_bulk(items, normalize_fact_item, lambda fact, category: {
+            "op": "fact", "entry": self._fact_entry(fact, category, timestamp)})
+    
+    def store_entities_bulk(self, items: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Store many ``{"entity_name": ..., "entity_data": ...}`` items at once."""
+        timestamp = datetime.now().isoformat()
+        return self._store_bulk(items, normalize_entity_item, lambda name, data: {
+            "op": "entity", "name": name, "entry": {"data": data, "timestamp": timestamp}})
+    
+    def store_preferences_bulk(self, items: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Store many ``{"key": ..., "value": ...}`` items at once."""
+        timestamp = datetime.now().isoformat()
+        return self._store_bulk(items, normalize_preference_item, lambda key, value: {
+            "op": "preference", "key": key, "entry": {"value": value, "timestamp": timestamp}})
     
     def retrieve_facts(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
         """Retrieve facts, optionally filtered by category."""
-        if category:
-            return [f for f in self.memory["facts"] if f.get("category") == category]
-        return self.memory["facts"]
+        return list(self.iter_facts(category))
     
+    @_shared_read
+    def recent_facts(self, n: int = 5) -> List[Dict[str, Any]]:
+        """Return the ``n`` most recently stored facts, oldest first."""
+        with self._lock.read_lock:
+            return [fact.to_dict() for fact in self.memory["facts"][-n:]] if n > 0 else []
+    
+    @_shared_read
+    def page_facts(self, category: Optional[str] = None, limit: int = 50,
+                   cursor: Optional[str] = None) -> Page:
+        """Return one page of facts in id order and the cursor for the next page."""
+        with self._lock.read_lock:
+            if not category:
+                return _page_after_id(self.memory["facts"], cursor, limit)
+            fact_ids = self._facts_by_category.get(category, [])
+            start = bisect.bisect_right(fact_ids, decode_cursor(cursor))
+            page = [self._facts_by_id[fact_id].to_dict()
+                    for fact_id in fact_ids[start:start + limit]]
+        next_cursor = encode_cursor(page[-1]["id"]) if start + limit < len(fact_ids) else None
+        return page, next_cursor
+    
+    def page_search(self, query: str, limit: int = 50, cursor: Optional[str] = None,
+                    ranked: bool = False, semantic: bool = False) -> Page:
+        """Return one page of search results and the cursor for the next page.
+        
+        The cursor is a result offset; each page stops matching once the page
+        is full, so the cost follows the offset plus the page size.
+        """
+        offset = decode_cursor(cursor)
+        results = self.search_memory(query, top_k=offset + limit + 1, ranked=ranked,
+                                     semantic=semantic)
+        page = results[offset:offset + limit]
+        next_cursor = encode_cursor(offset + limit) if len(results) > offset + limit else None
+        return page, next_cursor
+    
+    @_shared_read
+    def iter_facts(self, category: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield facts one at a time, optionally filtered by category.
+        
+        The facts to yield are fixed when iteration starts, so no lock is held
+        between items.
+        """
+        with self._lock.read_lock:
+            if category:
+                facts = [self._facts_by_id[fact_id]
+                         for fact_id in self._facts_by_category.get(category, [])]
+            else:
+                facts = list(self.memory["facts"])
+        for fact in facts:
+            yield fact.to_dict()
+    
+    @_shared_read
+    def export_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield every fact, preference and entity as a typed export record."""
+        for fact in self.iter_facts():
+            yield {"type": "fact", "data": fact}
+        with self._lock.read_lock:
+            preferences = list(self.memory["preferences"].items())
+            entities = list(self.memory["entities"].items())
+        for key, entry in preferences:
+            yield {"type": "preference", "key": key, "data": entry}
+        for name, entry in entities:
+            yield {"type": "entity", "name": name, "data": entry}
+    
+    @_shared_read
+    def category_counts(self) -> Dict[str, int]:
+        """Count stored facts per category."""
+        with self._lock.read_lock:
+            return {category: len(fact_ids)
+                    for category, fact_ids in self._facts_by_category.items()}
+    
+    @_shared_write
+    def apply_retention(self) -> int:
+        """Archive facts that break their category's retention policy.
+        
+        Evicted facts are written to the cold archive before they leave the hot
+        store, so a crash in between leaves a copy in both rather than none.
+        Returns the number of facts archived.
+        """
+        if not self.retention:
+            return 0
+        with self._retention_lock:
+            now = time.time()
+            with self._write_lock:
+                evicted_ids = []
+                for category, fact_ids in self._facts_by_category.items():
+                    policy = policy_for(self.retention, category)
+                    if policy is not None:
+                        facts = [self._facts_by_id[fact_id] for fact_id in fact_ids]
+                        evicted_ids.extend(policy.evicted_ids(facts, now))
+                evicted_ids.sort()
+                facts = [self._facts_by_id[fact_id].to_dict() for fact_id in evicted_ids]
+            if not facts:
+                return 0
+            self.archive.append(facts)
+            self._persist({"op": "archive", "ids": evicted_ids})
+            return len(facts)
+    
+    @_shared_read
+    def search_archive(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search archived facts; this scans the cold archive on every call."""
+        with self._lock.read_lock:
+            hot_ids = set(self._facts_by_id)
+        return self.archive.search(query, top_k=top_k, exclude_ids=hot_ids)
+    
+    @_shared_read
+    def stats(self) -> Dict[str, Any]:
+        """Report the size of the hot store and the cold archive."""
+        hot_bytes = sum(os.path.getsize(path) for path in (self.storage_path, self.journal_path)
+                        if os.path.exists(path))
+        with self._lock.read_lock:
+            hot = {
+                "facts": len(self._facts_by_id),
+                "preferences": len(self.memory["preferences"]),
+                "entities": len(self.memory["entities"]),
+                "bytes": hot_bytes
+            }
+        return {
+            "hot": hot,
+            "cold": {
+                "facts": self.archive.count(),
+                "bytes": self.archive.size_bytes
+            }
+        }
+    
+    @_shared_read
     def retrieve_preference(self, key: str) -> Optional[Any]:
         """Retrieve a stored preference."""
-        pref = self.memory["preferences"].get(key)
+        with self._lock.read_lock:
+            pref = self.memory["preferences"].get(key)
         return pref["value"] if pref else None
     
+    @_shared_read
+    def retrieve_preferences(self) -> Dict[str, Any]:
+        """Retrieve all preferences with their timestamps."""
+        with self._lock.read_lock:
+            return dict(self.memory["preferences"])
+    
+    @_shared_read
     def retrieve_entity(self, entity_name: str) -> Optional[Dict[str, Any]]:
         """Retrieve information about an entity."""
-        entity = self.memory["entities"].get(entity_name)
+        with self._lock.read_lock:
+            entity = self.memory["entities"].get(entity_name)
         return entity["data"] if entity else None
     
-    def search_memory(self, query: str) -> List[Dict[str, Any]]:
-        """Search through long-term memory."""
+    def _ensure_name_index(self) -> NameIndex:
+        """Build the entity name index on first use."""
+        if self._name_index is None:
+            with self._write_lock:
+                if self._name_index is None:
+                    self._name_index = NameIndex.build(self.memory["entities"])
+        return self._name_index
+    
+    @_shared_read
+    def complete_entities(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return entities whose names start with ``prefix`` (any case), in name order."""
+        index = self._ensure_name_index()
+        with self._lock.read_lock:
+            return [{"name": name, "data": self.memory["entities"][name]["data"]}
+                    for name in index.prefix(prefix, limit)]
+    
+    @_shared_read
+    def find_entities(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Find entities with names similar to ``query``, tolerating typos.
+        
+        Names are compared by trigram similarity, returned best first with
+        the similarity (1.0 for an exact match) as ``"score"``.
+        """
+        index = self._ensure_name_index()
+        with self._lock.read_lock:
+            return [{"name": name, "score": score, "data": self.memory["entities"][name]["data"]}
+                    for score, name in index.fuzzy(query, limit)]
+    
+    def _ensure_indexes(self):
+        """Build the token indexes on first use."""
+        if self._fact_index is not None and self._entity_index is not None:
+            return
+        with self._write_lock:
+            if self._fact_index is None:
+                self._fact_index = TokenIndex.build(
+                    (fact.id, fact.content) for fact in self.memory["facts"])
+            if self._entity_index is None:
+                self._entity_index = TokenIndex.build(
+                    (name, name) for name in self.memory["entities"])
+    
+    def _ensure_vectors(self):
+        """Load the saved vector index, or build it, and bring it up to date."""
+        if not self.vector:
+            raise ValueError("Semantic search requires a store created with vector=True")
+        # Checked without the lock so queries against a built index run concurrently
+        index = self._vector_index
+        if index is not None:
+            return index
+        with self._write_lock:
+            if self._vector_index is None:
+                index = VectorIndex.load(self.vector_path) or VectorIndex()
+                index.sync((fact.id, fact.content) for fact in self.memory["facts"])
+                self._vector_index = index
+            return self._vector_index
+    
+    @_shared_read
+    def search_memory(self, query: str, top_k: Optional[int] = None,
+                      ranked: bool = False, semantic: bool = False) -> List[Dict[str, Any]]:
+        """Search through long-term memory.
+        
+        Candidates come from the token index, so a query matches whole tokens
+        (``"youtube"`` finds ``"YouTube streaming"`` but ``"tube"`` does not);
+        multi-token queries must also appear as a contiguous substring.
+        
+        With ``ranked=True`` any query token may match and results are ordered
+        by BM25 score (included as ``"score"``), keeping only the best
+        ``top_k`` (default 10). Otherwise ``top_k`` truncates the results.
+        
+        With ``semantic=True`` (stores created with ``vector=True``) the
+        ``top_k`` facts most similar to the query are returned with their
+        cosine similarity as ``"score"``, even without exact token matches.
+        """
+        if semantic:
+            return self._search_semantic(query, top_k or 10)
+        if ranked:
+            return self._search_ranked(query, top_k or 10)
+        tokens = tokenize(query)
+        if tokens:
+            self._ensure_indexes()
+        with self._lock.read_lock:
+            return self._search_plain(query, tokens, top_k)
+    
+    def _search_plain(self, query: str, tokens: List[str],
+                      top_k: Optional[int]) -> List[Dict[str, Any]]:
+        """Return facts, then entities, containing the query; needs the read lock."""
         results = []
         query_lower = query.lower()
         
+        if not tokens:
+            # Nothing indexable (e.g. punctuation only); fall back to a scan
+            fact_ids = [fact.id for fact in self.memory["facts"]]
+            entity_names = list(self.memory["entities"])
+        else:
+            fact_ids = self._fact_index.lookup(tokens)
+            entity_names = self._entity_index.lookup(tokens)
+        
         # Search facts
-        for fact in self.memory["facts"]:
-            if query_lower in fact["content"].lower():
-                results.append({"type": "fact", "data": fact})
+        for fact_id in fact_ids:
+            fact = self._facts_by_id[fact_id]
+            if query_lower in fact.content.lower():
+                results.append({"type": "fact", "data": fact.to_dict()})
+                if top_k is not None and len(results) >= top_k:
+                    return results
         
         # Search entities
-        for name, entity in self.memory["entities"].items():
+        for name in entity_names:
             if query_lower in name.lower():
-                results.append({"type": "entity", "name": name, "data": entity})
+                results.append({"type": "entity", "name": name, "data": self.memory["entities"][name]})
+                if top_k is not None and len(results) >= top_k:
+                    return results
         
         return results
+    
+    def _search_semantic(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` facts closest to the query by cosine similarity."""
+        results = []
+        matches = self._ensure_vectors().query(query, top_k)
+        with self._lock.read_lock:
+            for score, fact_id in matches:
+                fact = self._facts_by_id.get(fact_id)
+                # A fact archived after the query snapshot was taken is skipped
+                if fact is not None:
+                    results.append({"type": "fact", "score": score, "data": fact.to_dict()})
+        return results
+    
+    def _search_ranked(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` facts and entities with the best BM25 scores."""
+        tokens = tokenize(query)
+        self._ensure_indexes()
+        with self._lock.read_lock:
+            results = [{"type": "fact", "score": score,
+                        "data": self._facts_by_id[fact_id].to_dict()}
+                       for score, fact_id in self._fact_index.rank(tokens, top_k)]
+            results.extend({"type": "entity", "score": score, "name": name,
+                            "data": self.memory["entities"][name]}
+                           for score, name in self._entity_index.rank(tokens, top_k))
+        # Both lists are already sorted; the stable sort keeps facts ahead on ties
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:top_k]
 
 
 class GoalsManager:
-    """Manages user goals and objectives."""
+    """Manages user goals and objectives.
     
-    def __init__(self, storage_path: str = "data/goals.json"):
+    ``durability`` works as for LongTermMemory: ``"deferred"`` batches saves
+    on a background thread until ``flush()`` or ``close()``. Reads run
+    concurrently and writes are serialized by a ReadWriteLock. ``shared`` and
+    ``file_format`` work as for LongTermMemory.
+    """
+    
+    def __init__(self, storage_path: str = "data/goals.json",
+                 durability: str = DURABILITY_SYNC, flush_interval_ms: int = 200,
+                 flush_max_pending: int = 100, shared: bool = False,
+                 file_format: str = FORMAT_JSON):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability '{durability}'; expected one of {DURABILITY_MODES}")
+        if file_format not in FILE_FORMATS:
+            raise ValueError(f"Unknown file format '{file_format}'; expected one of {FILE_FORMATS}")
+        if shared and durability != DURABILITY_SYNC:
+            raise ValueError("shared=True requires durability='sync'")
         self.storage_path = storage_path
+        self.durability = durability
+        self.file_format = file_format
+        self._lock = ReadWriteLock()
+        self._write_lock = self._lock.write_lock
+        self._save_lock = threading.Lock()
+        self._flusher: Optional[BackgroundFlusher] = None
+        if durability == DURABILITY_DEFERRED:
+            self._flusher = BackgroundFlusher(self._save_goals, flush_interval_ms,
+                                              flush_max_pending)
         # Ensure data directory exists
         os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
-        self.goals: Dict[str, Any] = self._load_goals()
+        self._shared: Optional[SharedStore] = None
+        if shared:
+            self._shared = SharedStore(storage_path, self._reload)
+            self._shared.sync()
+        else:
+            self.goals: Dict[str, List[GoalRecord]] = self._load_goals()
     
-    def _load_goals(self) -> Dict[str, Any]:
+    def _load_goals(self) -> Dict[str, List[GoalRecord]]:
         """Load goals from persistent storage."""
         if os.path.exists(self.storage_path):
             try:
-                with open(self.storage_path, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
+                data = load_document(self.storage_path)
+            except (codec.JSONDecodeError, SegmentError):
                 return {"active_goals": [], "completed_goals": []}
+            return {key: [GoalRecord.from_dict(goal) for goal in data.get(key, [])]
+                    for key in ("active_goals", "completed_goals")}
         return {"active_goals": [], "completed_goals": []}
     
+    def _reload(self):
+        """Re-read the goals after another process has written to them."""
+        with self._write_lock:
+            self.goals = self._load_goals()
+    
     def _save_goals(self):
         """Save goals to persistent storage."""
-        with open(self.storage_path, 'w') as f:
-            json.dump(self.goals, f, indent=2)
+        with self._save_lock:
+            with self._lock.read_lock:
+                if self.file_format == FORMAT_SEGMENT:
+                    data = encode_segment(self.goals, default=json_default)
+                else:
+                    data = codec.dumps(self.goals, default=json_default)
+            write_atomic(self.storage_path, data)
+            if self._shared is not None:
+                self._shared.commit()
     
+    def _persist(self):
+        """Save now, or hand the write to the background flusher."""
+        if self._flusher is not None:
+            self._flusher.mark_dirty()
+        else:
+            self._save_goals()
+    
+    def _find_active(self, goal_id: int) -> Optional[GoalRecord]:
+        for goal in self.goals["active_goals"]:
+            if goal.id == goal_id:
+                return goal
+        return None
+    
+    def flush(self):
+        """Force deferred writes to disk."""
+        if self._flusher is not None:
+            self._flusher.flush()
+    
+    def close(self):
+        """Flush pending writes and stop the background flusher."""
+        if self._flusher is not None:
+            self._flusher.close()
+        if self._shared is not None:
+            self._shared.close()
+    
+    @_shared_write
     def add_goal(self, title: str, description: str, priority: str = "medium", 
                  target_date: Optional[str] = None):
         """Add a new goal."""
-        goal = {
-            "id": len(self.goals["active_goals"]) + len(self.goals["completed_goals"]) + 1,
-            "title": title,
-            "description": description,
-            "priority": priority,
-            "target_date": target_date,
-            "status": "active",
-            "progress": 0,
-            "created_at": datetime.now().isoformat(),
-            "milestones": []
-        }
-        self.goals["active_goals"].append(goal)
-        self._save_goals()
-        return goal
+        with self._write_lock:
+            goal = GoalRecord(
+                len(self.goals["active_goals"]) + len(self.goals["completed_goals"]) + 1,
+                title, description, priority, target_date, created_at=time.time())
+            self.goals["active_goals"].append(goal)
+            result = goal.to_dict()
+        self._persist()
+        return result
     
+    @_shared_write
     def update_goal_progress(self, goal_id: int, progress: int):
         """Update progress on a goal (0-100)."""
-        for goal in self.goals["active_goals"]:
-            if goal["id"] == goal_id:
-                goal["progress"] = min(100, max(0, progress))
-                goal["last_updated"] = datetime.now().isoformat()
-                self._save_goals()
-                return True
-        return False
+        with self._write_lock:
+            goal = self._find_active(goal_id)
+            if goal is None:
+                return False
+            goal.progress = min(100, max(0, progress))
+            goal.last_updated = time.time()
+        self._persist()
+        return True
     
+    @_shared_write
     def complete_goal(self, goal_id: int):
         """Mark a goal as completed."""
-        for i, goal in enumerate(self.goals["active_goals"]):
-            if goal["id"] == goal_id:
-                goal["status"] = "completed"
-                goal["progress"] = 100
-                goal["completed_at"] = datetime.now().isoformat()
-                self.goals["completed_goals"].append(goal)
-                self.goals["active_goals"].pop(i)
-                self._save_goals()
-                return True
-        return False
+        with self._write_lock:
+            goal = self._find_active(goal_id)
+            if goal is None:
+                return False
+            goal.status = "completed"
+            goal.progress = 100
+            goal.completed_at = time.time()
+            self.goals["completed_goals"].append(goal)
+            self.goals["active_goals"].remove(goal)
+        self._persist()
+        return True
     
+    @_shared_write
     def add_milestone(self, goal_id: int, milestone: str):
         """Add a milestone to a goal."""
-        for goal in self.goals["active_goals"]:
-            if goal["id"] == goal_id:
-                goal["milestones"].append({
-                    "description": milestone,
-                    "achieved": False,
-                    "timestamp": datetime.now().isoformat()
-                })
-                self._save_goals()
-                return True
-        return False
+        with self._write_lock:
+            goal = self._find_active(goal_id)
+            if goal is None:
+                return False
+            goal.milestones.append((milestone, False, time.time()))
+        self._persist()
+        return True
     
+    @_shared_read
     def get_active_goals(self) -> List[Dict[str, Any]]:
         """Retrieve all active goals."""
-        return self.goals["active_goals"]
+        with self._lock.read_lock:
+            return [goal.to_dict() for goal in self.goals["active_goals"]]
     
+    @_shared_read
+    def page_goals(self, limit: int = 50, cursor: Optional[str] = None) -> Page:
+        """Return one page of active goals and the cursor for the next page."""
+        with self._lock.read_lock:
+            return _page_after_id(self.goals["active_goals"], cursor, limit)
+    
+    @_shared_read
+    def get_completed_goals(self) -> List[Dict[str, Any]]:
+        """Retrieve all completed goals."""
+        with self._lock.read_lock:
+            return [goal.to_dict() for goal in self.goals["completed_goals"]]
+    
+    @_shared_read
+    def export_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield every active and completed goal as a typed export record."""
+        with self._lock.read_lock:
+            goals = self.goals["active_goals"] + self.goals["completed_goals"]
+        for goal in goals:
+            yield {"type": "goal", "data": goal.to_dict()}
+    
+    @_shared_read
     def get_goal_by_id(self, goal_id: int) -> Optional[Dict[str, Any]]:
         """Retrieve a specific goal by ID."""
-        for goal in self.goals["active_goals"]:
-            if goal["id"] == goal_id:
-                return goal
-        for goal in self.goals["completed_goals"]:
-            if goal["id"] == goal_id:
-                return goal
+        with self._lock.read_lock:
+            for goal in self.goals["active_goals"]:
+                if goal.id == goal_id:
+                    return goal.to_dict()
+            for goal in self.goals["completed_goals"]:
+                if goal.id == goal_id:
+                    return goal.to_dict()
         return None
 
 
 class MemoryManager:
-    """Main memory manager integrating all memory types."""
+    """Main memory manager integrating all memory types.
+    
+    ``backend`` selects the persistence layer: ``"json"`` (the default) keeps
+    each store in a JSON file, ``"sqlite"`` keeps both in ``memory.db`` and
+    ``"sharded"`` splits long-term memory into one JSON file per fact category
+    under ``long_term/``.
+    
+    The long-term and goals stores are opened on first access, so a command
+    that only touches goals never parses the long-term memory file.
+    ``prefetch()`` opens both on a background thread instead.
+    
+    ``shared=True`` makes the JSON and sharded stores safe to use from several
+    processes at once (see LongTermMemory); SQLite needs no extra setup.
+    ``file_format="segment"`` stores the ``"json"`` backend's files in the
+    binary segment format as ``long_term_memory.seg`` and ``goals.seg``;
+    existing ``.json`` files keep their names and are converted when next
+    saved.
+    
+    ``conversational`` is a ConversationSessions registry: each chat keeps its
+    history in ``conversational.session(session_id)``, and all sessions
+    together hold at most ``session_max_messages`` messages and
+    ``session_max_bytes`` bytes, evicting idle sessions least recently used
+    first. With ``conversation_log=True`` each session is logged under
+    ``conversations/`` and its history survives restarts. ``tokenizer``
+    counts message tokens for ``get_history(max_tokens=...)`` and
+    ``get_full_context(max_tokens=...)``.
+    """
+    
+    BACKENDS = ("json", "sqlite", "sharded")
     
-    def __init__(self, data_dir: str = "./data"):
+    def __init__(self, data_dir: str = "./data", journal: bool = False, backend: str = "json",
+                 durability: str = DURABILITY_SYNC, flush_interval_ms: int = 200,
+                 flush_max_pending: int = 100, dedup: bool = False,
+                 retention: Optional[Dict[str, Any]] = None,
+                 retention_interval: Optional[float] = None, vector: bool = False,
+                 shared: bool = False, file_format: str = FORMAT_JSON,
+                 session_max_messages: int = 1_000_000,
+                 session_max_bytes: int = 256 * 1024 * 1024,
+                 conversation_log: bool = False, tokenizer: Optional[Tokenizer] = None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown memory backend '{backend}'; expected one of {self.BACKENDS}")
+        if file_format != FORMAT_JSON and backend != "json":
+            raise ValueError("file_format applies only to the 'json' backend")
         os.makedirs(data_dir, exist_ok=True)
-        self.conversational = ConversationalMemory()
-        self.long_term = LongTermMemory(os.path.join(data_dir, "long_term_memory.json"))
-        self.goals = GoalsManager(os.path.join(data_dir, "goals.json"))
+        self.backend = backend
+        self.conversational = ConversationSessions(
+            max_messages=session_max_messages, max_bytes=session_max_bytes,
+            log_dir=os.path.join(data_dir, "conversations") if conversation_log else None,
+            tokenizer=tokenizer)
+        self._stores: Dict[str, Any] = {}
+        self._prefetch_lock = threading.Lock()
+        self._prefetch_thread: Optional[threading.Thread] = None
+        if backend == "sqlite":
+            db_path = os.path.join(data_dir, "memory.db")
+            self._factories = {
+                "long_term": lambda: SQLiteLongTermMemory(
+                    db_path, dedup=dedup, retention=retention,
+                    retention_interval=retention_interval, vector=vector),
+                "goals": lambda: SQLiteGoalsManager(db_path),
+            }
+        else:
+            flush_options = {"durability": durability, "flush_interval_ms": flush_interval_ms,
+                             "flush_max_pending": flush_max_pending}
+            store_options = {"journal": journal, "dedup": dedup, "retention": retention,
+                             "retention_interval": retention_interval, "vector": vector,
+                             "shared": shared, **flush_options}
+            if backend == "sharded":
+                # Imported here because the sharded store is built from LongTermMemory
+                from .sharded_storage import ShardedLongTermMemory
+                long_term = lambda: ShardedLongTermMemory(os.path.join(data_dir, "long_term"),
+                                                          **store_options)
+            else:
+                long_term = lambda: LongTermMemory(
+                    _store_file(data_dir, "long_term_memory", file_format),
+                    file_format=file_format, **store_options)
+            self._factories = {
+                "long_term": long_term,
+                "goals": lambda: GoalsManager(_store_file(data_dir, "goals", file_format),
+                                              shared=shared, file_format=file_format,
+                                              **flush_options),
+            }
+        # One lock per store, so loading a large store never delays the others
+        self._store_locks = {name: threading.Lock() for name in self._factories}
     
-    def process_interaction(self, user_input: str, assistant_response: str):
+    def _store(self, name: str):
+        """Return the named store, opening it on first use."""
+        store = self._stores.get(name)
+        if store is None:
+            with self._store_locks[name]:
+                store = self._stores.get(name)
+                if store is None:
+                    store = self._factories[name]()
+                    self._stores[name] = store
+        return store
+    
+    @property
+    def long_term(self):
+        """The long-term memory store, loaded on first access."""
+        return self._store("long_term")
+    
+    @property
+    def goals(self):
+        """The goals store, loaded on first access."""
+        return self._store("goals")
+    
+    def prefetch(self) -> threading.Thread:
+        """Open every store on a background thread and return that thread.
+        
+        Requests that arrive meanwhile wait for the store they need rather
+        than loading it a second time.
+        """
+        with self._prefetch_lock:
+            if self._prefetch_thread is None:
+                self._prefetch_thread = threading.Thread(target=self._prefetch, daemon=True)
+                self._prefetch_thread.start()
+        return self._prefetch_thread
+    
+    def _prefetch(self):
+        for name in self._factories:
+            try:
+                self._store(name)
+            except Exception:
+                # Leave the error to surface on the first real access
+                logger.exception("Prefetching %s memory failed", name)
+    
+    def flush(self):
+        """Force any deferred writes to disk."""
+        for store in list(self._stores.values()):
+            store.flush()
+    
+    def close(self):
+        """Flush pending writes and release storage resources."""
+        if self._prefetch_thread is not None:
+            self._prefetch_thread.join()
+        for store in list(self._stores.values()):
+            store.close()
+    
+    def process_interaction(self, user_input: str, assistant_response: str,
+                            session_id: Optional[str] = None):
         """Process a complete interaction and store in conversational memory."""
-        self.conversational.add_message("user", user_input)
-        self.conversational.add_message("assistant", assistant_response)
+        session = self.conversational.session(session_id)
+        session.add_message("user", user_input)
+        session.add_message("assistant", assistant_response)
     
-    def get_full_context(self) -> Dict[str, Any]:
-        """Get complete context from all memory types."""
+    def get_full_context(self, session_id: Optional[str] = None,
+                         max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Get complete context from all memory types.
+        
+        The conversation history holds the last 10 messages, or with
+        ``max_tokens`` as many of the newest messages as fit that many tokens.
+        """
+        session = self.conversational.session(session_id)
+        if max_tokens is None:
+            history = session.get_history(last_n=10)
+        else:
+            history = session.get_history(max_tokens=max_tokens)
         return {
-            "conversation_history": self.conversational.get_history(last_n=10),
-            "recent_facts": self.long_term.retrieve_facts()[-5:],
+            "conversation_history": history,
+            "recent_facts": self.long_term.recent_facts(5),
             "active_goals": self.goals.get_active_goals(),
-            "preferences": self.long_term.memory.get("preferences", {})
+            "preferences": self.long_term.retrieve_preferences()
         }
@@ -0,0 +1,153 @@
+"""
+Persistence helpers for AI Live Genie
+Shared machinery for deciding when in-memory stores are written to disk.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import BinaryIO, Callable, List, Tuple
+
+
+# Durability modes accepted by the persistent stores
+DURABILITY_SYNC = "sync"
+DURABILITY_DEFERRED = "deferred"
+DURABILITY_MODES = (DURABILITY_SYNC, DURABILITY_DEFERRED)
+
+# Longest wait between retries after the background flush keeps failing
+MAX_RETRY_DELAY = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+def write_atomic(path: str, data: bytes):
+    """Replace ``path`` with ``data`` via a temporary file, so it is never torn."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_tail_lines(f: BinaryIO, count: int,
+                    block_size: int = 64 * 1024) -> Tuple[List[bytes], int, bool]:
+    """Read the last ``count`` complete lines of a file by seeking back from its end.
+
+    Returns ``(lines, end, whole)``: the lines without their newlines, the
+    offset just past the last complete line (anything after it is a torn
+    write) and whether the lines read reach back to the start of the file.
+    Only about ``count`` lines are read, however long the file is.
+    """
+    size = f.seek(0, os.SEEK_END)
+    pos = size
+    blocks: List[bytes] = []
+    newlines = 0
+    while pos > 0 and newlines <= count:
+        step = min(block_size, pos)
+        pos -= step
+        f.seek(pos)
+        block = f.read(step)
+        blocks.append(block)
+        newlines += block.count(b"\n")
+    data = b"".join(reversed(blocks))
+    lines = data.split(b"\n")
+    end = size - len(lines.pop())
+    if pos > 0:
+        # The first piece may start mid-line
+        lines = lines[1:]
+    whole = pos == 0 and len(lines) <= count
+    return lines[-count:] if count > 0 else [], end, whole
+
+
+class BackgroundFlusher:
+    """Group-commits writes for a store on a background thread.
+
+    Stores call ``mark_dirty()`` after each mutation instead of writing to
+    disk. The flusher runs ``flush_fn`` at most every ``interval_ms``
+    milliseconds, or sooner once ``max_pending`` mutations are waiting, so a
+    burst of writes costs one disk write. Pending writes are flushed on
+    ``close()`` and at interpreter exit.
+
+    A failed background flush is logged and its writes stay pending; the
+    flusher retries after a delay that doubles with each consecutive
+    failure, up to MAX_RETRY_DELAY seconds.
+    """
+
+    def __init__(self, flush_fn: Callable[[], None], interval_ms: int = 200,
+                 max_pending: int = 100):
+        self.flush_fn = flush_fn
+        self.interval = interval_ms / 1000.0
+        self.max_pending = max_pending
+        self._pending = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        atexit.register(self.close)
+
+    @property
+    def pending(self) -> int:
+        """Number of mutations not yet flushed."""
+        return self._pending
+
+    def mark_dirty(self):
+        """Record a mutation and wake the flusher if enough have accumulated."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Store has been closed")
+            self._pending += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            if self._pending == 1 or self._pending >= self.max_pending:
+                self._condition.notify()
+
+    def _run(self):
+        retry_delay = 0.0
+        while True:
+            with self._condition:
+                # After a failure, wait out the back-off unless the flusher is closed
+                deadline = time.monotonic() + retry_delay
+                while not self._closed and time.monotonic() < deadline:
+                    self._condition.wait(deadline - time.monotonic())
+                while not self._closed and not self._pending:
+                    self._condition.wait()
+                # Let the batch grow for one interval unless it is already full
+                if not self._closed and self._pending < self.max_pending:
+                    self._condition.wait(self.interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                retry_delay = 0.0
+            except Exception:
+                retry_delay = min(max(2 * retry_delay, self.interval), MAX_RETRY_DELAY)
+                logger.exception("Background flush failed; retrying in %.1fs", retry_delay)
+
+    def flush(self):
+        """Write pending mutations now, if there are any."""
+        with self._flush_lock:
+            with self._condition:
+                pending = self._pending
+                self._pending = 0
+            if not pending:
+                return
+            try:
+                self.flush_fn()
+            except Exception:
+                with self._condition:
+                    self._pending += pending
+                raise
+
+    def close(self):
+        """Stop the background thread and flush whatever is pending."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+        atexit.unregister(self.close)
@@ -0,0 +1,252 @@
+"""
+Record helpers for AI Live Genie
+Compact record types held by the in-memory stores, validation of the items
+they accept, serialization of the records they export and the cursors used
+to page through them.
+"""
+
+import hashlib
+import re
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import codec
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """Convert an ISO-8601 string (or a number) to a POSIX timestamp."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
+def format_timestamp(value: Optional[float]) -> Optional[str]:
+    """Render a POSIX timestamp in the ISO-8601 form used by the public API."""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value).isoformat()
+
+
+def _intern(value: Any) -> Any:
+    """Intern repeated strings such as categories and roles."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class FactRecord:
+    """A stored fact.
+
+    Records use ``__slots__`` and keep timestamps as floats, which takes a
+    fraction of the memory of a dict holding ISO strings. ``to_dict()``
+    produces the public form returned by the API.
+    """
+
+    __slots__ = ("id", "content", "category", "timestamp", "hits", "expires_at")
+
+    def __init__(self, fact_id: Optional[int], content: str, category: str, timestamp: float,
+                 hits: int = 1, expires_at: Optional[float] = None):
+        self.id = fact_id
+        self.content = content
+        self.category = _intern(category)
+        self.timestamp = timestamp
+        self.hits = hits
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], default_id: Optional[int] = None) -> "FactRecord":
+        """Build a record from its public form; ``default_id`` fills a missing id."""
+        return cls(data.get("id", default_id), data["content"], data.get("category"),
+                   parse_timestamp(data["timestamp"]), data.get("hits", 1),
+                   parse_timestamp(data.get("expires_at")))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the public form of the fact."""
+        fact = {"id": self.id, "content": self.content, "category": self.category,
+                "timestamp": format_timestamp(self.timestamp)}
+        if self.hits > 1:
+            fact["hits"] = self.hits
+        if self.expires_at is not None:
+            fact["expires_at"] = format_timestamp(self.expires_at)
+        return fact
+
+
+class MessageRecord:
+    """A conversation message; see FactRecord for the storage rationale.
+
+    ``tokens`` caches the message's token count and ``token_end`` the running
+    total of tokens up to and including it, so the tokens in any run of
+    consecutive messages is a difference of two totals.
+    """
+
+    __slots__ = ("id", "role", "content", "timestamp", "metadata", "tokens", "token_end")
+
+    def __init__(self, message_id: int, role: str, content: str, timestamp: float,
+                 metadata: Optional[Dict[str, Any]] = None, tokens: int = 0,
+                 token_end: int = 0):
+        self.id = message_id
+        self.role = _intern(role)
+        self.content = content
+        self.timestamp = timestamp
+        self.metadata = metadata or None
+        self.tokens = tokens
+        self.token_end = token_end
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MessageRecord":
+        """Build a record from its public form."""
+        return cls(data["id"], data["role"], data["content"], parse_timestamp(data["timestamp"]),
+                   data.get("metadata"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the public form of the message."""
+        return {"id": self.id, "role": self.role, "content": self.content,
+                "timestamp": format_timestamp(self.timestamp),
+                "metadata": self.metadata if self.metadata is not None else {}}
+
+
+class GoalRecord:
+    """A goal; milestones are ``(description, achieved, timestamp)`` tuples."""
+
+    __slots__ = ("id", "title", "description", "priority", "target_date", "status",
+                 "progress", "created_at", "last_updated", "completed_at", "milestones")
+
+    def __init__(self, goal_id: int, title: str, description: str, priority: str = "medium",
+                 target_date: Optional[str] = None, status: str = "active", progress: int = 0,
+                 created_at: Optional[float] = None, last_updated: Optional[float] = None,
+                 completed_at: Optional[float] = None,
+                 milestones: Optional[List[Tuple[str, bool, float]]] = None):
+        self.id = goal_id
+        self.title = title
+        self.description = description
+        self.priority = _intern(priority)
+        self.target_date = target_date
+        self.status = _intern(status)
+        self.progress = progress
+        self.created_at = created_at
+        self.last_updated = last_updated
+        self.completed_at = completed_at
+        self.milestones = milestones if milestones is not None else []
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GoalRecord":
+        """Build a record from its public form."""
+        milestones = [(m["description"], m.get("achieved", False),
+                       parse_timestamp(m.get("timestamp")))
+                      for m in data.get("milestones", [])]
+        return cls(data["id"], data.get("title"), data.get("description"),
+                   data.get("priority", "medium"), data.get("target_date"),
+                   data.get("status", "active"), data.get("progress", 0),
+                   parse_timestamp(data.get("created_at")),
+                   parse_timestamp(data.get("last_updated")),
+                   parse_timestamp(data.get("completed_at")), milestones)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the public form of the goal."""
+        goal = {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "priority": self.priority,
+            "target_date": self.target_date,
+            "status": self.status,
+            "progress": self.progress,
+            "created_at": format_timestamp(self.created_at),
+            "milestones": [{"description": description, "achieved": achieved,
+                            "timestamp": format_timestamp(timestamp)}
+                           for description, achieved, timestamp in self.milestones]
+        }
+        if self.last_updated is not None:
+            goal["last_updated"] = format_timestamp(self.last_updated)
+        if self.completed_at is not None:
+            goal["completed_at"] = format_timestamp(self.completed_at)
+        return goal
+
+
+def json_default(value: Any) -> Any:
+    """JSON encoder hook that writes records in their public form."""
+    if isinstance(value, (FactRecord, MessageRecord, GoalRecord)):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def fact_hash(content: str, category: str) -> bytes:
+    """Hash a fact's normalized content and category for duplicate detection.
+
+    Case and runs of whitespace are ignored, so "Streams  on Fridays" and
+    "streams on fridays" in the same category are the same fact.
+    """
+    normalized = _WHITESPACE_RE.sub(" ", content.strip().lower())
+    return hashlib.blake2b(f"{category}\0{normalized}".encode("utf-8"), digest_size=16).digest()
+
+
+def normalize_fact_item(item: Any) -> Tuple[str, str]:
+    """Return ``(fact, category)`` for a bulk fact item.
+
+    Items are either a plain string or a dict shaped like the body of
+    ``POST /api/memory/fact``. Raises ValueError for invalid items.
+    """
+    if isinstance(item, str):
+        fact, category = item, "general"
+    elif isinstance(item, dict):
+        fact, category = item.get("fact"), item.get("category")
+        if category is None or category == "":
+            category = "general"
+    else:
+        raise ValueError("Item must be a string or an object")
+    if not fact or not isinstance(fact, str):
+        raise ValueError("Fact is required")
+    if not isinstance(category, str):
+        raise ValueError("Category must be a string")
+    return fact, category
+
+
+def normalize_entity_item(item: Any) -> Tuple[str, Dict[str, Any]]:
+    """Return ``(entity_name, entity_data)`` for a bulk entity item."""
+    if not isinstance(item, dict):
+        raise ValueError("Item must be an object")
+    entity_name, entity_data = item.get("entity_name"), item.get("entity_data")
+    if not entity_name or not entity_data:
+        raise ValueError("Entity name and data are required")
+    if not isinstance(entity_name, str):
+        raise ValueError("Entity name must be a string")
+    return entity_name, entity_data
+
+
+def normalize_preference_item(item: Any) -> Tuple[str, Any]:
+    """Return ``(key, value)`` for a bulk preference item."""
+    if not isinstance(item, dict):
+        raise ValueError("Item must be an object")
+    key, value = item.get("key"), item.get("value")
+    if not key or value is None:
+        raise ValueError("Key and value are required")
+    if not isinstance(key, str):
+        raise ValueError("Key must be a string")
+    return key, value
+
+
+def ndjson_lines(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Serialize records lazily as newline-delimited JSON."""
+    for record in records:
+        yield codec.dumps(record).decode("utf-8") + "\n"
+
+
+def encode_cursor(position: int) -> str:
+    """Encode a page position (usually the last record id) as a cursor."""
+    return str(position)
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Decode a cursor from ``encode_cursor``; ``None`` means the first page."""
+    if cursor is None or cursor == "":
+        return 0
+    try:
+        position = int(cursor)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+    if position < 0:
+        raise ValueError("Invalid cursor")
+    return position
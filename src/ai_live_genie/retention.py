@@ -0,0 +1,195 @@
+"""
+Retention for AI Live Genie
+Per-category rules that move old or surplus facts out of the hot store into
+a compressed cold archive, which stays searchable on demand.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from .records import FactRecord
+from .search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Policy key that applies to categories without a policy of their own
+DEFAULT_POLICY = "*"
+
+
+class RetentionPolicy:
+    """Retention rules for one category of facts.
+
+    ``max_age`` archives facts not stored or refreshed within that many
+    seconds, ``max_count`` keeps only the newest facts, and ``ttl`` stamps new
+    facts with an ``expires_at`` after which they are archived even if they
+    are refreshed later.
+    """
+
+    def __init__(self, max_age: Optional[float] = None, max_count: Optional[int] = None,
+                 ttl: Optional[float] = None):
+        if max_count is not None and max_count < 0:
+            raise ValueError("max_count must not be negative")
+        self.max_age = max_age
+        self.max_count = max_count
+        self.ttl = ttl
+
+    def __repr__(self) -> str:
+        return (f"RetentionPolicy(max_age={self.max_age!r}, max_count={self.max_count!r}, "
+                f"ttl={self.ttl!r})")
+
+    def expires_at(self, timestamp: str) -> Optional[str]:
+        """Return the expiry to stamp on a fact stored at ``timestamp``."""
+        if self.ttl is None:
+            return None
+        return (datetime.fromisoformat(timestamp) + timedelta(seconds=self.ttl)).isoformat()
+
+    def age_cutoff(self, now: datetime) -> Optional[str]:
+        """Return the timestamp before which facts are too old, if ``max_age`` is set."""
+        if self.max_age is None:
+            return None
+        return (now - timedelta(seconds=self.max_age)).isoformat()
+
+    def evicted_ids(self, facts: List[FactRecord], now: float) -> List[int]:
+        """Return the ids of ``facts`` (in id order) that this policy evicts.
+
+        ``now`` and the record timestamps are seconds since the epoch.
+        """
+        overflow = 0
+        if self.max_count is not None:
+            overflow = max(0, len(facts) - self.max_count)
+        cutoff = now - self.max_age if self.max_age is not None else None
+        evicted = []
+        for position, fact in enumerate(facts):
+            if (position < overflow
+                    or (cutoff is not None and fact.timestamp < cutoff)
+                    or (fact.expires_at is not None and fact.expires_at <= now)):
+                evicted.append(fact.id)
+        return evicted
+
+
+def resolve_policies(policies: Optional[Dict[str, Any]]) -> Dict[str, RetentionPolicy]:
+    """Normalize a ``{category: policy}`` mapping; policies may be plain dicts."""
+    resolved = {}
+    for category, policy in (policies or {}).items():
+        if isinstance(policy, dict):
+            policy = RetentionPolicy(**policy)
+        elif not isinstance(policy, RetentionPolicy):
+            raise ValueError(f"Invalid retention policy for category '{category}'")
+        resolved[category] = policy
+    return resolved
+
+
+def policy_for(policies: Dict[str, RetentionPolicy], category: str) -> Optional[RetentionPolicy]:
+    """Return the policy governing ``category``, falling back to the default."""
+    return policies.get(category, policies.get(DEFAULT_POLICY))
+
+
+class FactArchive:
+    """Append-only gzip archive of facts evicted from the hot store.
+
+    Each ``append`` writes one gzip member of NDJSON facts, so archiving never
+    rewrites earlier data. Reads stream the file and stop at a torn trailing
+    member left by a crash.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._count: Optional[int] = None
+
+    @property
+    def size_bytes(self) -> int:
+        """Compressed size of the archive on disk."""
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def append(self, facts: List[Dict[str, Any]]):
+        """Durably append facts to the archive."""
+        if not facts:
+            return
+        data = "".join(json.dumps(fact) + "\n" for fact in facts).encode("utf-8")
+        with self._lock:
+            with open(self.path, 'ab') as f:
+                f.write(gzip.compress(data))
+                f.flush()
+                os.fsync(f.fileno())
+            if self._count is not None:
+                self._count += len(facts)
+
+    def iter_facts(self) -> Iterator[Dict[str, Any]]:
+        """Yield archived facts in the order they were archived."""
+        if not os.path.exists(self.path):
+            return
+        with gzip.open(self.path, 'rt', encoding="utf-8") as f:
+            try:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        return
+            except (EOFError, OSError, zlib.error):
+                # A torn trailing member from a crash; earlier members are intact
+                return
+
+    def count(self) -> int:
+        """Number of archived facts, counted once and then kept up to date."""
+        if self._count is None:
+            count = sum(1 for _ in self.iter_facts())
+            with self._lock:
+                if self._count is None:
+                    self._count = count
+        return self._count
+
+    def search(self, query: str, top_k: Optional[int] = None,
+               exclude_ids: Iterable[int] = ()) -> List[Dict[str, Any]]:
+        """Scan the archive for facts matching ``query``.
+
+        Matching follows ``search_memory``: every query token must appear as
+        a whole token and the query as a substring. Facts whose id is in
+        ``exclude_ids`` (still hot) or was already returned are skipped.
+        """
+        query_lower = query.lower()
+        tokens = set(tokenize(query))
+        seen: Set[int] = set(exclude_ids)
+        results = []
+        for fact in self.iter_facts():
+            if fact["id"] in seen:
+                continue
+            content = fact["content"].lower()
+            if query_lower not in content or not tokens.issubset(tokenize(content)):
+                continue
+            seen.add(fact["id"])
+            results.append({"type": "archived_fact", "data": fact})
+            if top_k is not None and len(results) >= top_k:
+                break
+        return results
+
+
+class RetentionScheduler:
+    """Runs a store's retention pass on a daemon thread every ``interval`` seconds."""
+
+    def __init__(self, apply_fn: Callable[[], Any], interval: float):
+        self.apply_fn = apply_fn
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.apply_fn()
+            except Exception:
+                # Keep the schedule alive; the next pass retries
+                logger.exception("Retention pass failed")
+
+    def stop(self):
+        """Stop scheduling passes and wait for a running one to finish."""
+        self._stopped.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
@@ -0,0 +1,89 @@
+"""
+Ring buffer for AI Live Genie
+Fixed-capacity FIFO storage for short-term conversation history.
+"""
+
+import sys
+from typing import Any, Iterator, List, Optional
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO over a preallocated list.
+
+    ``append`` is O(1) and hands back the item it displaces once the buffer
+    is full. Items are indexed oldest first (negative indexes count from the
+    newest), so indexing is O(1), a slice or ``tail(k)`` costs O(k), and
+    sorted contents can be binary-searched in place.
+    """
+
+    __slots__ = ("_items", "_start", "_size")
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._items: List[Any] = [None] * capacity
+        self._start = 0
+        self._size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._items)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __sizeof__(self) -> int:
+        # Count the preallocated slot list, which dominates an empty buffer
+        return object.__sizeof__(self) + sys.getsizeof(self._items)
+
+    def append(self, item: Any) -> Optional[Any]:
+        """Add ``item`` as the newest entry; return the oldest one if it was evicted."""
+        capacity = len(self._items)
+        if self._size < capacity:
+            self._items[(self._start + self._size) % capacity] = item
+            self._size += 1
+            return None
+        evicted = self._items[self._start]
+        self._items[self._start] = item
+        self._start = (self._start + 1) % capacity
+        return evicted
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._items[(self._start + i) % len(self._items)]
+                    for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("ring buffer index out of range")
+        return self._items[(self._start + index) % len(self._items)]
+
+    def __iter__(self) -> Iterator[Any]:
+        capacity = len(self._items)
+        for i in range(self._size):
+            yield self._items[(self._start + i) % capacity]
+
+    def tail(self, n: int) -> List[Any]:
+        """Return the newest ``n`` items, oldest first."""
+        return self[max(0, self._size - n):] if n > 0 else []
+
+    def clear(self):
+        """Drop every item."""
+        self._items = [None] * len(self._items)
+        self._start = 0
+        self._size = 0
+
+    def resize(self, capacity: int) -> List[Any]:
+        """Change the capacity, returning the oldest items that no longer fit."""
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        items = list(self)
+        evicted = items[:max(0, len(items) - capacity)]
+        kept = items[len(evicted):]
+        self._items = kept + [None] * (capacity - len(kept))
+        self._start = 0
+        self._size = len(kept)
+        return evicted
@@ -0,0 +1,270 @@
+"""
+Search indexes for AI Live Genie
+In-memory structures that let long-term memory answer lookups without
+scanning every stored record.
+"""
+
+import bisect
+import heapq
+import math
+import re
+from collections import Counter
+from typing import List, Dict, Any, Hashable, Iterable, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Standard Okapi BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lower-cased alphanumeric tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return the character trigrams of lower-cased, space-padded text."""
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bm25_term_score(tf: int, df: int, n_docs: int, doc_len: int, avg_len: float) -> float:
+    """Score one query term against one document with Okapi BM25."""
+    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len) if avg_len else BM25_K1
+    return idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+
+class TokenIndex:
+    """Inverted index from normalized token to the documents containing it.
+
+    Postings keep per-document term frequencies and the index tracks document
+    lengths, so it can serve both exact token lookups and BM25 ranking.
+    Documents are identified by any hashable id and are returned in the order
+    they were first added, which mirrors the insertion order of the store.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._lengths: Dict[Hashable, int] = {}
+        self._order: Dict[Hashable, int] = {}
+        self._next_ordinal = 0
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def add(self, doc_id: Hashable, text: str):
+        """Index a document; re-adding a known id is a no-op."""
+        if doc_id in self._order:
+            return
+        self._order[doc_id] = self._next_ordinal
+        self._next_ordinal += 1
+        tokens = tokenize(text)
+        self._lengths[doc_id] = len(tokens)
+        self._total_length += len(tokens)
+        for token, tf in Counter(tokens).items():
+            self._postings.setdefault(token, {})[doc_id] = tf
+
+    def remove(self, doc_id: Hashable, text: str):
+        """Drop a document previously indexed with ``text``."""
+        if doc_id not in self._order:
+            return
+        for token in set(tokenize(text)):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[token]
+        self._total_length -= self._lengths.pop(doc_id, 0)
+        del self._order[doc_id]
+
+    def lookup(self, tokens: Iterable[str]) -> List[Hashable]:
+        """Return documents containing every token, in insertion order."""
+        postings = []
+        for token in set(tokens):
+            posting = self._postings.get(token)
+            if not posting:
+                return []
+            postings.append(posting)
+        if not postings:
+            return []
+        postings.sort(key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            matches.intersection_update(posting)
+            if not matches:
+                return []
+        return sorted(matches, key=self._order.__getitem__)
+
+    def rank(self, tokens: Iterable[str], top_k: int) -> List[Tuple[float, Hashable]]:
+        """Return the ``top_k`` best BM25 matches as ``(score, doc_id)`` pairs.
+
+        Any query token may match. Selection uses a bounded heap, so only
+        ``top_k`` results are ever materialized; ties keep insertion order.
+        """
+        n_docs = len(self._order)
+        if not n_docs or top_k <= 0:
+            return []
+        avg_len = self._total_length / n_docs
+        terms = [(self._postings[t], len(self._postings[t])) for t in set(tokens)
+                 if t in self._postings]
+        if not terms:
+            return []
+
+        def scored(doc_ids):
+            for doc_id in doc_ids:
+                score = 0.0
+                for posting, df in terms:
+                    tf = posting.get(doc_id)
+                    if tf:
+                        score += bm25_term_score(tf, df, n_docs, self._lengths[doc_id], avg_len)
+                yield score, -self._order[doc_id], doc_id
+
+        if len(terms) == 1:
+            candidates = terms[0][0]
+        else:
+            candidates = set()
+            for posting, _ in terms:
+                candidates.update(posting)
+        best = heapq.nlargest(top_k, scored(candidates))
+        return [(score, doc_id) for score, _, doc_id in best]
+
+    @classmethod
+    def build(cls, documents: Iterable[Any]) -> "TokenIndex":
+        """Build an index from ``(doc_id, text)`` pairs."""
+        index = cls()
+        for doc_id, text in documents:
+            index.add(doc_id, text)
+        return index
+
+
+class NameIndex:
+    """Case-insensitive prefix and trigram index over a set of names.
+
+    Lower-cased names are kept in a sorted list, so a prefix lookup is a
+    binary search followed by a short scan. Trigram postings back fuzzy
+    lookups scored by Dice similarity, which tolerates typos and
+    transpositions.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._names: Dict[str, List[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._trigram_counts: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._trigram_counts)
+
+    def _insert(self, name: str) -> bool:
+        """Index a name's trigrams; return True if its lower-cased key is new."""
+        if name in self._trigram_counts:
+            return False
+        key = name.lower()
+        names = self._names.get(key)
+        is_new_key = names is None
+        if is_new_key:
+            names = self._names[key] = []
+        names.append(name)
+        grams = trigrams(name)
+        self._trigram_counts[name] = len(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(name)
+        return is_new_key
+
+    def add(self, name: str):
+        """Index a name; re-adding a known name is a no-op."""
+        if self._insert(name):
+            bisect.insort(self._keys, name.lower())
+
+    def remove(self, name: str):
+        """Drop a name from the index."""
+        if self._trigram_counts.pop(name, None) is None:
+            return
+        key = name.lower()
+        names = self._names[key]
+        names.remove(name)
+        if not names:
+            del self._names[key]
+            del self._keys[bisect.bisect_left(self._keys, key)]
+        for gram in trigrams(name):
+            posting = self._postings[gram]
+            posting.discard(name)
+            if not posting:
+                del self._postings[gram]
+
+    def prefix(self, prefix: str, limit: int) -> List[str]:
+        """Return up to ``limit`` names starting with ``prefix``, in name order."""
+        key = prefix.lower()
+        results: List[str] = []
+        position = bisect.bisect_left(self._keys, key)
+        while position < len(self._keys) and len(results) < limit:
+            candidate = self._keys[position]
+            if not candidate.startswith(key):
+                break
+            results.extend(sorted(self._names[candidate]))
+            position += 1
+        return results[:limit]
+
+    def _fuzzy_scan(self, query: str, limit: int,
+                    min_similarity: float) -> Tuple[List[Tuple[float, str]], int]:
+        """Return the fuzzy matches and the number of names examined.
+
+        Postings are read shortest first. Each name is scored once, when it
+        is first met, by probing the longer postings for the trigrams it
+        still shares. With ``r`` postings left, a name not met yet shares at
+        most ``r`` trigrams, so its similarity is at most ``2r / (q + r)``.
+        Scanning stops once that bound drops below ``min_similarity`` or
+        the ``limit``-th best similarity found so far. The long postings of
+        common trigrams are then only probed, never scanned.
+        """
+        grams = trigrams(query)
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        threshold = min_similarity
+        best: List[float] = []
+        matches = []
+        seen: Set[str] = set()
+        for i, posting in enumerate(postings):
+            remaining = len(postings) - i
+            if 2 * remaining / (len(grams) + remaining) < threshold - 1e-12:
+                break
+            later = postings[i + 1:]
+            for name in posting:
+                if name in seen:
+                    continue
+                seen.add(name)
+                count = self._trigram_counts[name]
+                if 2 * min(remaining, count) / (len(grams) + count) < threshold:
+                    continue
+                shared = 1 + sum(1 for other in later if name in other)
+                similarity = 2 * shared / (len(grams) + count)
+                if similarity < threshold:
+                    continue
+                matches.append((similarity, name))
+                heapq.heappush(best, similarity)
+                if len(best) > limit:
+                    heapq.heappop(best)
+                if len(best) == limit:
+                    threshold = max(threshold, best[0])
+        matches = heapq.nsmallest(limit, matches, key=lambda pair: (-pair[0], pair[1]))
+        return matches, len(seen)
+
+    def fuzzy(self, query: str, limit: int,
+              min_similarity: float = 0.3) -> List[Tuple[float, str]]:
+        """Return up to ``limit`` ``(similarity, name)`` pairs, most similar first."""
+        if limit <= 0:
+            return []
+        return self._fuzzy_scan(query, limit, min_similarity)[0]
+
+    @classmethod
+    def build(cls, names: Iterable[str]) -> "NameIndex":
+        """Build an index from names, sorting once instead of per insert."""
+        index = cls()
+        for name in names:
+            if index._insert(name):
+                index._keys.append(name.lower())
+        index._keys.sort()
+        return index
@@ -0,0 +1,476 @@
+"""
+Binary segment format for AI Live Genie
+A compact alternative to the JSON store files that can be memory-mapped and
+queried by id, category or key without decoding the whole file.
+
+Layout (little-endian)::
+
+    header    magic
+    records   per record: u32 length, then the encoded value
+    indexes   per section: fixed-width sorted arrays of ids, categories and keys
+    strings   varint count, then varint length + UTF-8 bytes per string
+    sections  u32 count, then one fixed-width entry per section
+    meta      encoded dict of the document's top-level scalars
+    trailer   u64 strings offset, u64 sections offset, u64 meta offset, magic
+
+Top-level lists in a document (``facts``, ``active_goals``) become list
+sections and top-level dicts (``preferences``, ``entities``) become map
+sections whose records are looked up by key. Dict keys and the values of
+``category``, ``role``, ``priority`` and ``status`` fields are stored once in
+the string table and referenced by number. Inside records, lengths, counts,
+string numbers and integers are varints.
+"""
+
+import mmap
+import struct
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import codec
+from .persistence import write_atomic
+
+# Store file formats accepted by the JSON stores
+FORMAT_JSON = "json"
+FORMAT_SEGMENT = "segment"
+FILE_FORMATS = (FORMAT_JSON, FORMAT_SEGMENT)
+
+MAGIC = b"ALGSEG\x00\x01"
+
+# String values of these fields repeat across records, so they are interned
+SYMBOL_FIELDS = frozenset(("category", "role", "priority", "status"))
+
+_U32 = struct.Struct("<I")
+_F64 = struct.Struct("<d")
+_TRAILER = struct.Struct("<QQQ8s")
+_ID_ENTRY = struct.Struct("<qQ")          # id, record offset
+_CATEGORY_ENTRY = struct.Struct("<III")   # category string, first posting, posting count
+_POSTING = struct.Struct("<Q")            # record offset; id order within a category
+_KEY_ENTRY = struct.Struct("<IQ")         # key string, record offset
+# name, kind, record count, first record, then offset and length of each index
+_SECTION = struct.Struct("<IBIQQIQIQI")
+
+_LIST, _MAP = 0, 1
+
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _SYMBOL, _LIST_VALUE, _DICT_VALUE = range(9)
+
+
+class SegmentError(ValueError):
+    """Raised for files that are not valid segments."""
+
+
+def _put_varint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf, pos: int) -> Tuple[int, int]:
+    byte = buf[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    n, shift = byte & 0x7F, 7
+    while True:
+        pos += 1
+        byte = buf[pos]
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos + 1
+        shift += 7
+
+
+class _Encoder:
+    """Encodes values into a buffer, interning strings as it goes."""
+
+    def __init__(self, default: Optional[Callable[[Any], Any]]):
+        self.default = default
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        index = self._string_ids.get(value)
+        if index is None:
+            index = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def encode(self, value: Any, out: bytearray):
+        if value is None:
+            out.append(_NONE)
+        elif value is True:
+            out.append(_TRUE)
+        elif value is False:
+            out.append(_FALSE)
+        elif isinstance(value, int):
+            out.append(_INT)
+            # Zigzag keeps small negative numbers short
+            _put_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+        elif isinstance(value, float):
+            out.append(_FLOAT)
+            out += _F64.pack(value)
+        elif isinstance(value, str):
+            data = value.encode("utf-8")
+            out.append(_STR)
+            _put_varint(out, len(data))
+            out += data
+        elif isinstance(value, dict):
+            out.append(_DICT_VALUE)
+            _put_varint(out, len(value))
+            for key, item in value.items():
+                key = key if isinstance(key, str) else str(key)
+                _put_varint(out, self.intern(key))
+                if key in SYMBOL_FIELDS and isinstance(item, str):
+                    out.append(_SYMBOL)
+                    _put_varint(out, self.intern(item))
+                else:
+                    self.encode(item, out)
+        elif isinstance(value, (list, tuple)):
+            out.append(_LIST_VALUE)
+            _put_varint(out, len(value))
+            for item in value:
+                self.encode(item, out)
+        elif self.default is not None:
+            self.encode(self.default(value), out)
+        else:
+            raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def encode_segment(document: Dict[str, Any],
+                   default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Encode a store document as a segment.
+
+    ``default`` converts values the encoder does not know, as for
+    ``codec.dumps``; list items are converted before they are indexed.
+    """
+    encoder = _Encoder(default)
+    out = bytearray(MAGIC)
+    sections = []
+    meta = {}
+    for name, value in document.items():
+        if isinstance(value, list):
+            kind, items = _LIST, value
+        elif isinstance(value, dict):
+            kind, items = _MAP, value.items()
+        else:
+            meta[name] = value
+            continue
+        first = len(out)
+        ids, categories, keys = [], [], []
+        for item in items:
+            offset = len(out)
+            body = bytearray()
+            if kind == _MAP:
+                key, item = item
+                key_id = encoder.intern(key if isinstance(key, str) else str(key))
+                keys.append((key_id, offset))
+                _put_varint(body, key_id)
+            else:
+                if not isinstance(item, dict) and default is not None:
+                    item = default(item)
+                if isinstance(item, dict):
+                    record_id = item.get("id")
+                    if not isinstance(record_id, int):
+                        record_id = None
+                    else:
+                        ids.append((record_id, offset))
+                    category = item.get("category")
+                    if isinstance(category, str):
+                        categories.append((encoder.intern(category), record_id or 0, offset))
+            encoder.encode(item, body)
+            out += _U32.pack(len(body))
+            out += body
+        sections.append((encoder.intern(name), kind, len(items), first, ids, categories, keys))
+
+    entries = []
+    for name_id, kind, count, first, ids, categories, keys in sections:
+        ids.sort()
+        ids_offset = len(out)
+        for entry in ids:
+            out += _ID_ENTRY.pack(*entry)
+        # One entry per category pointing at its run of postings
+        categories.sort()
+        runs: List[List[int]] = []
+        for category_id, _, _ in categories:
+            if runs and runs[-1][0] == category_id:
+                runs[-1][2] += 1
+            else:
+                runs.append([category_id, len(runs) and runs[-1][1] + runs[-1][2], 1])
+        categories_offset = len(out)
+        for run in runs:
+            out += _CATEGORY_ENTRY.pack(*run)
+        for _, _, offset in categories:
+            out += _POSTING.pack(offset)
+        keys.sort()
+        keys_offset = len(out)
+        for entry in keys:
+            out += _KEY_ENTRY.pack(*entry)
+        entries.append(_SECTION.pack(name_id, kind, count, first, ids_offset, len(ids),
+                                     categories_offset, len(runs), keys_offset, len(keys)))
+
+    # Meta keys must be interned before the string table is written
+    meta_body = bytearray()
+    encoder.encode(meta, meta_body)
+
+    strings_offset = len(out)
+    _put_varint(out, len(encoder.strings))
+    for string in encoder.strings:
+        data = string.encode("utf-8")
+        _put_varint(out, len(data))
+        out += data
+    sections_offset = len(out)
+    out += _U32.pack(len(entries))
+    for entry in entries:
+        out += entry
+    meta_offset = len(out)
+    out += meta_body
+    out += _TRAILER.pack(strings_offset, sections_offset, meta_offset, MAGIC)
+    return bytes(out)
+
+
+class _Section:
+    __slots__ = ("name", "kind", "count", "first", "ids", "id_count", "categories",
+                 "category_count", "keys", "key_count")
+
+    def __init__(self, name: str, kind: int, count: int, first: int, ids: int, id_count: int,
+                 categories: int, category_count: int, keys: int, key_count: int):
+        self.name = name
+        self.kind = kind
+        self.count = count
+        self.first = first
+        self.ids = ids
+        self.id_count = id_count
+        self.categories = categories
+        self.category_count = category_count
+        self.keys = keys
+        self.key_count = key_count
+
+
+class SegmentReader:
+    """Read-only, memory-mapped view of a segment file.
+
+    Opening a segment reads only the trailer, the string table and the
+    section table. ``get``, ``by_category`` and ``lookup`` binary-search the
+    footer indexes and decode just the records they return.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._buf = None
+        with open(path, 'rb') as f:
+            try:
+                self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                raise SegmentError(f"{path} is not a segment file") from None
+        try:
+            self._open()
+        except SegmentError:
+            self.close()
+            raise
+        except (struct.error, IndexError, UnicodeDecodeError):
+            self.close()
+            raise SegmentError(f"{path} is a damaged segment file") from None
+
+    def _open(self):
+        buf = self._buf
+        if len(buf) < len(MAGIC) + _TRAILER.size or buf[:len(MAGIC)] != MAGIC:
+            raise SegmentError(f"{self.path} is not a segment file")
+        strings_offset, sections_offset, self._meta_offset, magic = _TRAILER.unpack_from(
+            buf, len(buf) - _TRAILER.size)
+        if magic != MAGIC:
+            raise SegmentError(f"{self.path} is truncated")
+        count, pos = _get_varint(buf, strings_offset)
+        self.strings: List[str] = []
+        for _ in range(count):
+            length, pos = _get_varint(buf, pos)
+            self.strings.append(str(buf[pos:pos + length], "utf-8"))
+            pos += length
+        self._string_ids: Optional[Dict[str, int]] = None
+        count, = _U32.unpack_from(buf, sections_offset)
+        pos = sections_offset + _U32.size
+        self.sections: Dict[str, _Section] = {}
+        for _ in range(count):
+            name_id, *fields = _SECTION.unpack_from(buf, pos)
+            pos += _SECTION.size
+            self.sections[self.strings[name_id]] = _Section(self.strings[name_id], *fields)
+
+    def close(self):
+        """Unmap the file."""
+        if self._buf is not None:
+            self._buf.close()
+            self._buf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return sum(section.count for section in self.sections.values())
+
+    def _string_id(self, value: str) -> Optional[int]:
+        if self._string_ids is None:
+            self._string_ids = {string: i for i, string in enumerate(self.strings)}
+        return self._string_ids.get(value)
+
+    def _decode(self, buf, pos: int) -> Tuple[Any, int]:
+        """Decode the value at ``pos``; return it and the position after it."""
+        tag = buf[pos]
+        pos += 1
+        if tag == _STR:
+            length, pos = _get_varint(buf, pos)
+            return str(buf[pos:pos + length], "utf-8"), pos + length
+        if tag == _INT:
+            n, pos = _get_varint(buf, pos)
+            return (n >> 1 if not n & 1 else -((n + 1) >> 1)), pos
+        if tag == _SYMBOL:
+            index, pos = _get_varint(buf, pos)
+            return self.strings[index], pos
+        if tag == _DICT_VALUE:
+            count, pos = _get_varint(buf, pos)
+            strings = self.strings
+            value = {}
+            for _ in range(count):
+                key, pos = _get_varint(buf, pos)
+                value[strings[key]], pos = self._decode(buf, pos)
+            return value, pos
+        if tag == _LIST_VALUE:
+            count, pos = _get_varint(buf, pos)
+            items = []
+            for _ in range(count):
+                item, pos = self._decode(buf, pos)
+                items.append(item)
+            return items, pos
+        if tag == _FLOAT:
+            return _F64.unpack_from(buf, pos)[0], pos + 8
+        if tag == _NONE:
+            return None, pos
+        if tag == _TRUE:
+            return True, pos
+        if tag == _FALSE:
+            return False, pos
+        raise SegmentError(f"Unknown value tag {tag} in {self.path}")
+
+    def _record(self, section: _Section, offset: int) -> Any:
+        """Decode the record at ``offset``; map records come back as ``(key, value)``."""
+        length, = _U32.unpack_from(self._buf, offset)
+        # Decoding from a bytes copy of the record is faster than indexing the map
+        record = self._buf[offset + _U32.size:offset + _U32.size + length]
+        if section.kind == _MAP:
+            key, pos = _get_varint(record, 0)
+            return self.strings[key], self._decode(record, pos)[0]
+        return self._decode(record, 0)[0]
+
+    def _section(self, name: str) -> _Section:
+        section = self.sections.get(name)
+        if section is None:
+            raise KeyError(f"Segment has no section '{name}'")
+        return section
+
+    def _search(self, base: int, count: int, entry: struct.Struct, key: int) -> int:
+        """Return the first entry index whose leading field is not below ``key``."""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if entry.unpack_from(self._buf, base + mid * entry.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def iter_section(self, name: str) -> Iterator[Any]:
+        """Yield a section's records in file order; map records as ``(key, value)``."""
+        section = self._section(name)
+        pos = section.first
+        for _ in range(section.count):
+            yield self._record(section, pos)
+            pos += _U32.size + _U32.unpack_from(self._buf, pos)[0]
+
+    def get(self, name: str, record_id: int) -> Optional[Any]:
+        """Return the record of a list section with the given ``id``."""
+        section = self._section(name)
+        i = self._search(section.ids, section.id_count, _ID_ENTRY, record_id)
+        if i < section.id_count:
+            found, offset = _ID_ENTRY.unpack_from(self._buf, section.ids + i * _ID_ENTRY.size)
+            if found == record_id:
+                return self._record(section, offset)
+        return None
+
+    def by_category(self, name: str, category: str) -> Iterator[Any]:
+        """Yield the records of a list section in one category, in id order."""
+        section = self._section(name)
+        category_id = self._string_id(category)
+        if category_id is None:
+            return
+        i = self._search(section.categories, section.category_count, _CATEGORY_ENTRY,
+                         category_id)
+        if i == section.category_count:
+            return
+        found, start, count = _CATEGORY_ENTRY.unpack_from(
+            self._buf, section.categories + i * _CATEGORY_ENTRY.size)
+        if found != category_id:
+            return
+        postings = section.categories + section.category_count * _CATEGORY_ENTRY.size
+        for j in range(start, start + count):
+            offset, = _POSTING.unpack_from(self._buf, postings + j * _POSTING.size)
+            yield self._record(section, offset)
+
+    def lookup(self, name: str, key: str) -> Optional[Any]:
+        """Return the value stored under ``key`` in a map section."""
+        section = self._section(name)
+        key_id = self._string_id(key)
+        if key_id is None:
+            return None
+        i = self._search(section.keys, section.key_count, _KEY_ENTRY, key_id)
+        if i < section.key_count:
+            found, offset = _KEY_ENTRY.unpack_from(self._buf, section.keys + i * _KEY_ENTRY.size)
+            if found == key_id:
+                return self._record(section, offset)[1]
+        return None
+
+    def meta(self) -> Dict[str, Any]:
+        """Return the document's top-level scalar values."""
+        return self._decode(self._buf, self._meta_offset)[0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Decode the whole document."""
+        document = {}
+        for name, section in self.sections.items():
+            records = self.iter_section(name)
+            document[name] = dict(records) if section.kind == _MAP else list(records)
+        document.update(self.meta())
+        return document
+
+
+def write_segment(path: str, document: Dict[str, Any],
+                  default: Optional[Callable[[Any], Any]] = None):
+    """Atomically write ``document`` to ``path`` as a segment."""
+    write_atomic(path, encode_segment(document, default))
+
+
+def is_segment(path: str) -> bool:
+    """Return True if ``path`` starts with the segment magic number."""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_document(path: str) -> Any:
+    """Read a store file in either format.
+
+    Raises SegmentError or ``codec.JSONDecodeError`` for damaged files.
+    """
+    if is_segment(path):
+        with SegmentReader(path) as reader:
+            return reader.to_dict()
+    return codec.load_file(path)
+
+
+def json_to_segment(json_path: str, segment_path: str):
+    """Convert a JSON store file to a segment."""
+    write_segment(segment_path, codec.load_file(json_path))
+
+
+def segment_to_json(segment_path: str, json_path: str, indent: bool = False):
+    """Convert a segment back to a JSON store file."""
+    with SegmentReader(segment_path) as reader:
+        document = reader.to_dict()
+    write_atomic(json_path, codec.dumps(document, indent=indent))
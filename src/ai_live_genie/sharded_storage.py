@@ -0,0 +1,413 @@
+"""
+Sharded storage backend for AI Live Genie
+Splits long-term memory into one JSON store per fact category plus separate
+stores for entities and preferences, so each write rewrites only its shard.
+"""
+
+import hashlib
+import heapq
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import List, Dict, Any, Optional, Callable, Iterable, Iterator
+
+from . import codec
+from .locking import SharedStore
+from .memory_manager import LongTermMemory, Page
+from .persistence import DURABILITY_MODES, DURABILITY_SYNC
+from .records import decode_cursor, encode_cursor, normalize_fact_item
+from .retention import RetentionScheduler, resolve_policies
+from .vector_index import require_numpy
+
+# Maps categories to shard files and records the fact id high-water mark
+MANIFEST_NAME = "shards.json"
+ENTITIES_NAME = "entities.json"
+PREFERENCES_NAME = "preferences.json"
+
+# Fact ids reserved per manifest write by an unshared store; ids left in a
+# block are skipped after a restart
+ID_BLOCK_SIZE = 1000
+
+
+def shard_filename(category: str) -> str:
+    """Return a stable, filesystem-safe file name for a category's shard."""
+    slug = re.sub(r"[^a-z0-9]+", "-", category.lower()).strip("-")[:40] or "category"
+    digest = hashlib.blake2b(category.encode("utf-8"), digest_size=8).hexdigest()
+    return f"facts-{slug}-{digest}.json"
+
+
+def _fact_id(result: Dict[str, Any]) -> int:
+    return result["data"]["id"]
+
+
+class ShardedLongTermMemory:
+    """Long-term memory split into per-category shards, API-compatible with LongTermMemory.
+
+    Facts of each category live in their own LongTermMemory file under
+    ``root``; entities and preferences have a file each. ``shards.json`` maps
+    categories to files and reserves fact ids in blocks, so ids stay unique
+    across shards. Shards are opened on first use, and reads spanning every
+    category (search, export, stats) open and query the shards in parallel on
+    a pool of ``search_workers`` threads.
+
+    The other options apply to every shard as they do to LongTermMemory.
+    Ranked search scores each shard against its own BM25 statistics. With
+    ``shared=True`` the manifest is also locked across processes and every
+    fact id is taken from its counter under that lock, one manifest write
+    per fact. Ids are assigned while the fact's shard is locked, so they
+    increase across all processes in the order facts are stored, which
+    paging and the id-ordered merges rely on.
+    """
+
+    def __init__(self, root: str = "data/long_term", journal: bool = False,
+                 compact_threshold: int = 1000, durability: str = DURABILITY_SYNC,
+                 flush_interval_ms: int = 200, flush_max_pending: int = 100,
+                 dedup: bool = False, retention: Optional[Dict[str, Any]] = None,
+                 retention_interval: Optional[float] = None, vector: bool = False,
+                 search_workers: int = 4, shared: bool = False):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability '{durability}'; expected one of {DURABILITY_MODES}")
+        if shared and (journal or durability != DURABILITY_SYNC):
+            raise ValueError("shared=True requires journal=False and durability='sync'")
+        if vector:
+            require_numpy()
+        self.root = root
+        self.dedup = dedup
+        self.retention = resolve_policies(retention)
+        self.vector = vector
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        # Entity and preference shards share the persistence options only
+        self._store_options = {"journal": journal, "compact_threshold": compact_threshold,
+                               "durability": durability, "flush_interval_ms": flush_interval_ms,
+                               "flush_max_pending": flush_max_pending, "shared": shared}
+        self._fact_options = {"dedup": dedup, "retention": self.retention, "vector": vector,
+                              "id_allocator": self._allocate_id, **self._store_options}
+        self._lock = threading.Lock()
+        self._shards: Dict[str, LongTermMemory] = {}
+        self._shard_locks: Dict[str, threading.Lock] = {}
+        os.makedirs(root, exist_ok=True)
+        self._shared: Optional[SharedStore] = None
+        if shared:
+            self._shared = SharedStore(self.manifest_path, self._reload_manifest)
+            self._shared.sync()
+        else:
+            self._manifest = self._load_manifest()
+        self._next_fact_id = self._manifest["next_fact_id"]
+        self._id_limit = self._next_fact_id
+        self._pool = ThreadPoolExecutor(max_workers=search_workers,
+                                        thread_name_prefix="memory-shard")
+        self._retention_scheduler: Optional[RetentionScheduler] = None
+        if self.retention and retention_interval:
+            self._retention_scheduler = RetentionScheduler(self.apply_retention,
+                                                           retention_interval)
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        manifest = {"categories": {}, "next_fact_id": 1}
+        if os.path.exists(self.manifest_path):
+            try:
+                manifest.update(codec.load_file(self.manifest_path))
+            except codec.JSONDecodeError:
+                pass
+        return manifest
+
+    def _reload_manifest(self):
+        # Swapped in whole so unlocked readers never see a partial manifest
+        self._manifest = self._load_manifest()
+
+    def _sync_manifest(self):
+        """Pick up categories and id blocks added by other processes."""
+        if self._shared is not None:
+            self._shared.sync()
+
+    @contextmanager
+    def _manifest_update(self):
+        """Hold the manifest for a change; called with ``_lock`` held."""
+        if self._shared is None:
+            yield
+            return
+        with self._shared.exclusive():
+            yield
+
+    def _save_manifest(self):
+        """Atomically rewrite the manifest; called within ``_manifest_update()``."""
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(codec.dumps(self._manifest))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        if self._shared is not None:
+            self._shared.commit()
+
+    def _allocate_id(self) -> int:
+        """Hand out the next fact id, reserving a new block when one runs out."""
+        with self._lock:
+            if self._shared is not None:
+                # Blocks per process would interleave ids within a shard
+                with self._manifest_update():
+                    fact_id = self._manifest["next_fact_id"]
+                    self._manifest["next_fact_id"] = fact_id + 1
+                    self._save_manifest()
+                return fact_id
+            if self._next_fact_id >= self._id_limit:
+                with self._manifest_update():
+                    # Skip past blocks other processes reserved since our last one
+                    self._next_fact_id = max(self._next_fact_id,
+                                             self._manifest["next_fact_id"])
+                    self._id_limit = self._next_fact_id + ID_BLOCK_SIZE
+                    self._manifest["next_fact_id"] = self._id_limit
+                    self._save_manifest()
+            fact_id = self._next_fact_id
+            self._next_fact_id += 1
+            return fact_id
+
+    def _open(self, filename: str, options: Optional[Dict[str, Any]] = None) -> LongTermMemory:
+        """Return the shard stored in ``filename``, loading it on first use."""
+        shard = self._shards.get(filename)
+        if shard is None:
+            with self._lock:
+                shard_lock = self._shard_locks.setdefault(filename, threading.Lock())
+            # Loading holds only this shard's lock, so other shards stay writable
+            with shard_lock:
+                shard = self._shards.get(filename)
+                if shard is None:
+                    shard = LongTermMemory(os.path.join(self.root, filename),
+                                           **(options or self._fact_options))
+                    self._shards[filename] = shard
+        return shard
+
+    @property
+    def _entities(self) -> LongTermMemory:
+        return self._open(ENTITIES_NAME, self._store_options)
+
+    @property
+    def _preferences(self) -> LongTermMemory:
+        return self._open(PREFERENCES_NAME, self._store_options)
+
+    def _fact_shard(self, category: str, create: bool = False) -> Optional[LongTermMemory]:
+        """Return the shard for ``category``; unknown categories are added only if ``create``."""
+        self._sync_manifest()
+        filename = self._manifest["categories"].get(category)
+        if filename is None:
+            if not create:
+                return None
+            with self._lock, self._manifest_update():
+                categories = self._manifest["categories"]
+                filename = categories.get(category)
+                if filename is None:
+                    filename = shard_filename(category)
+                    # Replace rather than mutate so unlocked readers see a consistent map
+                    self._manifest["categories"] = {**categories, category: filename}
+                    self._save_manifest()
+        return self._open(filename)
+
+    def _map_shards(self, fn: Callable[[LongTermMemory], Any]) -> List[Any]:
+        """Call ``fn`` on every fact shard in parallel, opening shards as needed."""
+        self._sync_manifest()
+        filenames = list(self._manifest["categories"].values())
+        if len(filenames) <= 1:
+            return [fn(self._open(filename)) for filename in filenames]
+        return list(self._pool.map(lambda filename: fn(self._open(filename)), filenames))
+
+    def store_fact(self, fact: str, category: str = "general"):
+        """Store a fact in its category's shard."""
+        self._fact_shard(category, create=True).store_fact(fact, category)
+
+    def store_preference(self, key: str, value: Any):
+        """Store a user preference."""
+        self._preferences.store_preference(key, value)
+
+    def store_entity(self, entity_name: str, entity_data: Dict[str, Any]):
+        """Store information about an entity (person, place, thing)."""
+        self._entities.store_entity(entity_name, entity_data)
+
+    def store_facts_bulk(self, items: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Store many facts with one persistence step per category shard.
+
+        Results are in input order; fact ids increase in input order within
+        each category but are assigned one category at a time.
+        """
+        results: List[Optional[Dict[str, Any]]] = []
+        groups: Dict[str, List[tuple]] = {}
+        for index, item in enumerate(items):
+            try:
+                fact, category = normalize_fact_item(item)
+            except ValueError as e:
+                results.append({"index": index, "status": "error", "error": str(e)})
+                continue
+            results.append(None)
+            groups.setdefault(category, []).append((index, {"fact": fact, "category": category}))
+        for category, group in groups.items():
+            shard = self._fact_shard(category, create=True)
+            shard_results = shard.store_facts_bulk([item for _, item in group])
+            for (index, _), result in zip(group, shard_results):
+                result["index"] = index
+                results[index] = result
+        return results
+
+    def store_entities_bulk(self, items: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Store many ``{"entity_name": ..., "entity_data": ...}`` items at once."""
+        return self._entities.store_entities_bulk(items)
+
+    def store_preferences_bulk(self, items: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Store many ``{"key": ..., "value": ...}`` items at once."""
+        return self._preferences.store_preferences_bulk(items)
+
+    def retrieve_facts(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Retrieve facts; with a category only that shard is loaded."""
+        return list(self.iter_facts(category))
+
+    def recent_facts(self, n: int = 5) -> List[Dict[str, Any]]:
+        """Return the ``n`` most recently stored facts, oldest first."""
+        if n <= 0:
+            return []
+        facts = heapq.merge(*self._map_shards(lambda shard: shard.recent_facts(n)),
+                            key=lambda fact: fact["id"])
+        return list(facts)[-n:]
+
+    def page_facts(self, category: Optional[str] = None, limit: int = 50,
+                   cursor: Optional[str] = None) -> Page:
+        """Return one page of facts in id order and the cursor for the next page."""
+        decode_cursor(cursor)
+        if category:
+            shard = self._fact_shard(category)
+            return shard.page_facts(category, limit, cursor) if shard else ([], None)
+        pages = self._map_shards(lambda shard: shard.page_facts(None, limit, cursor))
+        merged = list(heapq.merge(*(facts for facts, _ in pages), key=lambda fact: fact["id"]))
+        page = merged[:limit]
+        more = len(merged) > limit or any(next_cursor for _, next_cursor in pages)
+        return page, encode_cursor(page[-1]["id"]) if more and page else None
+
+    def page_search(self, query: str, limit: int = 50, cursor: Optional[str] = None,
+                    ranked: bool = False, semantic: bool = False) -> Page:
+        """Return one page of search results and the cursor for the next page."""
+        offset = decode_cursor(cursor)
+        results = self.search_memory(query, top_k=offset + limit + 1, ranked=ranked,
+                                     semantic=semantic)
+        page = results[offset:offset + limit]
+        next_cursor = encode_cursor(offset + limit) if len(results) > offset + limit else None
+        return page, next_cursor
+
+    def iter_facts(self, category: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield facts one at a time in id order, optionally filtered by category."""
+        if category:
+            shard = self._fact_shard(category)
+            if shard is not None:
+                yield from shard.iter_facts(category)
+            return
+        shards = self._map_shards(lambda shard: shard)
+        yield from heapq.merge(*(shard.iter_facts() for shard in shards),
+                               key=lambda fact: fact["id"])
+
+    def export_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield every fact, preference and entity as a typed export record."""
+        for fact in self.iter_facts():
+            yield {"type": "fact", "data": fact}
+        yield from self._preferences.export_records()
+        yield from self._entities.export_records()
+
+    def category_counts(self) -> Dict[str, int]:
+        """Count stored facts per category."""
+        counts: Dict[str, int] = {}
+        for shard_counts in self._map_shards(lambda shard: shard.category_counts()):
+            counts.update(shard_counts)
+        return counts
+
+    def apply_retention(self) -> int:
+        """Archive facts that break their category's retention policy in every shard."""
+        if not self.retention:
+            return 0
+        return sum(self._map_shards(lambda shard: shard.apply_retention()))
+
+    def search_archive(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search every shard's archive; this scans the archives on every call."""
+        results = [result for shard_results in
+                   self._map_shards(lambda shard: shard.search_archive(query, top_k))
+                   for result in shard_results]
+        results.sort(key=_fact_id)
+        return results[:top_k] if top_k is not None else results
+
+    def stats(self) -> Dict[str, Any]:
+        """Report the size of the hot shards and the cold archives."""
+        totals = {"hot": {"facts": 0, "preferences": 0, "entities": 0, "bytes": 0},
+                  "cold": {"facts": 0, "bytes": 0}}
+        shard_stats = self._map_shards(lambda shard: shard.stats())
+        shard_stats += [self._preferences.stats(), self._entities.stats()]
+        for stats in shard_stats:
+            for tier, counters in totals.items():
+                for key in counters:
+                    counters[key] += stats[tier][key]
+        if os.path.exists(self.manifest_path):
+            totals["hot"]["bytes"] += os.path.getsize(self.manifest_path)
+        totals["shards"] = len(self._manifest["categories"])
+        return totals
+
+    def retrieve_preference(self, key: str) -> Optional[Any]:
+        """Retrieve a stored preference."""
+        return self._preferences.retrieve_preference(key)
+
+    def retrieve_preferences(self) -> Dict[str, Any]:
+        """Retrieve all preferences with their timestamps."""
+        return self._preferences.retrieve_preferences()
+
+    def retrieve_entity(self, entity_name: str) -> Optional[Dict[str, Any]]:
+        """Retrieve information about an entity."""
+        return self._entities.retrieve_entity(entity_name)
+
+    def complete_entities(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return entities whose names start with ``prefix`` (any case), in name order."""
+        return self._entities.complete_entities(prefix, limit)
+
+    def find_entities(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Find entities with names similar to ``query``, tolerating typos."""
+        return self._entities.find_entities(query, limit)
+
+    def search_memory(self, query: str, top_k: Optional[int] = None,
+                      ranked: bool = False, semantic: bool = False) -> List[Dict[str, Any]]:
+        """Search every shard in parallel and merge the results.
+
+        Matching and ordering follow ``LongTermMemory.search_memory``: plain
+        searches list facts in id order and then entities, ranked and
+        semantic searches merge the per-shard ``top_k`` lists by score.
+        """
+        if semantic and not self.vector:
+            raise ValueError("Semantic search requires a store created with vector=True")
+        if semantic or ranked:
+            top_k = top_k or 10
+            result_lists = self._map_shards(
+                lambda shard: shard.search_memory(query, top_k, ranked=ranked, semantic=semantic))
+            if ranked:
+                result_lists.append(self._entities.search_memory(query, top_k, ranked=True))
+            # Each list is sorted by score; merge keeps facts ahead of entities on ties
+            merged = heapq.merge(*result_lists, key=lambda result: -result["score"])
+            return list(islice(merged, top_k))
+        result_lists = self._map_shards(lambda shard: shard.search_memory(query, top_k))
+        results = list(islice(heapq.merge(*result_lists, key=_fact_id), top_k))
+        if top_k is not None and len(results) >= top_k:
+            return results
+        remaining = top_k - len(results) if top_k is not None else None
+        results.extend(self._entities.search_memory(query, remaining))
+        return results
+
+    def compact(self):
+        """Compact every loaded shard's journal into its snapshot."""
+        for shard in list(self._shards.values()):
+            shard.compact()
+
+    def flush(self):
+        """Force deferred writes in every loaded shard to disk."""
+        for shard in list(self._shards.values()):
+            shard.flush()
+
+    def close(self):
+        """Stop background work and close every loaded shard."""
+        if self._retention_scheduler is not None:
+            self._retention_scheduler.stop()
+        for shard in list(self._shards.values()):
+            shard.close()
+        self._pool.shutdown()
+        if self._shared is not None:
+            self._shared.close()
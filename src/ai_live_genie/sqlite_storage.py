@@ -0,0 +1,788 @@
+"""
+SQLite storage backend for AI Live Genie
+Provides drop-in replacements for LongTermMemory and GoalsManager that keep
+their data in an indexed SQLite database instead of a single JSON document.
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
+
+from .records import (
+    decode_cursor,
+    encode_cursor,
+    fact_hash,
+    normalize_entity_item,
+    normalize_fact_item,
+    normalize_preference_item,
+)
+from .retention import (
+    FactArchive,
+    RetentionPolicy,
+    RetentionScheduler,
+    policy_for,
+    resolve_policies,
+)
+from .search_index import NameIndex, bm25_term_score, tokenize
+from .vector_index import VectorIndex, require_numpy
+
+
+# Rows fetched per query when streaming a table
+EXPORT_BATCH_SIZE = 500
+
+# Columns selected to build a fact dict
+FACT_COLUMNS = "id, content, category, timestamp, hits, expires_at"
+
+# Term postings table behind ranked search, per searchable table
+TERM_TABLES = {"facts": "fact_terms", "entities": "entity_terms"}
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    """Open a connection in WAL mode so readers never block on the writer."""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class _ReadConnection(sqlite3.Connection):
+    """Connection subclass so open readers can be tracked by weak reference."""
+
+
+class _SQLiteStore:
+    """One write connection behind a lock, plus a read connection per thread.
+
+    Under WAL each read connection sees the last committed state without
+    waiting for the writer or for other readers. Reads made inside
+    ``_write()`` use the write connection so they see the open transaction.
+    A read connection is closed when its thread exits or the store closes.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = _connect(db_path)
+        self._local = threading.local()
+        self._readers: "weakref.WeakSet[sqlite3.Connection]" = weakref.WeakSet()
+        self._readers_lock = threading.Lock()
+
+    def _reader(self) -> sqlite3.Connection:
+        """Return this thread's read connection, opening it on first use."""
+        conn = getattr(self._local, "reader", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   factory=_ReadConnection)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only=ON")
+            with self._readers_lock:
+                self._readers.add(conn)
+            self._local.reader = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """Hold the writer lock and run the block in one transaction."""
+        with self._lock, self._conn:
+            writing = getattr(self._local, "writing", False)
+            self._local.writing = True
+            try:
+                yield
+            finally:
+                self._local.writing = writing
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """Run a read query and materialize its rows."""
+        if getattr(self._local, "writing", False):
+            return self._conn.execute(sql, params).fetchall()
+        return self._reader().execute(sql, params).fetchall()
+
+    def _close_connections(self):
+        with self._readers_lock:
+            readers = list(self._readers)
+            self._readers.clear()
+        for conn in readers:
+            conn.close()
+        self._conn.close()
+
+
+class SQLiteLongTermMemory(_SQLiteStore):
+    """Long-term memory stored in SQLite, API-compatible with LongTermMemory."""
+
+    def __init__(self, db_path: str = "data/memory.db", dedup: bool = False,
+                 retention: Optional[Dict[str, Any]] = None,
+                 retention_interval: Optional[float] = None, vector: bool = False):
+        if vector:
+            require_numpy()
+        super().__init__(db_path)
+        self.dedup = dedup
+        self.retention = resolve_policies(retention)
+        self.archive = FactArchive(db_path + ".archive.gz")
+        self.vector = vector
+        self.vector_path = db_path + ".vectors.npy"
+        self._vector_index: Optional[VectorIndex] = None
+        self._name_index: Optional[NameIndex] = None
+        # Rows removed by INSERT OR REPLACE fire the delete triggers too
+        self._conn.execute("PRAGMA recursive_triggers=ON")
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS facts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    content TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    token_count INTEGER NOT NULL DEFAULT 0,
+                    content_hash BLOB,
+                    hits INTEGER NOT NULL DEFAULT 1,
+                    expires_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_facts_category ON facts (category, id);
+                CREATE INDEX IF NOT EXISTS idx_facts_timestamp ON facts (timestamp);
+                CREATE TABLE IF NOT EXISTS preferences (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    timestamp TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS entities (
+                    name TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    token_count INTEGER NOT NULL DEFAULT 0
+                );
+            """)
+            self._migrate()
+        self._retention_scheduler: Optional[RetentionScheduler] = None
+        if self.retention and retention_interval:
+            self._retention_scheduler = RetentionScheduler(self.apply_retention,
+                                                           retention_interval)
+
+    def _migrate(self):
+        """Add columns introduced after a database was first created."""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(facts)")}
+        if "content_hash" not in columns:
+            self._conn.execute("ALTER TABLE facts ADD COLUMN content_hash BLOB")
+            for row in self._conn.execute("SELECT id, content, category FROM facts").fetchall():
+                self._conn.execute("UPDATE facts SET content_hash = ? WHERE id = ?",
+                                   (fact_hash(row["content"], row["category"]), row["id"]))
+        if "hits" not in columns:
+            self._conn.execute("ALTER TABLE facts ADD COLUMN hits INTEGER NOT NULL DEFAULT 1")
+        if "expires_at" not in columns:
+            self._conn.execute("ALTER TABLE facts ADD COLUMN expires_at TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_facts_hash ON facts (content_hash)")
+        tables = {row["name"] for row in self._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "search_stats" not in tables:
+            self._create_term_index()
+
+    def _create_term_index(self):
+        """Create the BM25 term postings and fill them from the stored rows.
+
+        ``<table>_terms`` holds the frequency of each token in each row and
+        ``search_stats`` the row count and total token count per table.
+        Triggers keep the counts and postings in step with deletes, including
+        rows replaced by ``INSERT OR REPLACE``; inserts add their postings in
+        ``_index_terms``.
+        """
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_stats (name TEXT PRIMARY KEY, "
+            "docs INTEGER NOT NULL, tokens INTEGER NOT NULL)")
+        for table, terms in TERM_TABLES.items():
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {terms} (term TEXT NOT NULL, "
+                "doc_id INTEGER NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, doc_id)) "
+                "WITHOUT ROWID")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{terms}_doc ON {terms} (doc_id)")
+            self._conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_stats_insert AFTER INSERT ON {table} BEGIN "
+                "UPDATE search_stats SET docs = docs + 1, tokens = tokens + NEW.token_count "
+                f"WHERE name = '{table}'; END")
+            self._conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_stats_delete AFTER DELETE ON {table} BEGIN "
+                "UPDATE search_stats SET docs = docs - 1, tokens = tokens - OLD.token_count "
+                f"WHERE name = '{table}'; "
+                f"DELETE FROM {terms} WHERE doc_id = OLD.rowid; END")
+            self._conn.execute(f"DELETE FROM {terms}")
+            self._conn.execute(
+                "INSERT INTO search_stats (name, docs, tokens) "
+                f"SELECT ?, COUNT(*), COALESCE(SUM(token_count), 0) FROM {table}", (table,))
+        for row in self._conn.execute("SELECT id, content FROM facts").fetchall():
+            self._index_terms("facts", row["id"], row["content"])
+        for row in self._conn.execute("SELECT rowid AS rid, name FROM entities").fetchall():
+            self._index_terms("entities", row["rid"], row["name"])
+
+    def _index_terms(self, table: str, doc_id: int, text: str):
+        """Add the term postings of a newly inserted row."""
+        self._conn.executemany(
+            f"INSERT INTO {TERM_TABLES[table]} (term, doc_id, tf) VALUES (?, ?, ?)",
+            [(term, doc_id, tf) for term, tf in Counter(tokenize(text)).items()])
+
+    @staticmethod
+    def _fact_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        fact = {"id": row["id"], "content": row["content"], "category": row["category"],
+                "timestamp": row["timestamp"]}
+        if row["hits"] > 1:
+            fact["hits"] = row["hits"]
+        if row["expires_at"] is not None:
+            fact["expires_at"] = row["expires_at"]
+        return fact
+
+    def _insert_fact(self, fact: str, category: str, timestamp: str) -> Tuple[int, bool]:
+        """Insert a fact, or refresh its duplicate in dedup mode.
+
+        Must be called inside a transaction. Returns ``(fact_id, is_duplicate)``.
+        """
+        content_hash = fact_hash(fact, category)
+        if self.dedup:
+            row = self._conn.execute(
+                "SELECT id FROM facts WHERE content_hash = ? ORDER BY id LIMIT 1",
+                (content_hash,)).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE facts SET timestamp = ?, hits = hits + 1 WHERE id = ?",
+                    (timestamp, row["id"]))
+                return row["id"], True
+        policy = policy_for(self.retention, category)
+        expires_at = policy.expires_at(timestamp) if policy else None
+        cursor = self._conn.execute(
+            "INSERT INTO facts (content, category, timestamp, token_count, content_hash, "
+            "expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (fact, category, timestamp, len(tokenize(fact)), content_hash, expires_at))
+        self._index_terms("facts", cursor.lastrowid, fact)
+        if self._vector_index is not None:
+            self._vector_index.add(cursor.lastrowid, fact)
+        return cursor.lastrowid, False
+
+    def store_fact(self, fact: str, category: str = "general"):
+        """Store a fact in long-term memory."""
+        with self._write():
+            self._insert_fact(fact, category, datetime.now().isoformat())
+
+    def store_preference(self, key: str, value: Any):
+        """Store a user preference."""
+        with self._write():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO preferences (key, value, timestamp) VALUES (?, ?, ?)",
+                (key, json.dumps(value), datetime.now().isoformat()))
+
+    def _insert_entity(self, name: str, data: Dict[str, Any], timestamp: str):
+        """Insert or replace an entity. Must be called inside a transaction."""
+        cursor = self._conn.execute(
+            "INSERT OR REPLACE INTO entities (name, data, timestamp, token_count) "
+            "VALUES (?, ?, ?, ?)", (name, json.dumps(data), timestamp, len(tokenize(name))))
+        self._index_terms("entities", cursor.lastrowid, name)
+        if self._name_index is not None:
+            self._name_index.add(name)
+
+    def store_entity(self, entity_name: str, entity_data: Dict[str, Any]):
+        """Store information about an entity (person, place, thing)."""
+        with self._write():
+            self._insert_entity(entity_name, entity_data, datetime.now().isoformat())
+
+    def store_facts_bulk(self, items: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Store many facts in a single transaction, reporting per-item status."""
+        timestamp = datetime.now().isoformat()
+        results = []
+        with self._write():
+            for index, item in enumerate(items):
+                try:
+                    fact, category = normalize_fact_item(item)
+                except ValueError as e:
+                    results.append({"index": index, "status": "error", "error": str(e)})
+                    continue
+                fact_id, duplicate = self._insert_fact(fact, category, timestamp)
+                results.append({"index": index, "status": "duplicate" if duplicate else "stored",
+                                "id": fact_id})
+        return results
+
+    def store_entities_bulk(self, items: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Store many entities in a single transaction, reporting per-item status."""
+        timestamp = datetime.now().isoformat()
+        results = []
+        entities = []
+        for index, item in enumerate(items):
+            try:
+                entities.append(normalize_entity_item(item))
+            except ValueError as e:
+                results.append({"index": index, "status": "error", "error": str(e)})
+                continue
+            results.append({"index": index, "status": "stored"})
+        with self._write():
+            for name, data in entities:
+                self._insert_entity(name, data, timestamp)
+        return results
+
+    def store_preferences_bulk(self, items: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Store many preferences in a single transaction, reporting per-item status."""
+        timestamp = datetime.now().isoformat()
+        results = []
+        rows = []
+        for index, item in enumerate(items):
+            try:
+                key, value = normalize_preference_item(item)
+            except ValueError as e:
+                results.append({"index": index, "status": "error", "error": str(e)})
+                continue
+            rows.append((key, json.dumps(value), timestamp))
+            results.append({"index": index, "status": "stored"})
+        with self._write():
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO preferences (key, value, timestamp) VALUES (?, ?, ?)",
+                rows)
+        return results
+
+    def retrieve_facts(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Retrieve facts, optionally filtered by category."""
+        if category:
+            rows = self._query(
+                f"SELECT {FACT_COLUMNS} FROM facts "
+                "WHERE category = ? ORDER BY id", (category,))
+        else:
+            rows = self._query(f"SELECT {FACT_COLUMNS} FROM facts ORDER BY id")
+        return [self._fact_from_row(row) for row in rows]
+
+    def page_facts(self, category: Optional[str] = None, limit: int = 50,
+                   cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of facts in id order and the cursor for the next page."""
+        last_id = decode_cursor(cursor)
+        if category:
+            rows = self._query(
+                f"SELECT {FACT_COLUMNS} FROM facts "
+                "WHERE category = ? AND id > ? ORDER BY id LIMIT ?", (category, last_id, limit + 1))
+        else:
+            rows = self._query(
+                f"SELECT {FACT_COLUMNS} FROM facts "
+                "WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit + 1))
+        page = [self._fact_from_row(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(page[-1]["id"]) if len(rows) > limit else None
+        return page, next_cursor
+
+    def page_search(self, query: str, limit: int = 50, cursor: Optional[str] = None,
+                    ranked: bool = False,
+                    semantic: bool = False) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of search results; the cursor is a result offset."""
+        offset = decode_cursor(cursor)
+        results = self.search_memory(query, top_k=offset + limit + 1, ranked=ranked,
+                                     semantic=semantic)
+        page = results[offset:offset + limit]
+        next_cursor = encode_cursor(offset + limit) if len(results) > offset + limit else None
+        return page, next_cursor
+
+    def _iter_rows(self, sql: str, params: tuple = ()) -> Iterator[sqlite3.Row]:
+        """Stream rows in rowid batches so the lock is never held between batches.
+
+        ``sql`` must select ``rowid AS rid`` and accept ``rid > ?`` as its
+        final condition followed by the batch ``LIMIT`` placeholder.
+        """
+        last = 0
+        while True:
+            rows = self._query(sql, params + (last, EXPORT_BATCH_SIZE))
+            yield from rows
+            if len(rows) < EXPORT_BATCH_SIZE:
+                return
+            last = rows[-1]["rid"]
+
+    def recent_facts(self, n: int = 5) -> List[Dict[str, Any]]:
+        """Return the ``n`` most recently stored facts, oldest first."""
+        rows = self._query(f"SELECT {FACT_COLUMNS} FROM facts ORDER BY id DESC LIMIT ?", (n,))
+        return [self._fact_from_row(row) for row in reversed(rows)]
+
+    def iter_facts(self, category: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield facts one at a time, optionally filtered by category."""
+        if category:
+            rows = self._iter_rows(
+                f"SELECT rowid AS rid, {FACT_COLUMNS} FROM facts "
+                "WHERE category = ? AND rowid > ? ORDER BY rowid LIMIT ?", (category,))
+        else:
+            rows = self._iter_rows(
+                f"SELECT rowid AS rid, {FACT_COLUMNS} FROM facts "
+                "WHERE rowid > ? ORDER BY rowid LIMIT ?")
+        for row in rows:
+            yield self._fact_from_row(row)
+
+    def export_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield every fact, preference and entity as a typed export record."""
+        for fact in self.iter_facts():
+            yield {"type": "fact", "data": fact}
+        for row in self._iter_rows(
+                "SELECT rowid AS rid, key, value, timestamp FROM preferences "
+                "WHERE rowid > ? ORDER BY rowid LIMIT ?"):
+            yield {"type": "preference", "key": row["key"], "data": {
+                "value": json.loads(row["value"]), "timestamp": row["timestamp"]}}
+        for row in self._iter_rows(
+                "SELECT rowid AS rid, name, data, timestamp FROM entities "
+                "WHERE rowid > ? ORDER BY rowid LIMIT ?"):
+            yield {"type": "entity", "name": row["name"], "data": {
+                "data": json.loads(row["data"]), "timestamp": row["timestamp"]}}
+
+    def category_counts(self) -> Dict[str, int]:
+        """Count stored facts per category."""
+        rows = self._query("SELECT category, COUNT(*) FROM facts GROUP BY category")
+        return {row[0]: row[1] for row in rows}
+
+    def _evicted_ids(self, category: str, policy: RetentionPolicy, now: datetime) -> List[int]:
+        """Return ids of facts in ``category`` that ``policy`` evicts."""
+        evicted = set()
+        if policy.max_count is not None:
+            evicted.update(row["id"] for row in self._conn.execute(
+                "SELECT id FROM facts WHERE category = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+                (category, policy.max_count)))
+        cutoff = policy.age_cutoff(now)
+        if cutoff is not None:
+            evicted.update(row["id"] for row in self._conn.execute(
+                "SELECT id FROM facts WHERE category = ? AND timestamp < ?", (category, cutoff)))
+        evicted.update(row["id"] for row in self._conn.execute(
+            "SELECT id FROM facts WHERE category = ? AND expires_at <= ?",
+            (category, now.isoformat())))
+        return sorted(evicted)
+
+    def apply_retention(self) -> int:
+        """Archive facts that break their category's retention policy.
+
+        Facts reach the cold archive before they are deleted, as in
+        LongTermMemory. Returns the number of facts archived.
+        """
+        if not self.retention:
+            return 0
+        now = datetime.now()
+        with self._lock:
+            evicted_ids = []
+            for category in self.category_counts():
+                policy = policy_for(self.retention, category)
+                if policy is not None:
+                    evicted_ids.extend(self._evicted_ids(category, policy, now))
+            if not evicted_ids:
+                return 0
+            facts = []
+            for start in range(0, len(evicted_ids), EXPORT_BATCH_SIZE):
+                batch = evicted_ids[start:start + EXPORT_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                facts.extend(self._fact_from_row(row) for row in self._conn.execute(
+                    f"SELECT {FACT_COLUMNS} FROM facts WHERE id IN ({placeholders}) ORDER BY id",
+                    batch))
+            self.archive.append(facts)
+            with self._conn:
+                self._conn.executemany("DELETE FROM facts WHERE id = ?",
+                                       [(fact_id,) for fact_id in evicted_ids])
+            if self._vector_index is not None:
+                self._vector_index.remove(evicted_ids)
+            return len(facts)
+
+    def search_archive(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search archived facts; this scans the cold archive on every call."""
+        return self.archive.search(query, top_k=top_k)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report the size of the hot store and the cold archive."""
+        counts = self._query(
+            "SELECT (SELECT COUNT(*) FROM facts), (SELECT COUNT(*) FROM preferences), "
+            "(SELECT COUNT(*) FROM entities)")[0]
+        hot_bytes = sum(os.path.getsize(path) for path in (self.db_path, self.db_path + "-wal")
+                        if os.path.exists(path))
+        return {
+            "hot": {"facts": counts[0], "preferences": counts[1], "entities": counts[2],
+                    "bytes": hot_bytes},
+            "cold": {"facts": self.archive.count(), "bytes": self.archive.size_bytes}
+        }
+
+    def retrieve_preference(self, key: str) -> Optional[Any]:
+        """Retrieve a stored preference."""
+        rows = self._query("SELECT value FROM preferences WHERE key = ?", (key,))
+        return json.loads(rows[0]["value"]) if rows else None
+
+    def retrieve_preferences(self) -> Dict[str, Any]:
+        """Retrieve all preferences with their timestamps."""
+        rows = self._query("SELECT key, value, timestamp FROM preferences")
+        return {row["key"]: {"value": json.loads(row["value"]), "timestamp": row["timestamp"]}
+                for row in rows}
+
+    def retrieve_entity(self, entity_name: str) -> Optional[Dict[str, Any]]:
+        """Retrieve information about an entity."""
+        rows = self._query("SELECT data FROM entities WHERE name = ?", (entity_name,))
+        return json.loads(rows[0]["data"]) if rows else None
+
+    def _ensure_name_index(self) -> NameIndex:
+        """Build the in-memory entity name index on first use."""
+        with self._lock:
+            if self._name_index is None:
+                self._name_index = NameIndex.build(
+                    row["name"] for row in self._iter_rows(
+                        "SELECT rowid AS rid, name FROM entities "
+                        "WHERE rowid > ? ORDER BY rowid LIMIT ?"))
+        return self._name_index
+
+    def _entity_data(self, names: List[str]) -> Dict[str, Any]:
+        """Load entity data for the given names."""
+        if not names:
+            return {}
+        placeholders = ", ".join("?" * len(names))
+        rows = self._query(f"SELECT name, data FROM entities WHERE name IN ({placeholders})",
+                           tuple(names))
+        return {row["name"]: json.loads(row["data"]) for row in rows}
+
+    def complete_entities(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return entities whose names start with ``prefix`` (any case), in name order."""
+        names = self._ensure_name_index().prefix(prefix, limit)
+        data = self._entity_data(names)
+        return [{"name": name, "data": data[name]} for name in names if name in data]
+
+    def find_entities(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Find entities with names similar to ``query``, tolerating typos."""
+        matches = self._ensure_name_index().fuzzy(query, limit)
+        data = self._entity_data([name for _, name in matches])
+        return [{"name": name, "score": score, "data": data[name]}
+                for score, name in matches if name in data]
+
+    def _ensure_vectors(self) -> VectorIndex:
+        """Load the saved vector index, or build it, and bring it up to date."""
+        if not self.vector:
+            raise ValueError("Semantic search requires a store created with vector=True")
+        with self._lock:
+            if self._vector_index is None:
+                index = VectorIndex.load(self.vector_path) or VectorIndex()
+                index.sync((fact["id"], fact["content"]) for fact in self.iter_facts())
+                self._vector_index = index
+        return self._vector_index
+
+    def search_memory(self, query: str, top_k: Optional[int] = None,
+                      ranked: bool = False, semantic: bool = False) -> List[Dict[str, Any]]:
+        """Search through long-term memory.
+
+        Plain searches are case-insensitive substring matches. With
+        ``ranked=True`` results are ordered by BM25 score and limited to
+        ``top_k`` (default 10), as in LongTermMemory; ``semantic=True`` ranks
+        facts by vector similarity instead.
+        """
+        if semantic:
+            return self._search_semantic(query, top_k or 10)
+        if ranked:
+            return self._search_ranked(query, top_k or 10)
+        query_lower = query.lower()
+        limit = -1 if top_k is None else top_k
+        results = []
+        for row in self._query(
+                f"SELECT {FACT_COLUMNS} FROM facts "
+                "WHERE instr(lower(content), ?) > 0 ORDER BY id LIMIT ?", (query_lower, limit)):
+            results.append({"type": "fact", "data": self._fact_from_row(row)})
+        if top_k is not None:
+            limit = top_k - len(results)
+            if limit <= 0:
+                return results
+        for row in self._query(
+                "SELECT name, data, timestamp FROM entities "
+                "WHERE instr(lower(name), ?) > 0 ORDER BY rowid LIMIT ?", (query_lower, limit)):
+            results.append({"type": "entity", "name": row["name"], "data": {
+                "data": json.loads(row["data"]), "timestamp": row["timestamp"]}})
+        return results
+
+    def _search_semantic(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` facts closest to the query by cosine similarity."""
+        matches = self._ensure_vectors().query(query, top_k)
+        if not matches:
+            return []
+        placeholders = ", ".join("?" * len(matches))
+        rows = self._query(f"SELECT {FACT_COLUMNS} FROM facts WHERE id IN ({placeholders})",
+                           tuple(fact_id for _, fact_id in matches))
+        facts = {row["id"]: self._fact_from_row(row) for row in rows}
+        return [{"type": "fact", "score": score, "data": facts[fact_id]}
+                for score, fact_id in matches if fact_id in facts]
+
+    def _rank_rows(self, table: str, columns: str, tokens: List[str],
+                   top_k: int) -> List[Tuple[float, sqlite3.Row]]:
+        """Score rows containing any query token with BM25 and keep the best.
+
+        Only the postings of the query tokens are read, so the cost follows
+        the number of matching rows rather than the size of the table.
+        """
+        stats = self._query("SELECT docs, tokens FROM search_stats WHERE name = ?", (table,))
+        n_docs, total_tokens = stats[0]
+        if not n_docs:
+            return []
+        avg_len = total_tokens / n_docs
+        placeholders = ", ".join("?" * len(tokens))
+        postings = self._query(
+            f"SELECT t.term, t.doc_id, t.tf, d.token_count FROM {TERM_TABLES[table]} t "
+            f"JOIN {table} d ON d.rowid = t.doc_id WHERE t.term IN ({placeholders})",
+            tuple(tokens))
+        df = Counter(row["term"] for row in postings)
+        scores: Dict[int, float] = {}
+        for row in postings:
+            scores[row["doc_id"]] = scores.get(row["doc_id"], 0.0) + bm25_term_score(
+                row["tf"], df[row["term"]], n_docs, row["token_count"], avg_len)
+        best = heapq.nlargest(top_k, ((score, -doc_id) for doc_id, score in scores.items()
+                                      if score > 0))
+        if not best:
+            return []
+        placeholders = ", ".join("?" * len(best))
+        rows = self._query(
+            f"SELECT rowid AS rid, {columns} FROM {table} WHERE rowid IN ({placeholders})",
+            tuple(-doc_id for _, doc_id in best))
+        by_id = {row["rid"]: row for row in rows}
+        return [(score, by_id[-doc_id]) for score, doc_id in best if -doc_id in by_id]
+
+    def _search_ranked(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` facts and entities with the best BM25 scores."""
+        tokens = sorted(set(tokenize(query)))
+        if not tokens:
+            return []
+        results = [{"type": "fact", "score": score, "data": self._fact_from_row(row)}
+                   for score, row in self._rank_rows(
+                       "facts", FACT_COLUMNS, tokens, top_k)]
+        results.extend({"type": "entity", "score": score, "name": row["name"], "data": {
+                            "data": json.loads(row["data"]), "timestamp": row["timestamp"]}}
+                       for score, row in self._rank_rows(
+                           "entities", "name, data, timestamp", tokens, top_k))
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:top_k]
+
+    def flush(self):
+        """Save the vector index; other writes are committed as they happen."""
+        if self._vector_index is not None:
+            self._vector_index.save(self.vector_path)
+
+    def close(self):
+        """Stop background work and close the database connections."""
+        if self._retention_scheduler is not None:
+            self._retention_scheduler.stop()
+        self.flush()
+        self._close_connections()
+
+
+class SQLiteGoalsManager(_SQLiteStore):
+    """Goals stored in SQLite, API-compatible with GoalsManager."""
+
+    def __init__(self, db_path: str = "data/memory.db"):
+        super().__init__(db_path)
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS goals (
+                    id INTEGER PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    body TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_goals_status ON goals (status, id);
+            """)
+
+    def _load_goal(self, goal_id: int, status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if status:
+            rows = self._query(
+                "SELECT body FROM goals WHERE id = ? AND status = ?", (goal_id, status))
+        else:
+            rows = self._query("SELECT body FROM goals WHERE id = ?", (goal_id,))
+        return json.loads(rows[0]["body"]) if rows else None
+
+    def _write_goal(self, goal: Dict[str, Any]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO goals (id, status, body) VALUES (?, ?, ?)",
+            (goal["id"], goal["status"], json.dumps(goal)))
+
+    def add_goal(self, title: str, description: str, priority: str = "medium",
+                 target_date: Optional[str] = None):
+        """Add a new goal."""
+        with self._write():
+            next_id = self._conn.execute(
+                "SELECT COALESCE(MAX(id), 0) + 1 FROM goals").fetchone()[0]
+            goal = {
+                "id": next_id,
+                "title": title,
+                "description": description,
+                "priority": priority,
+                "target_date": target_date,
+                "status": "active",
+                "progress": 0,
+                "created_at": datetime.now().isoformat(),
+                "milestones": []
+            }
+            self._write_goal(goal)
+        return goal
+
+    def update_goal_progress(self, goal_id: int, progress: int):
+        """Update progress on a goal (0-100)."""
+        with self._write():
+            goal = self._load_goal(goal_id, status="active")
+            if goal is None:
+                return False
+            goal["progress"] = min(100, max(0, progress))
+            goal["last_updated"] = datetime.now().isoformat()
+            self._write_goal(goal)
+        return True
+
+    def complete_goal(self, goal_id: int):
+        """Mark a goal as completed."""
+        with self._write():
+            goal = self._load_goal(goal_id, status="active")
+            if goal is None:
+                return False
+            goal["status"] = "completed"
+            goal["progress"] = 100
+            goal["completed_at"] = datetime.now().isoformat()
+            self._write_goal(goal)
+        return True
+
+    def add_milestone(self, goal_id: int, milestone: str):
+        """Add a milestone to a goal."""
+        with self._write():
+            goal = self._load_goal(goal_id, status="active")
+            if goal is None:
+                return False
+            goal["milestones"].append({
+                "description": milestone,
+                "achieved": False,
+                "timestamp": datetime.now().isoformat()
+            })
+            self._write_goal(goal)
+        return True
+
+    def get_active_goals(self) -> List[Dict[str, Any]]:
+        """Retrieve all active goals."""
+        rows = self._query("SELECT body FROM goals WHERE status = 'active' ORDER BY id")
+        return [json.loads(row["body"]) for row in rows]
+
+    def page_goals(self, limit: int = 50,
+                   cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of active goals and the cursor for the next page."""
+        rows = self._query(
+            "SELECT id, body FROM goals WHERE status = 'active' AND id > ? ORDER BY id LIMIT ?",
+            (decode_cursor(cursor), limit + 1))
+        page = [json.loads(row["body"]) for row in rows[:limit]]
+        next_cursor = encode_cursor(page[-1]["id"]) if len(rows) > limit else None
+        return page, next_cursor
+
+    def get_completed_goals(self) -> List[Dict[str, Any]]:
+        """Retrieve all completed goals."""
+        rows = self._query("SELECT body FROM goals WHERE status = 'completed' ORDER BY id")
+        return [json.loads(row["body"]) for row in rows]
+
+    def export_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield every active and completed goal as a typed export record."""
+        for status in ("active", "completed"):
+            last = 0
+            while True:
+                rows = self._query(
+                    "SELECT id, body FROM goals WHERE status = ? AND id > ? ORDER BY id LIMIT ?",
+                    (status, last, EXPORT_BATCH_SIZE))
+                for row in rows:
+                    yield {"type": "goal", "data": json.loads(row["body"])}
+                if len(rows) < EXPORT_BATCH_SIZE:
+                    break
+                last = rows[-1]["id"]
+
+    def get_goal_by_id(self, goal_id: int) -> Optional[Dict[str, Any]]:
+        """Retrieve a specific goal by ID."""
+        return self._load_goal(goal_id)
+
+    def flush(self):
+        """Writes are committed as they happen; nothing is deferred."""
+
+    def close(self):
+        """Close the database connections."""
+        self._close_connections()
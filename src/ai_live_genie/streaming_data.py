@@ -3,11 +3,12 @@ Streaming Platform Data
 Contains payout rates and conversion information for various streaming platforms.
 """
 
-import json
 import os
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
+from . import codec
+
 
 class StreamingPlatformData:
     """Manages streaming platform payouts and conversion rates."""
@@ -211,16 +212,15 @@ class StreamingPlatformData:
         """Load custom streaming data if exists."""
         if os.path.exists(self.storage_path):
             try:
-                with open(self.storage_path, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
+                return codec.load_file(self.storage_path)
+            except codec.JSONDecodeError:
                 return {}
         return {}
     
     def _save_custom_data(self):
         """Save custom streaming data."""
-        with open(self.storage_path, 'w') as f:
-            json.dump(self.custom_data, f, indent=2)
+        with open(self.storage_path, 'wb') as f:
+            f.write(codec.dumps(self.custom_data))
     
     def get_platform_data(self, platform: str) -> Optional[Dict[str, Any]]:
         """Get payout data for a specific platform."""
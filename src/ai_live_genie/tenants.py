@@ -0,0 +1,170 @@
+"""
+Tenant pool for AI Live Genie
+Keeps one MemoryManager per tenant (user or session) in a bounded LRU pool,
+flushing and closing idle tenants when the pool is over budget.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Tenant ids become directory names, so only a conservative character set is allowed
+_TENANT_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+def validate_tenant_id(tenant_id: str) -> str:
+    """Return ``tenant_id`` if it is safe to use as a directory name."""
+    if not isinstance(tenant_id, str) or not _TENANT_ID_RE.match(tenant_id):
+        raise ValueError("Tenant id must be 1-64 letters, digits, '_', '-' or '.', "
+                         "starting with a letter or digit")
+    return tenant_id
+
+
+class TenantPool:
+    """LRU pool of per-tenant memory managers.
+
+    ``factory(tenant_id)`` builds a manager the first time a tenant is seen.
+    Callers ``acquire()`` a manager for the duration of a request and
+    ``release()`` it afterwards. When more than ``max_tenants`` are loaded,
+    the least recently used idle tenants are closed, which flushes their
+    pending writes; tenants still in use are never evicted, so the pool may
+    briefly exceed its budget under load. A tenant that is acquired again
+    while it is being closed waits for the close to finish, so it reloads
+    everything that was flushed.
+
+    A manager only bounds its own conversation sessions. ``max_messages``
+    and ``max_bytes``, when given, bound the conversation history of all
+    loaded tenants together: a tenant's ``conversational.usage()`` is
+    measured whenever it is released, and idle tenants are evicted, least
+    recently used first, until the measured total fits; the tenant being
+    released stays loaded. Tenants in use can grow past their last
+    measurement until they are released, so the worst case is the pool
+    budget plus one session budget per tenant in use or just released.
+    Long-term stores and goals are bounded by ``max_tenants`` alone.
+    """
+
+    def __init__(self, factory: Callable[[str], Any], max_tenants: int = 100,
+                 max_messages: Optional[int] = None, max_bytes: Optional[int] = None):
+        if max_tenants < 1:
+            raise ValueError("max_tenants must be at least 1")
+        if (max_messages is not None and max_messages < 1) or \
+                (max_bytes is not None and max_bytes < 1):
+            raise ValueError("max_messages and max_bytes must be at least 1")
+        self.factory = factory
+        self.max_tenants = max_tenants
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._managers: "OrderedDict[str, Any]" = OrderedDict()
+        self._refs: Dict[str, int] = {}
+        self._closing: Dict[str, threading.Event] = {}
+        # tenant id -> (messages, bytes) measured when the tenant was last released
+        self._usage: Dict[str, Tuple[int, int]] = {}
+        self._total_messages = 0
+        self._total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._managers)
+
+    def __contains__(self, tenant_id: str) -> bool:
+        return tenant_id in self._managers
+
+    def usage(self) -> Dict[str, int]:
+        """Return the loaded tenant count and their last measured messages and bytes."""
+        with self._lock:
+            return {"tenants": len(self._managers), "messages": self._total_messages,
+                    "bytes": self._total_bytes}
+
+    def acquire(self, tenant_id: str) -> Any:
+        """Return the tenant's manager, loading it if needed, and mark it in use."""
+        validate_tenant_id(tenant_id)
+        while True:
+            with self._lock:
+                closing = self._closing.get(tenant_id)
+                if closing is None:
+                    manager = self._managers.get(tenant_id)
+                    if manager is None:
+                        manager = self.factory(tenant_id)
+                        self._managers[tenant_id] = manager
+                    self._managers.move_to_end(tenant_id)
+                    self._refs[tenant_id] = self._refs.get(tenant_id, 0) + 1
+                    evicted = self._evict_idle(tenant_id)
+                    break
+            closing.wait()
+        self._close(evicted)
+        return manager
+
+    def release(self, tenant_id: str):
+        """Mark one use of the tenant's manager as finished."""
+        with self._lock:
+            refs = self._refs.get(tenant_id, 0) - 1
+            if refs > 0:
+                self._refs[tenant_id] = refs
+            else:
+                self._refs.pop(tenant_id, None)
+            if self._has_budget() and tenant_id in self._managers:
+                self._measure(tenant_id)
+            evicted = self._evict_idle(tenant_id)
+        self._close(evicted)
+
+    def _has_budget(self) -> bool:
+        return self.max_messages is not None or self.max_bytes is not None
+
+    def _measure(self, tenant_id: str):
+        """Record a tenant's conversation usage; called with the lock held."""
+        usage = self._managers[tenant_id].conversational.usage()
+        self._release_usage(tenant_id)
+        self._usage[tenant_id] = (usage["messages"], usage["bytes"])
+        self._total_messages += usage["messages"]
+        self._total_bytes += usage["bytes"]
+
+    def _release_usage(self, tenant_id: str):
+        messages, size = self._usage.pop(tenant_id, (0, 0))
+        self._total_messages -= messages
+        self._total_bytes -= size
+
+    def _over_budget(self) -> bool:
+        return (len(self._managers) > self.max_tenants
+                or (self.max_messages is not None and self._total_messages > self.max_messages)
+                or (self.max_bytes is not None and self._total_bytes > self.max_bytes))
+
+    def _evict_idle(self, active_id: str) -> List[tuple]:
+        """Detach least recently used idle tenants other than ``active_id`` over budget.
+
+        Called with the lock held.
+        """
+        evicted = []
+        if not self._over_budget():
+            return evicted
+        for tenant_id in list(self._managers):
+            if not self._over_budget():
+                break
+            if tenant_id in self._refs or tenant_id == active_id:
+                continue
+            evicted.append((tenant_id, self._managers.pop(tenant_id)))
+            self._release_usage(tenant_id)
+            self._closing[tenant_id] = threading.Event()
+        return evicted
+
+    def _close(self, evicted: List[tuple]):
+        """Close detached managers outside the lock, then let waiters reload them."""
+        for tenant_id, manager in evicted:
+            try:
+                manager.close()
+            finally:
+                with self._lock:
+                    self._closing.pop(tenant_id).set()
+
+    def close(self):
+        """Close every loaded tenant's manager."""
+        with self._lock:
+            evicted = list(self._managers.items())
+            self._managers.clear()
+            self._refs.clear()
+            self._usage.clear()
+            self._total_messages = 0
+            self._total_bytes = 0
+            for tenant_id, _ in evicted:
+                self._closing[tenant_id] = threading.Event()
+        self._close(evicted)
@@ -0,0 +1,25 @@
+"""
+Token estimates for AI Live Genie
+Counts the tokens a message will cost in a model's context window, so
+conversation history can be trimmed to a token budget.
+
+Any ``Callable[[str], int]`` can stand in for ``estimate_tokens``, for
+example a wrapper around the model's own tokenizer.
+"""
+
+from typing import Callable
+
+# Function returning the number of tokens in a piece of text
+Tokenizer = Callable[[str], int]
+
+# Average characters per token for English text in common BPE vocabularies
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate tokens as the larger of the word count and characters / CHARS_PER_TOKEN.
+
+    Word counts cover short words and punctuation-light chat, the character
+    ratio covers long words, URLs and text without spaces.
+    """
+    return max(len(text.split()), -(-len(text) // CHARS_PER_TOKEN))
@@ -0,0 +1,199 @@
+"""
+Vector index for AI Live Genie
+Local semantic recall: text is embedded with feature hashing (no model and no
+network) and matched by cosine similarity with NumPy.
+
+NumPy is optional; install the ``vector`` extra to enable semantic search.
+"""
+
+import os
+import threading
+import zlib
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+# NumPy, imported by require_numpy() on first use so plain imports stay cheap
+np = None
+
+from .search_index import tokenize
+
+# Embedding width; a power of two keeps the sign bit independent of the bucket
+DEFAULT_DIM = 256
+
+# Rows preallocated the first time the in-memory segment grows
+_INITIAL_CAPACITY = 64
+
+
+def require_numpy():
+    """Import NumPy on first use, raising a helpful ImportError when it is not installed."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("Semantic search requires NumPy; install it with "
+                              "'pip install ai-live-genie[vector]'") from None
+        np = numpy
+    return np
+
+
+@lru_cache(maxsize=65536)
+def _token_features(token: str, dim: int) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+    """Hash a token and its character trigrams to ``(buckets, signs)``.
+
+    Trigrams let related word forms ("stream", "streaming") share features.
+    crc32 is used rather than ``hash()`` so vectors are stable across runs.
+    """
+    padded = f"#{token}#"
+    features = [f"w:{token}"] + [f"g:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    buckets, signs = [], []
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        buckets.append(h % dim)
+        signs.append(1.0 if h & 0x80000000 else -1.0)
+    return tuple(buckets), tuple(signs)
+
+
+def embed(text: str, dim: int = DEFAULT_DIM) -> "np.ndarray":
+    """Embed text as a unit-length float32 vector (all zeros if it has no tokens)."""
+    require_numpy()
+    buckets: List[int] = []
+    signs: List[float] = []
+    for token in tokenize(text):
+        token_buckets, token_signs = _token_features(token, dim)
+        buckets.extend(token_buckets)
+        signs.extend(token_signs)
+    vector = np.bincount(np.asarray(buckets, dtype=np.intp), weights=signs,
+                         minlength=dim).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class VectorIndex:
+    """Matrix of unit embeddings answering top-k cosine queries.
+
+    Because rows are unit vectors, one matrix-vector product scores every
+    document. The index has a read-only base segment, memory-mapped from the
+    ``.npy`` file written by ``save()``, and an in-memory tail that grows by
+    doubling as documents are added.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        require_numpy()
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._base = np.zeros((0, dim), dtype=np.float32)
+        self._base_ids = np.zeros(0, dtype=np.int64)
+        self._tail = np.zeros((0, dim), dtype=np.float32)
+        self._tail_ids = np.zeros(0, dtype=np.int64)
+        self._tail_size = 0
+
+    def __len__(self) -> int:
+        return len(self._base_ids) + self._tail_size
+
+    def ids(self) -> "np.ndarray":
+        """Return the ids of every indexed document."""
+        return np.concatenate([self._base_ids, self._tail_ids[:self._tail_size]])
+
+    def add(self, doc_id: int, text: str):
+        """Embed and append a document."""
+        vector = embed(text, self.dim)
+        with self._lock:
+            if self._tail_size == len(self._tail_ids):
+                capacity = max(_INITIAL_CAPACITY, 2 * len(self._tail_ids))
+                tail = np.zeros((capacity, self.dim), dtype=np.float32)
+                tail_ids = np.zeros(capacity, dtype=np.int64)
+                tail[:self._tail_size] = self._tail[:self._tail_size]
+                tail_ids[:self._tail_size] = self._tail_ids[:self._tail_size]
+                # Publish the larger arrays before the size so readers never overrun
+                self._tail, self._tail_ids = tail, tail_ids
+            self._tail[self._tail_size] = vector
+            self._tail_ids[self._tail_size] = doc_id
+            self._tail_size += 1
+
+    def remove(self, doc_ids: Iterable[int]):
+        """Drop documents; this copies the surviving rows into memory."""
+        doomed = np.fromiter(doc_ids, dtype=np.int64)
+        if not len(doomed):
+            return
+        with self._lock:
+            matrix = np.concatenate([self._base, self._tail[:self._tail_size]])
+            ids = self.ids()
+            keep = ~np.isin(ids, doomed)
+            self._base, self._base_ids = matrix[keep], ids[keep]
+            self._tail = np.zeros((0, self.dim), dtype=np.float32)
+            self._tail_ids = np.zeros(0, dtype=np.int64)
+            self._tail_size = 0
+
+    def query(self, text: str, top_k: int) -> List[Tuple[float, int]]:
+        """Return up to ``top_k`` ``(cosine, doc_id)`` pairs with positive similarity."""
+        vector = embed(text, self.dim)
+        with self._lock:
+            base, base_ids = self._base, self._base_ids
+            tail, tail_ids = self._tail[:self._tail_size], self._tail_ids[:self._tail_size]
+        if top_k <= 0 or not (len(base_ids) + len(tail_ids)) or not vector.any():
+            return []
+        scores = np.concatenate([base @ vector, tail @ vector])
+        ids = np.concatenate([base_ids, tail_ids])
+        if top_k < len(scores):
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        # Highest score first; ties keep insertion order
+        best = best[np.lexsort((best, -scores[best]))]
+        return [(float(scores[i]), int(ids[i])) for i in best if scores[i] > 0]
+
+    def save(self, path: str):
+        """Write the index to ``path`` and ``<path>.ids.npy`` and memory-map it back."""
+        with self._lock:
+            matrix = np.concatenate([self._base, self._tail[:self._tail_size]])
+            ids = self.ids()
+            for target, array in ((path, matrix), (path + ".ids.npy", ids)):
+                tmp_path = target + ".tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, array)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, target)
+            self._base = np.load(path, mmap_mode="r")
+            self._base_ids = ids
+            self._tail = np.zeros((0, self.dim), dtype=np.float32)
+            self._tail_ids = np.zeros(0, dtype=np.int64)
+            self._tail_size = 0
+
+    @classmethod
+    def load(cls, path: str, dim: int = DEFAULT_DIM) -> Optional["VectorIndex"]:
+        """Memory-map an index written by ``save()``, or return None if unusable."""
+        require_numpy()
+        ids_path = path + ".ids.npy"
+        if not (os.path.exists(path) and os.path.exists(ids_path)):
+            return None
+        try:
+            matrix = np.load(path, mmap_mode="r")
+            ids = np.load(ids_path)
+        except (OSError, ValueError):
+            return None
+        if matrix.ndim != 2 or matrix.shape[1] != dim or len(ids) != len(matrix):
+            return None
+        index = cls(dim)
+        index._base, index._base_ids = matrix, ids.astype(np.int64)
+        return index
+
+    def sync(self, documents: Iterable[Tuple[int, str]]):
+        """Reconcile with the store: drop unknown ids and embed missing documents.
+
+        ``documents`` yields ``(doc_id, text)`` for every live document. This
+        makes the saved file a cache that is repaired cheaply on load.
+        """
+        indexed = set(self.ids().tolist())
+        live = set()
+        missing = []
+        for doc_id, text in documents:
+            live.add(doc_id)
+            if doc_id not in indexed:
+                missing.append((doc_id, text))
+        stale = indexed - live
+        if stale:
+            self.remove(stale)
+        for doc_id, text in missing:
+            self.add(doc_id, text)
@@ -7,10 +7,13 @@ import json
 import os
 import sys
 import shutil
+import threading
+import time
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+from ai_live_genie import api_server
 from ai_live_genie.api_server import app
 
 
@@ -42,6 +45,9 @@ class TestAPIServer(unittest.TestCase):
             delattr(self.app, 'memory_manager')
         if hasattr(self.app, 'streaming_data'):
             delattr(self.app, 'streaming_data')
+        if hasattr(self.app, 'tenant_pool'):
+            self.app.tenant_pool.close()
+            delattr(self.app, 'tenant_pool')
         
         self.client = self.app.test_client()
         self.api_key = 'test-api-key'
@@ -138,6 +144,44 @@ class TestAPIServer(unittest.TestCase):
         self.assertIn('history', data)
         self.assertIsInstance(data['history'], list)
     
+    def test_get_conversation_history_paginated(self):
+        """Test cursor pagination of conversation history."""
+        for i in range(3):
+            self.client.post('/api/conversation/message', headers=self.get_headers(),
+                             json={'role': 'user', 'content': f'Message {i}'})
+        
+        response = self.client.get('/api/conversation/history?limit=2',
+                                  headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual([m['content'] for m in data['history']], ['Message 0', 'Message 1'])
+        response = self.client.get(
+            f"/api/conversation/history?limit=2&cursor={data['next_cursor']}",
+            headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual([m['content'] for m in data['history']], ['Message 2'])
+        self.assertIsNone(data['next_cursor'])
+    
+    def test_conversation_sessions(self):
+        """Test that session_id keeps concurrent conversations apart."""
+        for session_id in ('viewer-1', 'viewer-2'):
+            self.client.post('/api/conversation/message', headers=self.get_headers(),
+                             json={'role': 'user', 'content': f'Hi from {session_id}',
+                                   'session_id': session_id})
+        response = self.client.get('/api/conversation/history?session_id=viewer-2',
+                                   headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual([m['content'] for m in data['history']], ['Hi from viewer-2'])
+        response = self.client.get('/api/conversation/history', headers=self.get_headers())
+        self.assertEqual(json.loads(response.data)['history'], [])
+        
+        response = self.client.get('/api/conversation/sessions', headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertIn('viewer-1', data['sessions'])
+        self.assertEqual(data['usage']['messages'], 2)
+        response = self.client.get('/api/conversation/history?session_id=../x',
+                                   headers=self.get_headers())
+        self.assertEqual(response.status_code, 400)
+    
     def test_get_conversation_summary(self):
         """Test getting conversation summary."""
         response = self.client.get('/api/conversation/summary',
@@ -178,6 +222,369 @@ class TestAPIServer(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('facts', data)
     
+    def test_store_facts_bulk_json(self):
+        """Test bulk fact ingest from a JSON array."""
+        response = self.client.post('/api/memory/fact/bulk',
+                                   headers=self.get_headers(),
+                                   json=['First fact',
+                                         {'fact': 'Second fact', 'category': 'test'},
+                                         {'category': 'test'}])
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['stored'], 2)
+        self.assertEqual(data['failed'], 1)
+        self.assertEqual(data['results'][2]['status'], 'error')
+        self.assertEqual(data['results'][1]['id'], 2)
+        
+        response = self.client.get('/api/memory/fact?category=test', headers=self.get_headers())
+        self.assertEqual(len(json.loads(response.data)['facts']), 1)
+    
+    def test_store_facts_bulk_ndjson(self):
+        """Test bulk fact ingest from an NDJSON body."""
+        body = '{"fact": "Line one"}\n{"fact": "Line two"}\nnot json\n'
+        response = self.client.post('/api/memory/fact/bulk',
+                                   headers={'X-API-Key': self.api_key,
+                                            'Content-Type': 'application/x-ndjson'},
+                                   data=body)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['stored'], 2)
+        self.assertEqual(data['failed'], 1)
+    
+    def test_store_bulk_invalid_body(self):
+        """Test that a non-array body is rejected."""
+        response = self.client.post('/api/memory/fact/bulk',
+                                   headers=self.get_headers(),
+                                   json={'fact': 'Not a list'})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_json_codec_responses(self):
+        """Test that responses are compact UTF-8 JSON and bad bodies get 400."""
+        response = self.client.post('/api/memory/fact',
+                                   headers=self.get_headers(),
+                                   json={'fact': 'Café stream on Fridays', 'category': 'schedule'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertNotIn(b'\n  ', response.data)
+        response = self.client.get('/api/memory/fact', headers=self.get_headers())
+        self.assertEqual(response.get_json()['facts'][0]['content'], 'Café stream on Fridays')
+        
+        response = self.client.post('/api/memory/fact', headers=self.get_headers(),
+                                   data='{"fact": ')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_store_entities_and_preferences_bulk(self):
+        """Test bulk entity and preference ingest."""
+        response = self.client.post('/api/memory/entity/bulk',
+                                   headers=self.get_headers(),
+                                   json=[{'entity_name': 'main', 'entity_data': {'subs': 5}}])
+        self.assertEqual(json.loads(response.data)['stored'], 1)
+        response = self.client.post('/api/memory/preference/bulk',
+                                   headers=self.get_headers(),
+                                   json=[{'key': 'theme', 'value': 'dark'}, {'key': 'x'}])
+        data = json.loads(response.data)
+        self.assertEqual((data['stored'], data['failed']), (1, 1))
+        
+        response = self.client.get('/api/memory/entity/main', headers=self.get_headers())
+        self.assertEqual(json.loads(response.data)['data']['subs'], 5)
+        response = self.client.get('/api/memory/preference/theme', headers=self.get_headers())
+        self.assertEqual(json.loads(response.data)['value'], 'dark')
+    
+    def test_malformed_items_are_rejected(self):
+        """Test that non-string names, keys and categories get 400 or a per-item error."""
+        for path, body in (('/api/memory/fact', {'fact': 'Bad', 'category': ['a']}),
+                           ('/api/memory/entity', {'entity_name': 42, 'entity_data': {'a': 1}}),
+                           ('/api/memory/preference', {'key': ['theme'], 'value': 'dark'}),
+                           ('/api/memory/fact', ['Not an object'])):
+            response = self.client.post(path, headers=self.get_headers(), json=body)
+            self.assertEqual(response.status_code, 400, path)
+        response = self.client.post('/api/memory/fact/bulk', headers=self.get_headers(),
+                                    json=[{'fact': 'Bad', 'category': {}}, 'Good fact'])
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual((data['stored'], data['failed']), (1, 1))
+        response = self.client.get('/api/memory/search?query=fact', headers=self.get_headers())
+        self.assertEqual(response.status_code, 200)
+    
+    def test_export_memory(self):
+        """Test streaming NDJSON export of long-term memory."""
+        self.client.post('/api/memory/fact/bulk', headers=self.get_headers(),
+                         json=['Fact one', 'Fact two'])
+        self.client.post('/api/memory/preference', headers=self.get_headers(),
+                         json={'key': 'theme', 'value': 'dark'})
+        
+        response = self.client.get('/api/memory/export', headers=self.get_headers())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        records = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual([r['type'] for r in records], ['fact', 'fact', 'preference'])
+    
+    def test_retrieve_facts_paginated(self):
+        """Test cursor pagination of facts."""
+        self.client.post('/api/memory/fact/bulk', headers=self.get_headers(),
+                         json=[f'Fact {i}' for i in range(5)])
+        
+        seen = []
+        cursor = None
+        while True:
+            url = '/api/memory/fact?limit=2' + (f'&cursor={cursor}' if cursor else '')
+            data = json.loads(self.client.get(url, headers=self.get_headers()).data)
+            seen.extend(f['content'] for f in data['facts'])
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'Fact {i}' for i in range(5)])
+        
+        response = self.client.get('/api/memory/fact?limit=0', headers=self.get_headers())
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/memory/fact?cursor=abc', headers=self.get_headers())
+        self.assertEqual(response.status_code, 400)
+    
+    def test_search_memory_paginated(self):
+        """Test cursor pagination of search results."""
+        self.client.post('/api/memory/fact/bulk', headers=self.get_headers(),
+                         json=[f'Stream tip {i}' for i in range(3)])
+        
+        response = self.client.get('/api/memory/search?query=stream&limit=2',
+                                  headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual(len(data['results']), 2)
+        response = self.client.get(
+            f"/api/memory/search?query=stream&limit=2&cursor={data['next_cursor']}",
+            headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual([r['data']['content'] for r in data['results']], ['Stream tip 2'])
+        self.assertIsNone(data['next_cursor'])
+    
+    def test_search_memory_semantic_requires_vector(self):
+        """Test that semantic search is rejected unless MEMORY_VECTOR is enabled."""
+        response = self.client.get('/api/memory/search?query=stream&semantic=true',
+                                   headers=self.get_headers())
+        self.assertEqual(response.status_code, 400)
+    
+    def test_entity_autocomplete(self):
+        """Test entity lookup by prefix and by fuzzy name."""
+        for name in ['Ninja', 'Nightbot', 'Pokimane']:
+            self.client.post('/api/memory/entity', headers=self.get_headers(),
+                             json={'entity_name': name, 'entity_data': {'kind': 'x'}})
+        
+        response = self.client.get('/api/memory/entity?prefix=ni&limit=1',
+                                   headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual([e['name'] for e in data['entities']], ['Nightbot'])
+        response = self.client.get('/api/memory/entity?query=pokiman',
+                                   headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual(data['entities'][0]['name'], 'Pokimane')
+        response = self.client.get('/api/memory/entity', headers=self.get_headers())
+        self.assertEqual(response.status_code, 400)
+    
+    def test_get_fact_categories(self):
+        """Test per-category fact counts."""
+        for category in ['schedule', 'schedule', 'content']:
+            self.client.post('/api/memory/fact', headers=self.get_headers(),
+                             json={'fact': 'A fact', 'category': category})
+        
+        response = self.client.get('/api/memory/categories', headers=self.get_headers())
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['categories'], {'schedule': 2, 'content': 1})
+    
+    def test_journal_mode(self):
+        """Test that MEMORY_JOURNAL appends long-term writes to a journal."""
+        self.app.config['MEMORY_JOURNAL'] = True
+        try:
+            response = self.client.post('/api/memory/fact', headers=self.get_headers(),
+                                        json={'fact': 'Journaled fact'})
+            self.assertEqual(response.status_code, 200)
+        finally:
+            del self.app.config['MEMORY_JOURNAL']
+        long_term = self.app.memory_manager.long_term
+        self.assertTrue(long_term.journal)
+        self.assertTrue(os.path.exists(long_term.journal_path))
+    
+    def test_prefetch_on_startup(self):
+        """Test that MEMORY_PREFETCH loads the stores in the background."""
+        self.app.config['MEMORY_PREFETCH'] = True
+        try:
+            response = self.client.get('/api/goals', headers=self.get_headers())
+            self.assertEqual(response.status_code, 200)
+        finally:
+            del self.app.config['MEMORY_PREFETCH']
+        manager = self.app.memory_manager
+        manager.prefetch().join()
+        self.assertEqual(set(manager._stores), {'long_term', 'goals'})
+    
+    def test_tenants_are_isolated(self):
+        """Test that each X-Tenant-ID gets its own conversation and facts."""
+        alice = dict(self.get_headers(), **{'X-Tenant-ID': 'alice'})
+        bob = dict(self.get_headers(), **{'X-Tenant-ID': 'bob'})
+        self.client.post('/api/memory/fact', headers=alice, json={'fact': 'Alice streams art'})
+        self.client.post('/api/conversation/message', headers=bob,
+                         json={'role': 'user', 'content': 'Hi from Bob'})
+        
+        facts = json.loads(self.client.get('/api/memory/fact', headers=alice).data)['facts']
+        self.assertEqual([f['content'] for f in facts], ['Alice streams art'])
+        facts = json.loads(self.client.get('/api/memory/fact', headers=bob).data)['facts']
+        self.assertEqual(facts, [])
+        history = json.loads(self.client.get('/api/conversation/history', headers=alice).data)
+        self.assertEqual(history['history'], [])
+        default = json.loads(self.client.get('/api/memory/fact', headers=self.get_headers()).data)
+        self.assertEqual(default['facts'], [])
+        self.assertTrue(os.path.isdir(os.path.join(self.test_dir, 'tenants', 'alice')))
+        
+        bad = dict(self.get_headers(), **{'X-Tenant-ID': '../etc'})
+        response = self.client.get('/api/memory/fact', headers=bad)
+        self.assertEqual(response.status_code, 400)
+    
+    def test_idle_tenants_are_evicted(self):
+        """Test that the pool unloads idle tenants and reloads them from disk."""
+        self.app.config['MEMORY_MAX_TENANTS'] = 1
+        try:
+            for tenant in ('alice', 'bob'):
+                headers = dict(self.get_headers(), **{'X-Tenant-ID': tenant})
+                self.client.post('/api/memory/fact', headers=headers,
+                                 json={'fact': f'{tenant} fact'})
+            pool = self.app.tenant_pool
+            self.assertEqual(len(pool), 1)
+            self.assertNotIn('alice', pool)
+            headers = dict(self.get_headers(), **{'X-Tenant-ID': 'alice'})
+            facts = json.loads(self.client.get('/api/memory/fact', headers=headers).data)['facts']
+            self.assertEqual([f['content'] for f in facts], ['alice fact'])
+        finally:
+            del self.app.config['MEMORY_MAX_TENANTS']
+    
+    def test_tenants_share_a_conversation_budget(self):
+        """Test that idle tenants are unloaded once all conversations exceed the pool budget."""
+        self.app.config['MEMORY_TENANTS_MAX_MESSAGES'] = 3
+        try:
+            for tenant in ('alice', 'bob'):
+                headers = dict(self.get_headers(), **{'X-Tenant-ID': tenant})
+                for i in range(2):
+                    response = self.client.post('/api/conversation/message', headers=headers,
+                                                json={'role': 'user', 'content': f'Hi {i}'})
+                    self.assertEqual(response.status_code, 200)
+            pool = self.app.tenant_pool
+            self.assertNotIn('alice', pool)
+            self.assertIn('bob', pool)
+            self.assertEqual(pool.usage()['messages'], 2)
+        finally:
+            del self.app.config['MEMORY_TENANTS_MAX_MESSAGES']
+    
+    def test_first_requests_share_one_manager(self):
+        """Test that concurrent first requests build the default manager only once."""
+        create = api_server.create_memory_manager
+        def slow_create(data_dir):
+            time.sleep(0.05)
+            return create(data_dir)
+        api_server.create_memory_manager = slow_create
+        try:
+            managers = []
+            def first_request():
+                with self.app.test_request_context(headers=self.get_headers()):
+                    managers.append(api_server.get_memory_manager())
+            workers = [threading.Thread(target=first_request) for _ in range(4)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+        finally:
+            api_server.create_memory_manager = create
+        self.assertEqual(len({id(manager) for manager in managers}), 1)
+    
+    def test_first_tenant_requests_share_one_pool(self):
+        """Test that concurrent first tenant requests build the tenant pool only once."""
+        pool_class = api_server.TenantPool
+        def slow_pool(*args, **kwargs):
+            time.sleep(0.05)
+            return pool_class(*args, **kwargs)
+        api_server.TenantPool = slow_pool
+        try:
+            pools = []
+            def first_request():
+                with self.app.test_request_context():
+                    pools.append(api_server.get_tenant_pool())
+            workers = [threading.Thread(target=first_request) for _ in range(4)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+        finally:
+            api_server.TenantPool = pool_class
+        self.assertEqual(len({id(pool) for pool in pools}), 1)
+    
+    def test_concurrent_stress(self):
+        """Test that many threads hammering the API leave consistent stores."""
+        threads, rounds = 8, 20
+        errors = []
+        
+        def worker(n):
+            client = self.app.test_client()
+            try:
+                for i in range(rounds):
+                    responses = [
+                        client.post('/api/memory/fact', headers=self.get_headers(),
+                                    json={'fact': f'Worker {n} fact {i}', 'category': f'w{n}'}),
+                        client.post('/api/conversation/message', headers=self.get_headers(),
+                                    json={'role': 'user', 'content': f'{n}-{i}'}),
+                        client.post('/api/goals', headers=self.get_headers(),
+                                    json={'title': f'Goal {n}-{i}', 'description': 'Stress'}),
+                        client.get('/api/memory/search?query=fact', headers=self.get_headers()),
+                        client.get('/api/memory/fact?limit=10', headers=self.get_headers()),
+                        client.get('/api/conversation/history', headers=self.get_headers()),
+                    ]
+                    for response in responses:
+                        if response.status_code != 200:
+                            errors.append(response.status_code)
+            except Exception as e:
+                errors.append(e)
+        
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.assertEqual(errors, [])
+        
+        response = self.client.get('/api/memory/fact', headers=self.get_headers())
+        facts = json.loads(response.data)['facts']
+        self.assertEqual(len(facts), threads * rounds)
+        self.assertEqual(len({f['id'] for f in facts}), threads * rounds)
+        for n in range(threads):
+            mine = [f['content'] for f in facts if f['category'] == f'w{n}']
+            self.assertEqual(mine, [f'Worker {n} fact {i}' for i in range(rounds)])
+        goals = json.loads(self.client.get('/api/goals', headers=self.get_headers()).data)['goals']
+        self.assertEqual(len({g['id'] for g in goals}), threads * rounds)
+        history = json.loads(self.client.get('/api/conversation/history',
+                                             headers=self.get_headers()).data)['history']
+        self.assertEqual([m['id'] for m in history],
+                         list(range(threads * rounds - len(history) + 1, threads * rounds + 1)))
+        with open(os.path.join(self.test_dir, 'long_term_memory.json')) as f:
+            self.assertEqual(len(json.load(f)['facts']), threads * rounds)
+    
+    def test_retention_and_archive(self):
+        """Test running retention, searching the archive and reading stats."""
+        self.app.config['MEMORY_RETENTION'] = {'chat': {'max_count': 1}}
+        try:
+            for i in range(3):
+                self.client.post('/api/memory/fact', headers=self.get_headers(),
+                                 json={'fact': f'Chat fact {i}', 'category': 'chat'})
+            response = self.client.post('/api/memory/retention', headers=self.get_headers())
+            self.assertEqual(json.loads(response.data)['archived'], 2)
+        finally:
+            del self.app.config['MEMORY_RETENTION']
+        
+        response = self.client.get('/api/memory/archive/search?query=chat',
+                                   headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual([r['data']['content'] for r in data['results']],
+                         ['Chat fact 0', 'Chat fact 1'])
+        
+        response = self.client.get('/api/memory/stats', headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual(data['hot']['facts'], 1)
+        self.assertEqual(data['cold']['facts'], 2)
+    
     def test_store_preference(self):
         """Test storing a preference."""
         response = self.client.post('/api/memory/preference',
@@ -241,6 +648,24 @@ class TestAPIServer(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('results', data)
     
+    def test_search_memory_top_k(self):
+        """Test ranked top-k search."""
+        for fact in ['YouTube tips', 'YouTube YouTube growth', 'Twitch tips']:
+            self.client.post('/api/memory/fact', headers=self.get_headers(),
+                             json={'fact': fact})
+        
+        response = self.client.get('/api/memory/search?query=youtube&top_k=1',
+                                  headers=self.get_headers())
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['data']['content'], 'YouTube YouTube growth')
+        self.assertIn('score', results[0])
+        
+        response = self.client.get('/api/memory/search?query=youtube&top_k=0',
+                                  headers=self.get_headers())
+        self.assertEqual(response.status_code, 400)
+    
     # ========== Goals Management Tests ==========
     
     def test_add_goal(self):
@@ -265,6 +690,33 @@ class TestAPIServer(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('goals', data)
     
+    def test_export_goals(self):
+        """Test streaming NDJSON export of goals."""
+        for title in ['Goal one', 'Goal two']:
+            self.client.post('/api/goals', headers=self.get_headers(),
+                             json={'title': title, 'description': 'Description'})
+        self.client.post('/api/goals/1/complete', headers=self.get_headers())
+        
+        response = self.client.get('/api/goals/export', headers=self.get_headers())
+        self.assertEqual(response.status_code, 200)
+        records = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual([r['data']['title'] for r in records], ['Goal two', 'Goal one'])
+    
+    def test_get_goals_paginated(self):
+        """Test cursor pagination of active goals."""
+        for title in ['Goal one', 'Goal two', 'Goal three']:
+            self.client.post('/api/goals', headers=self.get_headers(),
+                             json={'title': title, 'description': 'Description'})
+        
+        response = self.client.get('/api/goals?limit=2', headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual(len(data['goals']), 2)
+        response = self.client.get(f"/api/goals?cursor={data['next_cursor']}",
+                                  headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual([g['title'] for g in data['goals']], ['Goal three'])
+        self.assertIsNone(data['next_cursor'])
+    
     def test_get_goal_by_id(self):
         """Test getting a specific goal."""
         # Create a goal first
@@ -417,6 +869,20 @@ class TestAPIServer(unittest.TestCase):
         self.assertIn('active_goals', data)
         self.assertIn('preferences', data)
     
+    def test_get_full_context_token_budget(self):
+        """Test that max_tokens trims the context's history to the newest messages."""
+        for content in ('An older message that is rather long', 'Latest'):
+            self.client.post('/api/conversation/message', headers=self.get_headers(),
+                             json={'role': 'user', 'content': content})
+        response = self.client.get('/api/context?max_tokens=3', headers=self.get_headers())
+        data = json.loads(response.data)
+        self.assertEqual([m['content'] for m in data['conversation_history']], ['Latest'])
+        response = self.client.get('/api/conversation/history?max_tokens=100',
+                                   headers=self.get_headers())
+        self.assertEqual(len(json.loads(response.data)['history']), 2)
+        response = self.client.get('/api/context?max_tokens=-1', headers=self.get_headers())
+        self.assertEqual(response.status_code, 400)
+    
     # ========== Error Handling Tests ==========
     
     def test_404_error(self):
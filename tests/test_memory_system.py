@@ -5,13 +5,44 @@ Test suite for AI Live Genie Memory and Streaming Data systems.
 import unittest
 import os
 import sys
+import argparse
 import json
+import multiprocessing
 import shutil
+import subprocess
+import threading
+import time
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from ai_live_genie import ConversationalMemory, LongTermMemory, GoalsManager, MemoryManager, StreamingPlatformData
+from ai_live_genie import SQLiteLongTermMemory, SQLiteGoalsManager, RetentionPolicy
+from ai_live_genie import ConversationSessions, ShardedLongTermMemory, codec
+from ai_live_genie.cli import convert_store, export_data
+from ai_live_genie.locking import ReadWriteLock, fcntl
+from ai_live_genie.persistence import BackgroundFlusher, read_tail_lines
+from ai_live_genie.retention import RetentionScheduler
+from ai_live_genie.ring_buffer import RingBuffer
+from ai_live_genie.sharded_storage import shard_filename
+from ai_live_genie.tenants import TenantPool
+from ai_live_genie.tokens import estimate_tokens
+from ai_live_genie.search_index import NameIndex, TokenIndex, tokenize, trigrams
+from ai_live_genie.segments import (
+    MAGIC,
+    SegmentError,
+    SegmentReader,
+    encode_segment,
+    is_segment,
+    json_to_segment,
+    segment_to_json,
+)
+from ai_live_genie.vector_index import VectorIndex, embed
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class TestConversationalMemory(unittest.TestCase):
@@ -40,11 +71,205 @@ class TestConversationalMemory(unittest.TestCase):
         self.assertEqual(len(last_two), 2)
         self.assertEqual(last_two[-1]["content"], "Message 4")
     
+    def test_page_history(self):
+        """Test that history cursors stay valid as old messages are evicted."""
+        for i in range(4):
+            self.memory.add_message("user", f"Message {i}")
+        page, cursor = self.memory.page_history(limit=2)
+        self.assertEqual([m["content"] for m in page], ["Message 0", "Message 1"])
+        for i in range(4, 7):
+            self.memory.add_message("user", f"Message {i}")
+        page, cursor = self.memory.page_history(limit=10, cursor=cursor)
+        self.assertEqual([m["content"] for m in page],
+                         ["Message 2", "Message 3", "Message 4", "Message 5", "Message 6"])
+        self.assertIsNone(cursor)
+    
+    def test_eviction_callback(self):
+        """Test that evicted messages are handed to on_evict, oldest first."""
+        evicted = []
+        memory = ConversationalMemory(max_history=3, on_evict=evicted.append)
+        for i in range(5):
+            memory.add_message("user", f"Message {i}")
+        self.assertEqual([m["content"] for m in evicted], ["Message 0", "Message 1"])
+        self.assertEqual([m["content"] for m in memory.get_history()],
+                         ["Message 2", "Message 3", "Message 4"])
+        self.assertEqual([m["content"] for m in memory.get_history(last_n=10)],
+                         ["Message 2", "Message 3", "Message 4"])
+        
+        memory.max_history = 1
+        self.assertEqual([m["content"] for m in evicted[2:]], ["Message 2", "Message 3"])
+        self.assertEqual(memory.get_history()[0]["content"], "Message 4")
+        memory.clear()
+        self.assertEqual(len(evicted), 4)
+        self.assertEqual(memory.get_context_summary(), "No conversation history.")
+    
     def test_clear(self):
         """Test clearing memory."""
         self.memory.add_message("user", "Test")
         self.memory.clear()
         self.assertEqual(len(self.memory.get_history()), 0)
+    
+    def test_token_budget(self):
+        """Test that max_tokens keeps the newest messages that fit, across wraparound."""
+        calls = []
+        def words(text):
+            calls.append(text)
+            return len(text.split())
+        memory = ConversationalMemory(max_history=4, tokenizer=words)
+        for text in ["one", "two words", "three more words", "four", "five six"]:
+            memory.add_message("user", text)
+        self.assertEqual(len(calls), 5)
+        contents = lambda **kw: [m["content"] for m in memory.get_history(**kw)]
+        self.assertEqual(contents(max_tokens=3), ["four", "five six"])
+        self.assertEqual(contents(max_tokens=5), ["four", "five six"])
+        self.assertEqual(contents(max_tokens=6), ["three more words", "four", "five six"])
+        self.assertEqual(contents(max_tokens=100), contents())
+        self.assertEqual(contents(max_tokens=1), [])
+        self.assertEqual(contents(last_n=1, max_tokens=100), ["five six"])
+        self.assertEqual(len(calls), 5)
+        self.assertEqual((estimate_tokens("hi"), estimate_tokens("a b c"),
+                          estimate_tokens("x" * 40)), (1, 3, 10))
+
+
+class TestRingBuffer(unittest.TestCase):
+    """Test the fixed-capacity ring buffer."""
+    
+    def test_append_evicts_oldest(self):
+        """Test wraparound, indexing, slicing and tail."""
+        buffer = RingBuffer(3)
+        self.assertEqual([buffer.append(i) for i in range(5)], [None, None, None, 0, 1])
+        self.assertEqual(list(buffer), [2, 3, 4])
+        self.assertEqual((buffer[0], buffer[-1], buffer[1:]), (2, 4, [3, 4]))
+        self.assertEqual(buffer.tail(2), [3, 4])
+        self.assertEqual(buffer.tail(10), [2, 3, 4])
+        self.assertEqual(buffer.tail(0), [])
+        with self.assertRaises(IndexError):
+            buffer[3]
+    
+    def test_resize_and_clear(self):
+        """Test that shrinking returns the oldest items and growing keeps order."""
+        buffer = RingBuffer(4)
+        for i in range(6):
+            buffer.append(i)
+        self.assertEqual(buffer.resize(2), [2, 3])
+        self.assertEqual(buffer.resize(5), [])
+        buffer.append(6)
+        self.assertEqual(list(buffer), [4, 5, 6])
+        buffer.clear()
+        self.assertEqual((len(buffer), buffer.capacity), (0, 5))
+        with self.assertRaises(ValueError):
+            RingBuffer(0)
+
+
+class TestConversationSessions(unittest.TestCase):
+    """Test the session registry and its global budget."""
+    
+    def test_sessions_are_separate(self):
+        """Test that sessions keep their own history and the registry acts on the default."""
+        sessions = ConversationSessions(max_history=3)
+        sessions.session("viewer-1").add_message("user", "Hi from one")
+        sessions.session("viewer-2").add_message("user", "Hi from two")
+        sessions.add_message("user", "Hi from default")
+        self.assertEqual(sessions.session("viewer-1").get_history()[0]["content"], "Hi from one")
+        self.assertEqual(sessions.get_history()[0]["content"], "Hi from default")
+        self.assertEqual(sessions.session_ids(), ["viewer-2", "viewer-1", "default"])
+        self.assertEqual(sessions.usage()["messages"], 3)
+        with self.assertRaises(ValueError):
+            sessions.session("../escape")
+        
+        sessions.session("viewer-1").clear()
+        self.assertEqual(sessions.usage()["messages"], 2)
+        self.assertTrue(sessions.drop_session("viewer-2"))
+        self.assertNotIn("viewer-2", sessions)
+        self.assertEqual(sessions.usage()["messages"], 1)
+    
+    def test_budget_evicts_idle_sessions(self):
+        """Test that the least recently used sessions are dropped to stay in budget."""
+        evicted = []
+        sessions = ConversationSessions(max_history=2, max_messages=4,
+                                        on_evict=lambda sid, msgs: evicted.append((sid, msgs)))
+        for name in ("a", "b"):
+            for i in range(3):
+                sessions.session(name).add_message("user", f"{name}{i}")
+        self.assertEqual([(sid, [m["content"] for m in msgs]) for sid, msgs in evicted],
+                         [("a", ["a0"]), ("b", ["b0"])])
+        sessions.session("a")  # touching "a" leaves "b" least recently used
+        sessions.session("c").add_message("user", "c0")
+        self.assertEqual(evicted[-1][0], "b")
+        self.assertEqual([m["content"] for m in evicted[-1][1]], ["b1", "b2"])
+        self.assertEqual(sessions.session_ids(), ["a", "c"])
+        self.assertEqual(sessions.usage()["messages"], 3)
+        
+        usage = sessions.usage()["bytes"]
+        sessions.max_bytes = usage
+        sessions.session("a").add_message("user", "x" * 1000)
+        self.assertEqual(sessions.session_ids(), ["a"])
+        self.assertEqual(sessions.usage()["bytes"], sessions.session("a").size_bytes)
+
+
+class TestConversationLog(unittest.TestCase):
+    """Test persisting conversation history to per-session logs."""
+    
+    def setUp(self):
+        self.test_dir = "/tmp/test_conversation_log"
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        os.makedirs(self.test_dir)
+        self.log_path = os.path.join(self.test_dir, "default.log")
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+    
+    def test_restore_and_truncate(self):
+        """Test that a restart restores the newest messages and the log stays bounded."""
+        memory = ConversationalMemory(max_history=3, log_path=self.log_path)
+        for i in range(10):
+            memory.add_message("user", f"Message {i}", {"n": i})
+        with open(self.log_path, 'rb') as f:
+            self.assertLess(len(f.read().splitlines()), 6)
+        
+        restored = ConversationalMemory(max_history=3, log_path=self.log_path)
+        self.assertEqual(restored.get_history(), memory.get_history())
+        self.assertEqual(restored.get_history(max_tokens=4), memory.get_history(max_tokens=4))
+        restored.add_message("assistant", "Welcome back")
+        self.assertEqual(restored.get_history()[-1]["id"], 11)
+        restored.clear()
+        self.assertEqual(ConversationalMemory(log_path=self.log_path).get_history(), [])
+    
+    def test_torn_write_is_cut_off(self):
+        """Test that a partial trailing line is dropped and later appends stay readable."""
+        memory = ConversationalMemory(max_history=5, log_path=self.log_path)
+        memory.add_message("user", "Hello")
+        with open(self.log_path, 'ab') as f:
+            f.write(b'{"id": 2, "role": "us')
+        restored = ConversationalMemory(max_history=5, log_path=self.log_path)
+        restored.add_message("user", "Still here")
+        self.assertEqual([m["content"] for m in
+                          ConversationalMemory(max_history=5, log_path=self.log_path).get_history()],
+                         ["Hello", "Still here"])
+    
+    def test_read_tail_lines_reads_from_the_end(self):
+        """Test tail reads across block boundaries and on short files."""
+        with open(self.log_path, 'wb') as f:
+            f.write(b"".join(b"line %d\n" % i for i in range(1000)) + b"torn")
+        with open(self.log_path, 'rb') as f:
+            lines, end, whole = read_tail_lines(f, 3, block_size=16)
+            self.assertEqual(lines, [b"line 997", b"line 998", b"line 999"])
+            self.assertEqual((end, whole), (f.seek(0, os.SEEK_END) - 4, False))
+            lines, _, whole = read_tail_lines(f, 5000, block_size=16)
+            self.assertEqual((len(lines), lines[0], whole), (1000, b"line 0", True))
+    
+    def test_sessions_restore_from_logs(self):
+        """Test that an evicted or reloaded session comes back from its log."""
+        sessions = ConversationSessions(max_messages=2, log_dir=self.test_dir)
+        sessions.session("viewer-1").add_message("user", "One")
+        sessions.session("viewer-2").add_message("user", "Two")
+        sessions.session("viewer-3").add_message("user", "Three")
+        self.assertNotIn("viewer-1", sessions)
+        self.assertEqual(sessions.session("viewer-1").get_history()[0]["content"], "One")
+        
+        reloaded = ConversationSessions(log_dir=self.test_dir)
+        self.assertEqual(reloaded.session("viewer-3").get_history()[0]["content"], "Three")
+        self.assertEqual(reloaded.usage()["messages"], 1)
 
 
 class TestLongTermMemory(unittest.TestCase):
@@ -52,13 +277,13 @@ class TestLongTermMemory(unittest.TestCase):
     
     def setUp(self):
         self.test_file = "/tmp/test_long_term_memory.json"
-        if os.path.exists(self.test_file):
-            os.remove(self.test_file)
+        self.tearDown()
         self.memory = LongTermMemory(storage_path=self.test_file)
     
     def tearDown(self):
-        if os.path.exists(self.test_file):
-            os.remove(self.test_file)
+        for path in (self.test_file, self.test_file + ".archive.gz"):
+            if os.path.exists(path):
+                os.remove(path)
     
     def test_store_and_retrieve_fact(self):
         """Test storing and retrieving facts."""
@@ -95,6 +320,689 @@ class TestLongTermMemory(unittest.TestCase):
         new_memory = LongTermMemory(storage_path=self.test_file)
         value = new_memory.retrieve_preference("persist_test")
         self.assertEqual(value, "value123")
+    
+    def test_search_memory_index_updates(self):
+        """Test that facts stored after the first search are found."""
+        self.memory.store_fact("Twitch raids boost growth")
+        self.assertEqual(len(self.memory.search_memory("twitch")), 1)
+        self.memory.store_fact("Twitch emotes matter")
+        self.memory.store_entity("twitch_channel", {"subs": 10})
+        results = self.memory.search_memory("twitch")
+        self.assertEqual([r["type"] for r in results], ["fact", "fact", "entity"])
+        self.assertEqual(results[0]["data"]["content"], "Twitch raids boost growth")
+    
+    def test_search_memory_phrase(self):
+        """Test that multi-token queries keep substring semantics."""
+        self.memory.store_fact("Streams start at noon")
+        self.memory.store_fact("Noon streams start late")
+        results = self.memory.search_memory("streams start")
+        self.assertEqual(len(results), 2)
+        results = self.memory.search_memory("start at noon")
+        self.assertEqual(len(results), 1)
+    
+    def test_fact_ids(self):
+        """Test that facts get stable ids that survive a reload."""
+        self.memory.store_fact("First")
+        self.memory.store_fact("Second")
+        ids = [f["id"] for f in self.memory.retrieve_facts()]
+        self.assertEqual(ids, [1, 2])
+        reloaded = LongTermMemory(storage_path=self.test_file)
+        reloaded.store_fact("Third")
+        self.assertEqual(reloaded.retrieve_facts()[-1]["id"], 3)
+        self.assertEqual(len(reloaded.search_memory("second")), 1)
+
+    
+    def test_search_memory_ranked(self):
+        """Test BM25-ranked top-k search."""
+        self.memory.store_fact("Gaming streams on weekends")
+        self.memory.store_fact("Gaming gaming gaming marathon")
+        self.memory.store_fact("Music streams daily")
+        self.memory.store_entity("gaming_channel", {"subs": 5})
+        results = self.memory.search_memory("gaming streams", top_k=2, ranked=True)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["data"]["content"], "Gaming streams on weekends")
+        self.assertGreaterEqual(results[0]["score"], results[1]["score"])
+        self.assertEqual(self.memory.search_memory("unknown", ranked=True), [])
+    
+    def test_bulk_ingest(self):
+        """Test bulk ingest with one save and per-item status."""
+        results = self.memory.store_facts_bulk(
+            ["Fact A", {"fact": "Fact B", "category": "test"}, {"fact": ""}, 42])
+        self.assertEqual([r["status"] for r in results], ["stored", "stored", "error", "error"])
+        self.assertEqual([r.get("id") for r in results[:2]], [1, 2])
+        self.memory.store_entities_bulk([{"entity_name": "chan", "entity_data": {"subs": 1}}])
+        self.memory.store_preferences_bulk([{"key": "theme", "value": "dark"}])
+        reloaded = LongTermMemory(storage_path=self.test_file)
+        self.assertEqual(len(reloaded.retrieve_facts()), 2)
+        self.assertEqual(reloaded.retrieve_entity("chan"), {"subs": 1})
+        self.assertEqual(reloaded.retrieve_preference("theme"), "dark")
+        self.assertEqual(len(reloaded.search_memory("fact")), 2)
+    
+    def test_bulk_ingest_rejects_malformed_items(self):
+        """Test that items with non-string names, keys or categories fail alone."""
+        results = self.memory.store_facts_bulk(
+            [{"fact": "Bad", "category": ["a"]}, {"fact": "Good", "category": "test"}])
+        self.assertEqual([r["status"] for r in results], ["error", "stored"])
+        self.assertEqual(results[0]["error"], "Category must be a string")
+        results = self.memory.store_entities_bulk(
+            [{"entity_name": 42, "entity_data": {"subs": 1}}])
+        self.assertEqual(results[0]["error"], "Entity name must be a string")
+        results = self.memory.store_preferences_bulk([{"key": ["theme"], "value": "dark"}])
+        self.assertEqual(results[0]["error"], "Key must be a string")
+        self.assertEqual([f["content"] for f in self.memory.retrieve_facts()], ["Good"])
+        self.assertEqual(self.memory.memory["entities"], {})
+        self.assertEqual(len(self.memory.search_memory("good")), 1)
+    
+    def test_page_facts(self):
+        """Test cursor pagination of all facts and of one category."""
+        for i in range(5):
+            self.memory.store_fact(f"Fact {i}", category="even" if i % 2 == 0 else "odd")
+        page, cursor = self.memory.page_facts(limit=2)
+        self.assertEqual([f["content"] for f in page], ["Fact 0", "Fact 1"])
+        page, cursor = self.memory.page_facts(limit=3, cursor=cursor)
+        self.assertEqual([f["content"] for f in page], ["Fact 2", "Fact 3", "Fact 4"])
+        self.assertIsNone(cursor)
+        page, cursor = self.memory.page_facts(category="even", limit=2)
+        self.assertEqual([f["content"] for f in page], ["Fact 0", "Fact 2"])
+        page, cursor = self.memory.page_facts(category="even", limit=2, cursor=cursor)
+        self.assertEqual([f["content"] for f in page], ["Fact 4"])
+        self.assertIsNone(cursor)
+        with self.assertRaises(ValueError):
+            self.memory.page_facts(cursor="bogus")
+    
+    def test_category_index(self):
+        """Test category reads and counts, including after a reload."""
+        self.memory.store_fact("Fact A", category="schedule")
+        self.memory.store_fact("Fact B", category="content")
+        self.memory.store_fact("Fact C", category="schedule")
+        self.assertEqual([f["content"] for f in self.memory.retrieve_facts(category="schedule")],
+                         ["Fact A", "Fact C"])
+        self.assertEqual(self.memory.retrieve_facts(category="missing"), [])
+        self.assertEqual(self.memory.category_counts(), {"schedule": 2, "content": 1})
+        reloaded = LongTermMemory(storage_path=self.test_file)
+        self.assertEqual(reloaded.category_counts(), {"schedule": 2, "content": 1})
+    
+    def test_search_memory_top_k_unranked(self):
+        """Test that top_k truncates unranked results in insertion order."""
+        for i in range(5):
+            self.memory.store_fact(f"Clip idea {i}")
+        results = self.memory.search_memory("clip", top_k=3)
+        self.assertEqual([r["data"]["content"] for r in results],
+                         ["Clip idea 0", "Clip idea 1", "Clip idea 2"])
+    
+    def test_retention_archives_facts(self):
+        """Test that retention moves old and surplus facts to the cold archive."""
+        memory = LongTermMemory(storage_path=self.test_file, retention={
+            "chat": RetentionPolicy(max_count=2),
+            "*": {"max_age": 3600},
+        })
+        for i in range(4):
+            memory.store_fact(f"Chat message {i}", category="chat")
+        memory.store_fact("Old schedule", category="schedule")
+        memory.store_fact("New schedule", category="schedule")
+        old = memory.retrieve_facts(category="schedule")[0]
+        memory._facts_by_id[old["id"]].timestamp = time.time() - 7200
+        
+        self.assertEqual(memory.apply_retention(), 3)
+        self.assertEqual([f["content"] for f in memory.retrieve_facts()],
+                         ["Chat message 2", "Chat message 3", "New schedule"])
+        self.assertEqual(memory.search_memory("schedule"),
+                         [{"type": "fact", "data": memory.retrieve_facts()[2]}])
+        self.assertEqual([r["data"]["content"] for r in memory.search_archive("message")],
+                         ["Chat message 0", "Chat message 1"])
+        self.assertEqual(memory.recent_facts(2), memory.retrieve_facts()[1:])
+        stats = memory.stats()
+        self.assertEqual(stats["hot"]["facts"], 3)
+        self.assertEqual(stats["cold"]["facts"], 3)
+        self.assertGreater(stats["cold"]["bytes"], 0)
+        self.assertEqual(memory.apply_retention(), 0)
+        
+        reloaded = LongTermMemory(storage_path=self.test_file)
+        self.assertEqual(reloaded.category_counts(), {"chat": 2, "schedule": 1})
+        self.assertEqual(len(reloaded.search_archive("schedule")), 1)
+    
+    def test_scheduled_retention(self):
+        """Test that retention_interval runs passes in the background."""
+        memory = LongTermMemory(storage_path=self.test_file, retention_interval=0.05,
+                                retention={"*": RetentionPolicy(max_count=1)})
+        memory.store_fact("First")
+        memory.store_fact("Second")
+        deadline = time.time() + 2
+        while len(memory.retrieve_facts()) > 1 and time.time() < deadline:
+            time.sleep(0.01)
+        memory.close()
+        self.assertEqual([f["content"] for f in memory.retrieve_facts()], ["Second"])
+    
+    def test_failed_retention_pass_is_logged(self):
+        """Test that a failing scheduled pass is logged and the schedule keeps running."""
+        calls = []
+        def apply_fn():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OSError("archive unwritable")
+        with self.assertLogs("ai_live_genie.retention", level="ERROR") as logs:
+            scheduler = RetentionScheduler(apply_fn, 0.01)
+            deadline = time.time() + 2
+            while len(calls) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            scheduler.stop()
+        self.assertGreaterEqual(len(calls), 2)
+        self.assertIn("archive unwritable", logs.output[0])
+    
+    def test_retention_ttl(self):
+        """Test that a category TTL stamps facts with an expiry that refreshes keep."""
+        memory = LongTermMemory(storage_path=self.test_file, dedup=True,
+                                retention={"alerts": RetentionPolicy(ttl=0)})
+        memory.store_fact("Raid incoming", category="alerts")
+        memory.store_fact("Keep me", category="general")
+        self.assertIn("expires_at", memory.retrieve_facts(category="alerts")[0])
+        self.assertNotIn("expires_at", memory.retrieve_facts(category="general")[0])
+        self.assertEqual(memory.apply_retention(), 1)
+        self.assertEqual([f["content"] for f in memory.retrieve_facts()], ["Keep me"])
+        # The archived fact no longer counts as a duplicate
+        memory.store_fact("raid incoming", category="alerts")
+        self.assertEqual(len(memory.retrieve_facts()), 2)
+    
+    def test_entity_lookup(self):
+        """Test entity autocomplete and fuzzy lookup, including later additions."""
+        self.memory.store_entity("StreamElements", {"type": "tool"})
+        self.memory.store_entity("Ninja", {"type": "streamer"})
+        self.assertEqual(self.memory.complete_entities("str"),
+                         [{"name": "StreamElements", "data": {"type": "tool"}}])
+        self.memory.store_entities_bulk([{"entity_name": "streamlabs",
+                                          "entity_data": {"type": "tool"}}])
+        self.assertEqual([e["name"] for e in self.memory.complete_entities("STR")],
+                         ["StreamElements", "streamlabs"])
+        found = self.memory.find_entities("ninjja", limit=1)
+        self.assertEqual(found[0]["name"], "Ninja")
+        self.assertEqual(found[0]["data"], {"type": "streamer"})
+    
+    def test_dedup(self):
+        """Test that duplicate facts refresh the stored fact instead of appending."""
+        memory = LongTermMemory(storage_path=self.test_file, dedup=True)
+        memory.store_fact("Streams on Fridays", category="schedule")
+        memory.store_fact("  streams   ON fridays ", category="schedule")
+        memory.store_fact("Streams on Fridays", category="content")
+        facts = memory.retrieve_facts()
+        self.assertEqual(len(facts), 2)
+        self.assertEqual(facts[0]["hits"], 2)
+        results = memory.store_facts_bulk(["Streams on Fridays", "New fact", "new  fact"])
+        self.assertEqual([r["status"] for r in results], ["stored", "stored", "duplicate"])
+        self.assertEqual(results[2]["id"], results[1]["id"])
+        reloaded = LongTermMemory(storage_path=self.test_file, dedup=True)
+        reloaded.store_fact("STREAMS ON FRIDAYS", category="schedule")
+        self.assertEqual(len(reloaded.retrieve_facts()), 4)
+        self.assertEqual(reloaded.retrieve_facts(category="schedule")[0]["hits"], 3)
+
+
+class TestTokenIndex(unittest.TestCase):
+    """Test the inverted token index."""
+    
+    def test_tokenize(self):
+        """Test token normalization."""
+        self.assertEqual(tokenize("YouTube's yt_channel, 2024!"), ["youtube", "s", "yt", "channel", "2024"])
+    
+    def test_lookup_intersects_in_insertion_order(self):
+        """Test that lookups intersect postings and keep insertion order."""
+        index = TokenIndex.build([(3, "gaming stream"), (1, "music stream"), (2, "gaming clips")])
+        self.assertEqual(index.lookup(["stream"]), [3, 1])
+        self.assertEqual(index.lookup(["gaming", "stream"]), [3])
+        self.assertEqual(index.lookup(["missing"]), [])
+    
+    def test_rank(self):
+        """Test BM25 ranking with a bounded result count."""
+        index = TokenIndex.build([
+            (1, "stream stream stream"),
+            (2, "stream highlights"),
+            (3, "highlights reel"),
+        ])
+        ranked = index.rank(["stream"], top_k=1)
+        self.assertEqual(len(ranked), 1)
+        self.assertEqual(ranked[0][1], 1)
+        self.assertEqual([doc for _, doc in index.rank(["stream", "highlights"], top_k=3)][0], 2)
+        self.assertEqual(index.rank(["missing"], top_k=3), [])
+    
+    def test_remove(self):
+        """Test removing a document."""
+        index = TokenIndex.build([(1, "gaming stream"), (2, "gaming clips")])
+        index.remove(1, "gaming stream")
+        self.assertEqual(index.lookup(["gaming"]), [2])
+        self.assertEqual(index.lookup(["stream"]), [])
+        self.assertEqual(len(index), 1)
+
+
+class TestNameIndex(unittest.TestCase):
+    """Test the prefix and trigram index over entity names."""
+    
+    def setUp(self):
+        self.index = NameIndex.build(
+            ["Ninja", "nightbot", "Pokimane", "streamlabs", "StreamElements"])
+    
+    def test_prefix(self):
+        """Test case-insensitive prefix lookup in name order."""
+        self.assertEqual(self.index.prefix("STREAM", 10), ["StreamElements", "streamlabs"])
+        self.assertEqual(self.index.prefix("ni", 1), ["nightbot"])
+        self.assertEqual(self.index.prefix("zzz", 10), [])
+        self.assertEqual(len(self.index.prefix("", 10)), 5)
+    
+    def test_fuzzy_tolerates_typos(self):
+        """Test that misspelled queries still find the closest name."""
+        self.assertEqual(self.index.fuzzy("pokimaen", 1)[0][1], "Pokimane")
+        self.assertEqual(self.index.fuzzy("ninja", 1), [(1.0, "Ninja")])
+        self.assertEqual(self.index.fuzzy("qqqq", 5), [])
+    
+    def test_fuzzy_scores_few_names_at_scale(self):
+        """Test that a fuzzy lookup over 20k names scores only a small share of them."""
+        streamers = ["ninja", "poki", "shroud", "xqc", "summit", "myth", "tfue", "sykkuno",
+                     "valkyrae", "ludwig"]
+        names = [f"{a}{b}_{i}" for a in streamers for b in streamers for i in range(200)]
+        index = NameIndex.build(names)
+        for query in ("shroudninja_17", "shorudninja_17", "ludwigpoki"):
+            grams = trigrams(query)
+            dice = [(2 * len(grams & trigrams(name)) / (len(grams) + len(trigrams(name))), name)
+                    for name in names]
+            expected = sorted(dice, key=lambda pair: (-pair[0], pair[1]))[:5]
+            matches, examined = index._fuzzy_scan(query, 5, 0.3)
+            self.assertEqual(matches, expected)
+            sharing = set().union(*(index._postings[gram] for gram in grams
+                                    if gram in index._postings))
+            self.assertLess(examined, len(sharing) // 3)
+        self.assertEqual(index.fuzzy("shroudninja_17", 1), [(1.0, "shroudninja_17")])
+    
+    def test_add_and_remove(self):
+        """Test incremental updates, including names differing only in case."""
+        self.index.add("ninja")
+        self.assertEqual(self.index.prefix("nin", 10), ["Ninja", "ninja"])
+        self.index.remove("Ninja")
+        self.assertEqual(self.index.prefix("nin", 10), ["ninja"])
+        self.index.remove("ninja")
+        self.assertEqual(self.index.prefix("nin", 10), [])
+        self.assertEqual(self.index.fuzzy("ninja", 5), [])
+        self.assertEqual(len(self.index), 4)
+
+
+class TestLongTermMemoryJournal(unittest.TestCase):
+    """Test append-only journal persistence for long-term memory."""
+    
+    def setUp(self):
+        self.test_dir = "/tmp/test_long_term_journal"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        self.test_file = os.path.join(self.test_dir, "long_term_memory.json")
+        self.memory = LongTermMemory(storage_path=self.test_file, journal=True,
+                                     compact_threshold=1000)
+    
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_mutations_append_to_journal(self):
+        """Test that writes go to the journal rather than the snapshot."""
+        self.memory.store_fact("Journaled fact", category="test")
+        self.memory.store_preference("color", "blue")
+        self.assertFalse(os.path.exists(self.test_file))
+        with open(self.memory.journal_path) as f:
+            self.assertEqual(len(f.readlines()), 2)
+    
+    def test_journal_uses_codec(self):
+        """Test that journal records are encoded with the active codec."""
+        self.memory.store_fact("Café stream ☕", category="test")
+        with open(self.memory.journal_path, 'rb') as f:
+            line = f.read()
+        self.assertEqual(line, codec.dumps(codec.loads(line)) + b"\n")
+        self.assertIn("Café stream ☕".encode("utf-8"), line)
+        reloaded = LongTermMemory(storage_path=self.test_file, journal=True)
+        self.assertEqual(reloaded.retrieve_facts(category="test")[0]["content"], "Café stream ☕")
+    
+    def test_replay_on_load(self):
+        """Test that the journal is replayed on startup."""
+        self.memory.store_fact("Replayed fact", category="test")
+        self.memory.store_entity("channel", {"platform": "Twitch"})
+        reloaded = LongTermMemory(storage_path=self.test_file, journal=True)
+        self.assertEqual(reloaded.retrieve_facts(category="test")[0]["content"], "Replayed fact")
+        self.assertEqual(reloaded.retrieve_entity("channel")["platform"], "Twitch")
+    
+    def test_compact(self):
+        """Test compaction folds the journal into the snapshot."""
+        for i in range(5):
+            self.memory.store_fact(f"Fact {i}")
+        self.memory.compact()
+        self.assertEqual(os.path.getsize(self.memory.journal_path), 0)
+        self.memory.store_fact("After compaction")
+        reloaded = LongTermMemory(storage_path=self.test_file, journal=True)
+        self.assertEqual(len(reloaded.retrieve_facts()), 6)
+    
+    def test_replay_skips_records_in_snapshot(self):
+        """Test that records already folded into the snapshot are not applied twice."""
+        self.memory.store_fact("Only once")
+        with open(self.memory.journal_path) as f:
+            journal = f.read()
+        self.memory.compact()
+        # Simulate a crash between writing the snapshot and truncating the log
+        with open(self.memory.journal_path, 'w') as f:
+            f.write(journal)
+        reloaded = LongTermMemory(storage_path=self.test_file, journal=True)
+        self.assertEqual(len(reloaded.retrieve_facts()), 1)
+    
+    def test_torn_trailing_record_ignored(self):
+        """Test that a partially written last record does not break loading."""
+        self.memory.store_fact("Intact fact")
+        with open(self.memory.journal_path, 'a') as f:
+            f.write('{"op": "fact", "ent')
+        reloaded = LongTermMemory(storage_path=self.test_file, journal=True)
+        self.assertEqual(len(reloaded.retrieve_facts()), 1)
+    
+    def test_writes_after_torn_record_survive(self):
+        """Test that recovery cuts off a torn record so later appends are replayed."""
+        self.memory.store_fact("a")
+        with open(self.memory.journal_path, 'a') as f:
+            f.write('{"op": "fact", "ent')
+        recovered = LongTermMemory(storage_path=self.test_file, journal=True)
+        recovered.store_fact("b")
+        recovered.store_fact("c")
+        reloaded = LongTermMemory(storage_path=self.test_file, journal=True)
+        self.assertEqual([f["content"] for f in reloaded.retrieve_facts()], ["a", "b", "c"])
+    
+    def test_concurrent_compactions(self):
+        """Test that overlapping compactions neither fail nor lose records."""
+        for i in range(50):
+            self.memory.store_fact(f"Fact {i}")
+        errors = []
+        def compact():
+            try:
+                self.memory.compact()
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=compact) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        self.memory.store_fact("During compaction")
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        reloaded = LongTermMemory(storage_path=self.test_file, journal=True)
+        self.assertEqual(len(reloaded.retrieve_facts()), 51)
+    
+    def test_switching_journal_mode_off(self):
+        """Test that a journal replayed by a non-journal store is not replayed again."""
+        self.memory.store_fact("a")
+        self.memory.store_fact("b")
+        plain = LongTermMemory(storage_path=self.test_file)
+        plain.store_fact("c")
+        for journal in (False, True):
+            reloaded = LongTermMemory(storage_path=self.test_file, journal=journal)
+            facts = reloaded.retrieve_facts()
+            self.assertEqual([f["content"] for f in facts], ["a", "b", "c"])
+            self.assertEqual([f["id"] for f in facts], [1, 2, 3])
+        reloaded.store_fact("d")
+        reopened = LongTermMemory(storage_path=self.test_file, journal=True)
+        self.assertEqual([f["content"] for f in reopened.retrieve_facts()], ["a", "b", "c", "d"])
+    
+    def test_concurrent_writers_reopen(self):
+        """Test that facts stored from several threads all survive a reopen."""
+        append_journal = self.memory._append_journal
+        def slow_append(records):
+            time.sleep(0.001)
+            append_journal(records)
+        self.memory._append_journal = slow_append
+        def store(worker):
+            for i in range(25):
+                self.memory.store_fact(f"Worker {worker} fact {i}")
+        threads = [threading.Thread(target=store, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        reloaded = LongTermMemory(storage_path=self.test_file, journal=True)
+        self.assertEqual(len(reloaded.retrieve_facts()), 100)
+    
+    def test_retention_replay(self):
+        """Test that archiving is journaled and replayed."""
+        memory = LongTermMemory(storage_path=self.test_file, journal=True,
+                                retention={"*": {"max_count": 1}})
+        memory.store_fact("First")
+        memory.store_fact("Second")
+        self.assertEqual(memory.apply_retention(), 1)
+        reloaded = LongTermMemory(storage_path=self.test_file, journal=True)
+        self.assertEqual([f["content"] for f in reloaded.retrieve_facts()], ["Second"])
+    
+    def test_dedup_replay(self):
+        """Test that duplicate refreshes are journaled and replayed."""
+        memory = LongTermMemory(storage_path=self.test_file, journal=True, dedup=True)
+        memory.store_fact("Repeat me")
+        memory.store_fact("repeat me")
+        reloaded = LongTermMemory(storage_path=self.test_file, journal=True, dedup=True)
+        facts = reloaded.retrieve_facts()
+        self.assertEqual(len(facts), 1)
+        self.assertEqual(facts[0]["hits"], 2)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestVectorSearch(unittest.TestCase):
+    """Test semantic recall with hashed embeddings."""
+    
+    def setUp(self):
+        self.test_dir = "/tmp/test_vector_search"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        self.test_file = os.path.join(self.test_dir, "long_term_memory.json")
+        self.memory = LongTermMemory(storage_path=self.test_file, vector=True)
+        self.memory.store_fact("Streams every Friday evening", category="schedule")
+        self.memory.store_fact("Favourite game is Minecraft", category="content")
+        self.memory.store_fact("Uses a Shure microphone", category="gear")
+    
+    def tearDown(self):
+        self.memory.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_embed_is_unit_length(self):
+        """Test that embeddings are normalized and empty text embeds to zeros."""
+        self.assertAlmostEqual(float(np.linalg.norm(embed("Hello stream"))), 1.0, places=5)
+        self.assertFalse(embed("!!!").any())
+    
+    def test_semantic_queries_share_the_lock(self):
+        """Test that a query against a built index does not wait for other readers."""
+        self.memory.search_memory("friday", semantic=True)
+        self.memory._lock.acquire_read()
+        try:
+            results = []
+            query = threading.Thread(target=lambda: results.append(
+                self.memory.search_memory("microphone", semantic=True)))
+            query.start()
+            query.join(timeout=5)
+            self.assertFalse(query.is_alive())
+        finally:
+            self.memory._lock.release_read()
+        query.join()
+        self.assertEqual(results[0][0]["data"]["category"], "gear")
+    
+    def test_semantic_search(self):
+        """Test that related word forms are recalled without an exact match."""
+        self.assertEqual(self.memory.search_memory("streaming on fridays"), [])
+        results = self.memory.search_memory("streaming on fridays", top_k=1, semantic=True)
+        self.assertEqual(results[0]["data"]["content"], "Streams every Friday evening")
+        self.assertGreater(results[0]["score"], 0)
+        self.memory.store_fact("Microphone upgrade planned", category="gear")
+        results = self.memory.search_memory("microphones", top_k=2, semantic=True)
+        self.assertEqual({r["data"]["content"] for r in results},
+                         {"Uses a Shure microphone", "Microphone upgrade planned"})
+    
+    def test_vectors_persist_and_resync(self):
+        """Test that vectors are memory-mapped on load and repaired when stale."""
+        self.memory.search_memory("minecraft", semantic=True)
+        self.memory.close()
+        self.assertTrue(os.path.exists(self.memory.vector_path))
+        reloaded = LongTermMemory(storage_path=self.test_file, vector=True)
+        # Stored while the saved vectors are stale; picked up by the resync
+        reloaded.store_fact("Minecraft speedruns on Sunday")
+        results = reloaded.search_memory("minecraft", top_k=5, semantic=True)
+        self.assertEqual(len(results), 2)
+        self.assertIsInstance(reloaded._vector_index._base, np.memmap)
+        reloaded.close()
+    
+    def test_archived_facts_leave_index(self):
+        """Test that retention removes archived facts from the vector index."""
+        memory = LongTermMemory(storage_path=self.test_file, vector=True,
+                                retention={"gear": {"max_count": 0}})
+        memory.search_memory("microphone", semantic=True)
+        self.assertEqual(memory.apply_retention(), 1)
+        self.assertNotIn("Uses a Shure microphone",
+                         [r["data"]["content"] for r in memory.search_memory(
+                             "microphone", semantic=True)])
+        self.assertEqual(len(memory._vector_index), 2)
+        memory.close()
+    
+    def test_requires_vector_store(self):
+        """Test that semantic search needs a vector-enabled store."""
+        plain = LongTermMemory(storage_path=os.path.join(self.test_dir, "plain.json"))
+        with self.assertRaises(ValueError):
+            plain.search_memory("anything", semantic=True)
+    
+    def test_numpy_is_imported_lazily(self):
+        """Test that importing the package and CLI does not import NumPy."""
+        src = os.path.join(os.path.dirname(__file__), '..', 'src')
+        code = ("import sys; sys.path.insert(0, sys.argv[1]); import ai_live_genie.cli; "
+                "print('numpy' in sys.modules)")
+        output = subprocess.run([sys.executable, "-c", code, src], capture_output=True,
+                                text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+    
+    def test_vector_index_top_k(self):
+        """Test top-k selection across the saved and in-memory segments."""
+        index = VectorIndex()
+        for i in range(100):
+            index.add(i, f"clip number {i}")
+        index.save(os.path.join(self.test_dir, "index.npy"))
+        index.add(100, "clip number 7")
+        results = index.query("clip number 7", 2)
+        self.assertEqual([doc_id for _, doc_id in results], [7, 100])
+        self.assertAlmostEqual(results[0][0], 1.0, places=5)
+    
+    def test_sqlite_semantic_search(self):
+        """Test semantic search on the SQLite backend."""
+        memory = SQLiteLongTermMemory(os.path.join(self.test_dir, "memory.db"), vector=True)
+        memory.store_fact("Streams every Friday evening")
+        memory.search_memory("warmup", semantic=True)
+        memory.store_fact("Minecraft speedruns on Sunday")
+        results = memory.search_memory("streaming fridays", top_k=1, semantic=True)
+        self.assertEqual(results[0]["data"]["content"], "Streams every Friday evening")
+        memory.close()
+        self.assertTrue(os.path.exists(memory.vector_path))
+
+
+class TestDeferredDurability(unittest.TestCase):
+    """Test group-commit persistence through the background flusher."""
+    
+    def setUp(self):
+        self.test_dir = "/tmp/test_deferred_durability"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        self.memory_file = os.path.join(self.test_dir, "long_term_memory.json")
+        self.goals_file = os.path.join(self.test_dir, "goals.json")
+    
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_flusher_batches_mutations(self):
+        """Test that a burst of mutations costs one flush."""
+        calls = []
+        flusher = BackgroundFlusher(lambda: calls.append(1), interval_ms=10000, max_pending=1000)
+        for _ in range(50):
+            flusher.mark_dirty()
+        self.assertEqual(flusher.pending, 50)
+        flusher.close()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flusher.pending, 0)
+        with self.assertRaises(RuntimeError):
+            flusher.mark_dirty()
+    
+    def test_flusher_flushes_at_max_pending(self):
+        """Test that reaching max_pending triggers a background flush."""
+        calls = []
+        flusher = BackgroundFlusher(lambda: calls.append(1), interval_ms=10000, max_pending=5)
+        for _ in range(5):
+            flusher.mark_dirty()
+        deadline = time.time() + 5
+        while not calls and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(calls), 1)
+        flusher.close()
+    
+    def test_flusher_retries_after_failure(self):
+        """Test that a failed background flush is retried instead of stopping the flusher."""
+        calls = []
+        def flush_fn():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OSError("disk full")
+        flusher = BackgroundFlusher(flush_fn, interval_ms=10, max_pending=1)
+        with self.assertLogs("ai_live_genie.persistence", level="ERROR"):
+            flusher.mark_dirty()
+            flusher.mark_dirty()
+            deadline = time.time() + 5
+            while (len(calls) < 2 or flusher.pending) and time.time() < deadline:
+                time.sleep(0.01)
+        self.assertGreaterEqual(len(calls), 2)
+        self.assertEqual(flusher.pending, 0)
+        flushes = len(calls)
+        flusher.mark_dirty()
+        deadline = time.time() + 5
+        while len(calls) == flushes and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(calls), flushes + 1)
+        flusher.close()
+    
+    def test_long_term_memory_deferred(self):
+        """Test that deferred writes stay in memory until flushed."""
+        memory = LongTermMemory(self.memory_file, durability="deferred",
+                                flush_interval_ms=10000, flush_max_pending=1000)
+        memory.store_fact("Deferred fact")
+        self.assertEqual(len(memory.retrieve_facts()), 1)
+        self.assertFalse(os.path.exists(self.memory_file))
+        memory.flush()
+        self.assertEqual(len(LongTermMemory(self.memory_file).retrieve_facts()), 1)
+        memory.store_preference("color", "blue")
+        memory.close()
+        self.assertEqual(LongTermMemory(self.memory_file).retrieve_preference("color"), "blue")
+    
+    def test_bulk_ingest_is_one_flush(self):
+        """Test that a bulk ingest marks the deferred store dirty once."""
+        memory = LongTermMemory(self.memory_file, journal=True, durability="deferred",
+                                flush_interval_ms=10000, flush_max_pending=1000)
+        memory.store_facts_bulk([f"Fact {i}" for i in range(100)])
+        self.assertEqual(memory._flusher.pending, 1)
+        memory.close()
+        self.assertEqual(len(LongTermMemory(self.memory_file, journal=True).retrieve_facts()), 100)
+    
+    def test_journal_deferred(self):
+        """Test that deferred journal records are appended in one batch."""
+        memory = LongTermMemory(self.memory_file, journal=True, durability="deferred",
+                                flush_interval_ms=10000, flush_max_pending=1000)
+        for i in range(3):
+            memory.store_fact(f"Fact {i}")
+        self.assertFalse(os.path.exists(memory.journal_path))
+        memory.close()
+        with open(memory.journal_path) as f:
+            self.assertEqual(len(f.readlines()), 3)
+        reloaded = LongTermMemory(self.memory_file, journal=True)
+        self.assertEqual([f["id"] for f in reloaded.retrieve_facts()], [1, 2, 3])
+    
+    def test_goals_deferred(self):
+        """Test deferred goal persistence."""
+        goals = GoalsManager(self.goals_file, durability="deferred",
+                             flush_interval_ms=10000, flush_max_pending=1000)
+        goal = goals.add_goal("Deferred goal", "Description")
+        goals.update_goal_progress(goal["id"], 40)
+        self.assertFalse(os.path.exists(self.goals_file))
+        goals.close()
+        self.assertEqual(GoalsManager(self.goals_file).get_goal_by_id(goal["id"])["progress"], 40)
+    
+    def test_invalid_durability(self):
+        """Test that unknown durability modes are rejected."""
+        with self.assertRaises(ValueError):
+            LongTermMemory(self.memory_file, durability="eventually")
 
 
 class TestGoalsManager(unittest.TestCase):
@@ -133,6 +1041,17 @@ class TestGoalsManager(unittest.TestCase):
         self.assertEqual(len(self.goals.get_active_goals()), 0)
         self.assertEqual(len(self.goals.goals["completed_goals"]), 1)
     
+    def test_page_goals(self):
+        """Test cursor pagination of active goals."""
+        for i in range(3):
+            self.goals.add_goal(f"Goal {i}", "Description")
+        self.goals.complete_goal(2)
+        page, cursor = self.goals.page_goals(limit=1)
+        self.assertEqual([g["id"] for g in page], [1])
+        page, cursor = self.goals.page_goals(limit=5, cursor=cursor)
+        self.assertEqual([g["id"] for g in page], [3])
+        self.assertIsNone(cursor)
+    
     def test_add_milestone(self):
         """Test adding milestones."""
         goal = self.goals.add_goal("Test Goal", "Description")
@@ -140,6 +1059,768 @@ class TestGoalsManager(unittest.TestCase):
         self.assertTrue(result)
         updated_goal = self.goals.get_goal_by_id(goal["id"])
         self.assertEqual(len(updated_goal["milestones"]), 1)
+    
+    def test_goals_reload_unchanged(self):
+        """Test that goals read back from disk match what the API returned."""
+        goal = self.goals.add_goal("Test Goal", "Description")
+        self.goals.add_milestone(goal["id"], "First milestone")
+        self.goals.complete_goal(goal["id"])
+        saved = self.goals.get_goal_by_id(goal["id"])
+        with open(self.test_file) as f:
+            self.assertEqual(json.load(f)["completed_goals"], [saved])
+        reloaded = GoalsManager(storage_path=self.test_file)
+        self.assertEqual(reloaded.get_goal_by_id(goal["id"]), saved)
+
+
+class TestSQLiteBackend(unittest.TestCase):
+    """Test the SQLite storage backend."""
+    
+    def setUp(self):
+        self.test_dir = "/tmp/test_sqlite_backend"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        self.db_path = os.path.join(self.test_dir, "memory.db")
+        self.memory = SQLiteLongTermMemory(self.db_path)
+        self.goals = SQLiteGoalsManager(self.db_path)
+    
+    def tearDown(self):
+        self.memory.close()
+        self.goals.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_facts_preferences_entities(self):
+        """Test storing and retrieving long-term memory records."""
+        self.memory.store_fact("Streams on weekends", category="schedule")
+        self.memory.store_fact("Plays RPGs", category="content")
+        self.memory.store_preference("color", "blue")
+        self.memory.store_entity("main_channel", {"platform": "YouTube"})
+        facts = self.memory.retrieve_facts(category="schedule")
+        self.assertEqual(len(facts), 1)
+        self.assertEqual(facts[0]["content"], "Streams on weekends")
+        self.assertEqual(len(self.memory.retrieve_facts()), 2)
+        self.assertEqual(self.memory.category_counts(), {"schedule": 1, "content": 1})
+        self.assertEqual(self.memory.retrieve_preference("color"), "blue")
+        self.assertEqual(self.memory.retrieve_entity("main_channel")["platform"], "YouTube")
+        self.assertIsNone(self.memory.retrieve_entity("missing"))
+    
+    def test_search_memory(self):
+        """Test searching facts and entity names."""
+        self.memory.store_fact("YouTube streaming is fun")
+        self.memory.store_entity("youtube_channel", {"subs": 10})
+        results = self.memory.search_memory("YOUTUBE")
+        self.assertEqual([r["type"] for r in results], ["fact", "entity"])
+    
+    def test_bulk_ingest(self):
+        """Test bulk ingest in a single transaction."""
+        results = self.memory.store_facts_bulk(["Fact A", {"fact": "Fact B"}, {}])
+        self.assertEqual([r["status"] for r in results], ["stored", "stored", "error"])
+        self.memory.store_entities_bulk([{"entity_name": "chan", "entity_data": {"subs": 1}}])
+        self.memory.store_preferences_bulk([{"key": "theme", "value": "dark"}])
+        self.assertEqual(len(self.memory.retrieve_facts()), 2)
+        self.assertEqual(self.memory.retrieve_entity("chan"), {"subs": 1})
+        self.assertEqual(self.memory.retrieve_preference("theme"), "dark")
+    
+    def test_search_memory_ranked(self):
+        """Test BM25-ranked search and top_k limits."""
+        self.memory.store_fact("Gaming streams on weekends")
+        self.memory.store_fact("Gaming gaming gaming marathon")
+        self.memory.store_fact("Music streams daily")
+        results = self.memory.search_memory("gaming streams", top_k=2, ranked=True)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["data"]["content"], "Gaming streams on weekends")
+        self.assertEqual(len(self.memory.search_memory("streams", top_k=1)), 1)
+    
+    def test_ranked_search_term_index(self):
+        """Test that the term index follows replaced entities, retention and old databases."""
+        memory = SQLiteLongTermMemory(self.db_path,
+                                      retention={"raids": RetentionPolicy(max_count=1)})
+        memory.store_fact("Raid from a gaming channel", category="raids")
+        memory.store_fact("Raid from a music channel", category="raids")
+        memory.store_entity("gaming_channel", {"subs": 5})
+        memory.store_entity("gaming_channel", {"subs": 6})
+        self.assertEqual(memory.apply_retention(), 1)
+        results = memory.search_memory("gaming", ranked=True)
+        self.assertEqual([r["type"] for r in results], ["entity"])
+        self.assertEqual(results[0]["data"]["data"], {"subs": 6})
+        self.assertEqual(memory._query("SELECT COUNT(*) FROM entity_terms")[0][0], 2)
+        with memory._write():
+            memory._conn.execute("DROP TABLE search_stats")
+            memory._conn.execute("DROP TABLE fact_terms")
+        memory.close()
+        reopened = SQLiteLongTermMemory(self.db_path)
+        results = reopened.search_memory("music raid", ranked=True)
+        self.assertEqual(results[0]["data"]["content"], "Raid from a music channel")
+        reopened.close()
+    
+    def test_pagination(self):
+        """Test cursor pagination of facts, search results and goals."""
+        self.memory.store_facts_bulk([f"Clip {i}" for i in range(5)])
+        page, cursor = self.memory.page_facts(limit=3)
+        self.assertEqual([f["id"] for f in page], [1, 2, 3])
+        page, cursor = self.memory.page_facts(limit=3, cursor=cursor)
+        self.assertEqual([f["id"] for f in page], [4, 5])
+        self.assertIsNone(cursor)
+        page, cursor = self.memory.page_search("clip", limit=4)
+        self.assertEqual(len(page), 4)
+        page, cursor = self.memory.page_search("clip", limit=4, cursor=cursor)
+        self.assertEqual(len(page), 1)
+        self.assertIsNone(cursor)
+        for i in range(3):
+            self.goals.add_goal(f"Goal {i}", "Description")
+        page, cursor = self.goals.page_goals(limit=2)
+        self.assertEqual([g["id"] for g in page], [1, 2])
+        page, cursor = self.goals.page_goals(limit=2, cursor=cursor)
+        self.assertEqual([g["id"] for g in page], [3])
+    
+    def test_goals(self):
+        """Test the goal lifecycle."""
+        goal = self.goals.add_goal("Reach 1k subs", "Grow the channel")
+        self.assertEqual(goal["id"], 1)
+        self.assertTrue(self.goals.update_goal_progress(goal["id"], 150))
+        self.assertTrue(self.goals.add_milestone(goal["id"], "500 subs"))
+        stored = self.goals.get_goal_by_id(goal["id"])
+        self.assertEqual(stored["progress"], 100)
+        self.assertEqual(len(stored["milestones"]), 1)
+        self.assertTrue(self.goals.complete_goal(goal["id"]))
+        self.assertEqual(self.goals.get_active_goals(), [])
+        self.assertEqual(len(self.goals.get_completed_goals()), 1)
+        self.assertFalse(self.goals.update_goal_progress(goal["id"], 10))
+        self.assertEqual(self.goals.add_goal("Next", "Another")["id"], 2)
+    
+    def test_entity_lookup(self):
+        """Test entity autocomplete and fuzzy lookup on SQLite."""
+        self.memory.store_entity("StreamElements", {"type": "tool"})
+        self.assertEqual(self.memory.complete_entities("stream"),
+                         [{"name": "StreamElements", "data": {"type": "tool"}}])
+        self.memory.store_entity("Streamlabs", {"type": "tool"})
+        self.assertEqual(self.memory.find_entities("streamlab", limit=1)[0]["name"], "Streamlabs")
+    
+    def test_dedup(self):
+        """Test that duplicate facts refresh the stored row in dedup mode."""
+        memory = SQLiteLongTermMemory(self.db_path, dedup=True)
+        memory.store_fact("Streams on Fridays", category="schedule")
+        memory.store_fact("streams on  fridays", category="schedule")
+        results = memory.store_facts_bulk(["Other", "other"])
+        self.assertEqual([r["status"] for r in results], ["stored", "duplicate"])
+        facts = memory.retrieve_facts()
+        self.assertEqual(len(facts), 2)
+        self.assertEqual(facts[0]["hits"], 2)
+        memory.close()
+        self.memory.store_fact("Other")
+        self.assertEqual(len(self.memory.retrieve_facts()), 3)
+    
+    def test_retention(self):
+        """Test retention, archive search and stats on the SQLite backend."""
+        memory = SQLiteLongTermMemory(self.db_path, retention={
+            "chat": {"max_count": 1}, "alerts": {"ttl": 0}})
+        for i in range(3):
+            memory.store_fact(f"Chat message {i}", category="chat")
+        memory.store_fact("Raid incoming", category="alerts")
+        memory.store_fact("Keep me", category="general")
+        self.assertEqual(memory.apply_retention(), 3)
+        self.assertEqual([f["content"] for f in memory.retrieve_facts()],
+                         ["Chat message 2", "Keep me"])
+        self.assertEqual([f["content"] for f in memory.recent_facts(1)], ["Keep me"])
+        archived = memory.search_archive("raid")
+        self.assertEqual(archived[0]["data"]["content"], "Raid incoming")
+        self.assertIn("expires_at", archived[0]["data"])
+        stats = memory.stats()
+        self.assertEqual((stats["hot"]["facts"], stats["cold"]["facts"]), (2, 3))
+        memory.close()
+    
+    def test_reads_do_not_wait_for_the_writer(self):
+        """Test that readers on other threads run while a write transaction is open."""
+        self.memory.store_fact("Streams on weekends", category="schedule")
+        self.goals.add_goal("Goal", "Description")
+        with self.memory._write(), self.goals._write():
+            self.memory._conn.execute("DELETE FROM facts")
+            results = []
+            reader = threading.Thread(target=lambda: results.extend(
+                [self.memory.retrieve_facts(), self.goals.get_active_goals()]))
+            reader.start()
+            reader.join(timeout=5)
+            self.assertFalse(reader.is_alive())
+            self.assertEqual(self.memory._query("SELECT COUNT(*) FROM facts")[0][0], 0)
+        reader.join()
+        self.assertEqual(results[0][0]["content"], "Streams on weekends")
+        self.assertEqual(len(results[1]), 1)
+        self.assertEqual(self.memory.retrieve_facts(), [])
+    
+    def test_persistence(self):
+        """Test that data persists across connections."""
+        self.memory.store_preference("persist_test", "value123")
+        reopened = SQLiteLongTermMemory(self.db_path)
+        self.assertEqual(reopened.retrieve_preference("persist_test"), "value123")
+        reopened.close()
+    
+    def test_memory_manager_backend(self):
+        """Test selecting the SQLite backend from MemoryManager."""
+        manager = MemoryManager(data_dir=self.test_dir, backend="sqlite")
+        self.assertIsInstance(manager.long_term, SQLiteLongTermMemory)
+        manager.long_term.store_preference("theme", "dark")
+        manager.goals.add_goal("Goal", "Description")
+        context = manager.get_full_context()
+        self.assertEqual(context["preferences"]["theme"]["value"], "dark")
+        self.assertEqual(len(context["active_goals"]), 1)
+        with self.assertRaises(ValueError):
+            MemoryManager(data_dir=self.test_dir, backend="csv")
+
+
+class TestShardedBackend(unittest.TestCase):
+    """Test the category-sharded storage backend."""
+    
+    def setUp(self):
+        self.test_dir = "/tmp/test_sharded_backend"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        self.memory = ShardedLongTermMemory(self.test_dir)
+    
+    def tearDown(self):
+        self.memory.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def reopen(self, **options):
+        self.memory.close()
+        self.memory = ShardedLongTermMemory(self.test_dir, **options)
+    
+    def test_writes_touch_only_their_shard(self):
+        """Test that each category, entities and preferences get their own file."""
+        self.memory.store_fact("Streams on weekends", category="schedule")
+        self.memory.store_fact("Hello chat", category="chat")
+        self.memory.store_entity("main_channel", {"platform": "YouTube"})
+        self.memory.store_preference("color", "blue")
+        files = set(os.listdir(self.test_dir))
+        self.assertIn("entities.json", files)
+        self.assertIn("preferences.json", files)
+        self.assertEqual(len([f for f in files if f.startswith("facts-")]), 2)
+        
+        schedule_path = os.path.join(self.test_dir, shard_filename("schedule"))
+        before = os.path.getmtime(schedule_path)
+        os.utime(schedule_path, (before - 10, before - 10))
+        self.memory.store_fact("Another chat fact", category="chat")
+        self.assertEqual(os.path.getmtime(schedule_path), before - 10)
+    
+    def test_category_reads_load_one_shard(self):
+        """Test that reading one category leaves the other shards unloaded."""
+        self.memory.store_fact("Streams on weekends", category="schedule")
+        self.memory.store_fact("Hello chat", category="chat")
+        self.reopen()
+        facts = self.memory.retrieve_facts(category="schedule")
+        self.assertEqual([f["content"] for f in facts], ["Streams on weekends"])
+        self.assertEqual(list(self.memory._shards), [shard_filename("schedule")])
+        self.assertEqual(self.memory.retrieve_facts(category="missing"), [])
+    
+    def test_ids_unique_across_shards_and_restarts(self):
+        """Test that fact ids never repeat across shards or reopenings."""
+        self.memory.store_fact("One", category="a")
+        self.memory.store_fact("Two", category="b")
+        self.reopen()
+        self.memory.store_fact("Three", category="a")
+        ids = [f["id"] for f in self.memory.retrieve_facts()]
+        self.assertEqual(ids[:2], [1, 2])
+        self.assertEqual(len(set(ids)), 3)
+        self.assertEqual([f["content"] for f in self.memory.retrieve_facts()],
+                         ["One", "Two", "Three"])
+    
+    def test_search_fans_out(self):
+        """Test plain, ranked and paged search across shards."""
+        self.memory.store_fact("YouTube streaming tips", category="a")
+        self.memory.store_fact("Twitch streaming schedule", category="b")
+        self.memory.store_fact("More YouTube streaming", category="a")
+        self.memory.store_entity("streaming_setup", {"camera": "4k"})
+        results = self.memory.search_memory("streaming")
+        self.assertEqual([r["data"]["id"] for r in results if r["type"] == "fact"], [1, 2, 3])
+        self.assertEqual(results[-1]["type"], "entity")
+        self.assertEqual(len(self.memory.search_memory("streaming", top_k=2)), 2)
+        ranked = self.memory.search_memory("youtube streaming", top_k=2, ranked=True)
+        self.assertEqual(len(ranked), 2)
+        self.assertGreaterEqual(ranked[0]["score"], ranked[1]["score"])
+        self.assertIn("YouTube", ranked[0]["data"]["content"])
+        page, cursor = self.memory.page_search("streaming", limit=3)
+        self.assertEqual(len(page), 3)
+        page, cursor = self.memory.page_search("streaming", limit=3, cursor=cursor)
+        self.assertEqual(page[0]["type"], "entity")
+        self.assertIsNone(cursor)
+    
+    def test_bulk_pages_and_counts(self):
+        """Test bulk ingest across categories, merged paging and counts."""
+        results = self.memory.store_facts_bulk(
+            [{"fact": "A1", "category": "a"}, "G1", {"category": "a"},
+             {"fact": "B1", "category": "b"}, {"fact": "A2", "category": "a"}])
+        self.assertEqual([r["status"] for r in results],
+                         ["stored", "stored", "error", "stored", "stored"])
+        self.assertEqual([r["index"] for r in results], [0, 1, 2, 3, 4])
+        self.assertEqual(self.memory.category_counts(), {"a": 2, "general": 1, "b": 1})
+        page, cursor = self.memory.page_facts(limit=3)
+        self.assertEqual([f["id"] for f in page], sorted(f["id"] for f in page))
+        rest, cursor = self.memory.page_facts(limit=3, cursor=cursor)
+        self.assertEqual(len(page) + len(rest), 4)
+        self.assertIsNone(cursor)
+        # Bulk ids follow input order within each category's shard
+        self.assertEqual([f["content"] for f in self.memory.recent_facts(2)], ["G1", "B1"])
+        self.assertEqual(self.memory.stats()["hot"]["facts"], 4)
+    
+    def test_dedup_and_retention_per_shard(self):
+        """Test that dedup and retention apply within each category shard."""
+        self.reopen(dedup=True, retention={"chat": {"max_count": 1}})
+        self.memory.store_fact("Hello", category="chat")
+        self.memory.store_fact("hello", category="chat")
+        self.memory.store_fact("Hello", category="general")
+        self.assertEqual(self.memory.category_counts(), {"chat": 1, "general": 1})
+        self.memory.store_fact("Second", category="chat")
+        self.assertEqual(self.memory.apply_retention(), 1)
+        self.assertEqual([r["data"]["content"] for r in self.memory.search_archive("hello")],
+                         ["Hello"])
+    
+    def test_memory_manager_backend(self):
+        """Test selecting the sharded backend through MemoryManager."""
+        manager = MemoryManager(data_dir=self.test_dir, backend="sharded")
+        self.assertIsInstance(manager.long_term, ShardedLongTermMemory)
+        manager.long_term.store_fact("Fact", category="general")
+        manager.long_term.store_preference("theme", "dark")
+        self.assertEqual(manager.get_full_context()["preferences"]["theme"]["value"], "dark")
+        manager.close()
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, "long_term", "shards.json")))
+
+
+class TestTenantPool(unittest.TestCase):
+    """Test the LRU pool of per-tenant memory managers."""
+    
+    class FakeManager:
+        def __init__(self, tenant_id):
+            self.tenant_id = tenant_id
+            self.conversational = ConversationSessions()
+            self.closed = False
+        
+        def close(self):
+            self.closed = True
+    
+    def test_lru_eviction_skips_busy_tenants(self):
+        """Test that idle tenants are closed oldest first and busy ones are kept."""
+        pool = TenantPool(self.FakeManager, max_tenants=2)
+        a = pool.acquire("a")
+        pool.release("a")
+        b = pool.acquire("b")
+        pool.release("b")
+        pool.release(pool.acquire("a").tenant_id)
+        c = pool.acquire("c")
+        self.assertTrue(b.closed)
+        self.assertFalse(a.closed)
+        self.assertNotIn("b", pool)
+        
+        d = pool.acquire("d")
+        self.assertTrue(a.closed)
+        self.assertIn("c", pool)
+        self.assertEqual(len(pool), 2)
+        pool.close()
+        self.assertTrue(c.closed and d.closed)
+    
+    def test_shared_conversation_budget(self):
+        """Test that idle tenants are evicted once all tenants' conversations exceed the budget."""
+        pool = TenantPool(self.FakeManager, max_tenants=10, max_messages=5)
+        managers = {}
+        for tenant_id in ("a", "b", "c"):
+            managers[tenant_id] = manager = pool.acquire(tenant_id)
+            manager.conversational.add_message("user", f"Hello from {tenant_id}")
+            manager.conversational.session("side").add_message("user", "Side chat")
+            pool.release(tenant_id)
+        self.assertTrue(managers["a"].closed)
+        self.assertEqual(pool.usage()["messages"], 4)
+        
+        busy = pool.acquire("b")
+        for _ in range(4):
+            busy.conversational.add_message("user", "Long chat")
+        self.assertEqual(pool.usage()["messages"], 4)
+        pool.release("b")
+        self.assertTrue(managers["c"].closed)
+        self.assertFalse(busy.closed)
+        self.assertEqual(pool.usage()["tenants"], 1)
+        self.assertEqual(pool.usage()["messages"], 6)
+        pool.close()
+        self.assertEqual(pool.usage(), {"tenants": 0, "messages": 0, "bytes": 0})
+        with self.assertRaises(ValueError):
+            TenantPool(self.FakeManager, max_bytes=0)
+    
+    def test_invalid_tenant_ids(self):
+        """Test that ids unsafe as directory names are rejected."""
+        pool = TenantPool(self.FakeManager)
+        for tenant_id in ("", "../x", ".hidden", "a/b", "x" * 65):
+            with self.assertRaises(ValueError):
+                pool.acquire(tenant_id)
+        self.assertEqual(len(pool), 0)
+
+
+class TestCodec(unittest.TestCase):
+    """Test the pluggable JSON codecs."""
+    
+    def test_codecs_agree(self):
+        """Test that every installed codec round-trips the same documents."""
+        goal = {"title": "Grow", "milestones": [("Reach 100", False, 1.5)]}
+        doc = {"facts": [{"id": 1, "content": "Café ☕ stream"}], 2: None, "goal": goal}
+        expected = {"facts": [{"id": 1, "content": "Café ☕ stream"}], "2": None,
+                    "goal": {"title": "Grow", "milestones": [["Reach 100", False, 1.5]]}}
+        for name in codec.CODECS:
+            c = codec.get_codec(name)
+            compact = c.dumps(doc)
+            self.assertNotIn(b"\n", compact, name)
+            self.assertIn("☕".encode("utf-8"), compact, name)
+            self.assertEqual(c.loads(compact), expected, name)
+            self.assertEqual(json.loads(c.dumps(doc, indent=True)), expected, name)
+            with self.assertRaises(codec.JSONDecodeError):
+                c.loads(b'{"facts": ')
+    
+    def test_default_hook(self):
+        """Test that records are written through the default hook."""
+        from ai_live_genie.records import GoalRecord, json_default
+        record = GoalRecord(1, "Grow", "More subscribers", "high", None, created_at=0.0)
+        for name in codec.CODECS:
+            data = codec.get_codec(name).loads(
+                codec.get_codec(name).dumps([record], default=json_default))
+            self.assertEqual(data, [record.to_dict()], name)
+            with self.assertRaises(TypeError):
+                codec.get_codec(name).dumps([object()], default=json_default)
+    
+    def test_unknown_codec(self):
+        """Test that unknown codec names are rejected."""
+        with self.assertRaises(ValueError):
+            codec.get_codec("yaml")
+        self.assertIn(codec.active_codec().name, codec.CODECS)
+    
+    def test_stores_write_compact_files(self):
+        """Test that stores save compact JSON and read it back."""
+        test_dir = "/tmp/test_codec_stores"
+        if os.path.exists(test_dir):
+            shutil.rmtree(test_dir)
+        try:
+            path = os.path.join(test_dir, "memory.json")
+            memory = LongTermMemory(path)
+            memory.store_fact("Streams on weekends", category="schedule")
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read().count(b"\n"), 0)
+            self.assertEqual(LongTermMemory(path).retrieve_facts()[0]["content"],
+                             "Streams on weekends")
+        finally:
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+
+class TestSegments(unittest.TestCase):
+    """Test the binary segment store format."""
+    
+    def setUp(self):
+        self.test_dir = "/tmp/test_segments"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+        self.path = os.path.join(self.test_dir, "memory.seg")
+    
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def document(self):
+        return {
+            "facts": [{"id": i, "content": f"Fact {i} ☕", "category": ["chat", "schedule"][i % 2],
+                       "timestamp": "2025-10-23T12:00:00", "hits": -i, "score": i / 3}
+                      for i in range(1, 8)],
+            "preferences": {"color": {"value": ["blue", None, True], "timestamp": "t"}},
+            "entities": {},
+            "_journal_seq": 2 ** 70,
+        }
+    
+    def test_random_access(self):
+        """Test lookups by id, category and key without decoding everything."""
+        document = self.document()
+        with open(self.path, 'wb') as f:
+            f.write(encode_segment(document))
+        with SegmentReader(self.path) as reader:
+            self.assertEqual(len(reader), 8)
+            self.assertEqual(reader.get("facts", 4), document["facts"][3])
+            self.assertIsNone(reader.get("facts", 99))
+            self.assertEqual([f["id"] for f in reader.by_category("facts", "chat")], [2, 4, 6])
+            self.assertEqual(list(reader.by_category("facts", "unknown")), [])
+            self.assertEqual(reader.lookup("preferences", "color"), document["preferences"]["color"])
+            self.assertIsNone(reader.lookup("entities", "color"))
+            self.assertEqual(reader.meta(), {"_journal_seq": 2 ** 70})
+            self.assertEqual(reader.to_dict(), document)
+            self.assertIn("schedule", reader.strings)
+    
+    def test_damaged_files(self):
+        """Test that empty, foreign and truncated files are rejected."""
+        data = encode_segment(self.document())
+        for content in (b"", b'{"facts": []}', data[:-4]):
+            with open(self.path, 'wb') as f:
+                f.write(content)
+            with self.assertRaises(SegmentError):
+                SegmentReader(self.path)
+    
+    def test_stores_in_segment_format(self):
+        """Test that the stores save segments and read either format."""
+        json_path = os.path.join(self.test_dir, "memory.json")
+        memory = LongTermMemory(json_path)
+        memory.store_fact("Streams on weekends", category="schedule")
+        memory.store_entity("main_channel", {"platform": "YouTube"})
+        
+        memory = LongTermMemory(json_path, file_format="segment")
+        self.assertEqual(memory.retrieve_facts()[0]["content"], "Streams on weekends")
+        memory.store_fact("Hello chat", category="chat")
+        self.assertTrue(is_segment(json_path))
+        memory = LongTermMemory(json_path, file_format="segment")
+        self.assertEqual(memory.category_counts(), {"schedule": 1, "chat": 1})
+        self.assertEqual(memory.retrieve_entity("main_channel"), {"platform": "YouTube"})
+        
+        memory = LongTermMemory(self.path, file_format="segment", journal=True)
+        memory.store_fact("Journaled fact")
+        memory.compact()
+        self.assertTrue(is_segment(self.path))
+        self.assertEqual(len(LongTermMemory(self.path).retrieve_facts()), 1)
+        
+        goals_path = os.path.join(self.test_dir, "goals.seg")
+        goals = GoalsManager(goals_path, file_format="segment")
+        goal = goals.add_goal("Reach 1000 subscribers", "Grow the channel", priority="high")
+        goals.add_milestone(goal["id"], "First 100")
+        self.assertTrue(is_segment(goals_path))
+        self.assertEqual(GoalsManager(goals_path).get_goal_by_id(goal["id"]),
+                         goals.get_goal_by_id(goal["id"]))
+        
+        with self.assertRaises(ValueError):
+            LongTermMemory(self.path, file_format="xml")
+        with self.assertRaises(ValueError):
+            MemoryManager(data_dir=self.test_dir, backend="sqlite", file_format="segment")
+    
+    def test_manager_switches_format_in_place(self):
+        """Test that a manager switched to segments keeps and converts existing JSON stores."""
+        manager = MemoryManager(data_dir=self.test_dir)
+        manager.long_term.store_fact("Streams on weekends")
+        manager.goals.add_goal("Reach 1000 subscribers", "Grow the channel")
+        manager.close()
+        
+        manager = MemoryManager(data_dir=self.test_dir, file_format="segment")
+        self.assertEqual(manager.long_term.retrieve_facts()[0]["content"], "Streams on weekends")
+        self.assertEqual(len(manager.goals.get_active_goals()), 1)
+        manager.long_term.store_fact("Hello chat")
+        manager.goals.add_goal("Go live daily", "Consistency")
+        manager.close()
+        json_path = os.path.join(self.test_dir, "long_term_memory.json")
+        self.assertTrue(is_segment(json_path))
+        self.assertTrue(is_segment(os.path.join(self.test_dir, "goals.json")))
+        
+        manager = MemoryManager(data_dir=self.test_dir, file_format="segment")
+        self.assertEqual(len(manager.long_term.retrieve_facts()), 2)
+        self.assertEqual(len(manager.goals.get_active_goals()), 2)
+        manager.close()
+    
+    def test_converters(self):
+        """Test conversion to and from JSON, including through the CLI."""
+        json_path = os.path.join(self.test_dir, "memory.json")
+        with open(json_path, 'w') as f:
+            json.dump(self.document(), f)
+        json_to_segment(json_path, self.path)
+        back_path = os.path.join(self.test_dir, "back.json")
+        segment_to_json(self.path, back_path)
+        with open(back_path) as f:
+            self.assertEqual(json.load(f), self.document())
+        
+        cli_path = os.path.join(self.test_dir, "cli.seg")
+        convert_store(argparse.Namespace(source=back_path, destination=cli_path, indent=False))
+        with open(cli_path, 'rb') as f:
+            self.assertEqual(f.read(len(MAGIC)), MAGIC)
+        convert_store(argparse.Namespace(source=cli_path, destination=back_path, indent=True))
+        with open(back_path) as f:
+            self.assertEqual(json.load(f), self.document())
+
+
+def _store_facts_in_process(path, prefix, count):
+    """Write facts from a separate process into a shared store."""
+    memory = LongTermMemory(path, shared=True)
+    for i in range(count):
+        memory.store_fact(f"{prefix} fact {i}", category=prefix)
+    memory.close()
+
+
+def _store_sharded_facts_in_process(root, prefix, count):
+    """Write facts across several categories from a separate process into a shared sharded store."""
+    memory = ShardedLongTermMemory(root, shared=True)
+    for i in range(count):
+        memory.store_fact(f"{prefix} fact {i}", category=f"c{i % 3}")
+    memory.close()
+
+
+class TestSharedStores(unittest.TestCase):
+    """Test stores shared by several instances and processes."""
+    
+    def setUp(self):
+        self.test_dir = "/tmp/test_shared_stores"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+        self.path = os.path.join(self.test_dir, "memory.json")
+    
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_writes_are_seen_by_other_instances(self):
+        """Test that each instance writes on top of the other's latest data."""
+        a = LongTermMemory(self.path, shared=True)
+        b = LongTermMemory(self.path, shared=True)
+        a.store_fact("From a", category="a")
+        self.assertEqual([f["content"] for f in b.retrieve_facts()], ["From a"])
+        b.store_fact("From b", category="b")
+        b.store_preference("color", "blue")
+        facts = a.retrieve_facts()
+        self.assertEqual([(f["id"], f["content"]) for f in facts], [(1, "From a"), (2, "From b")])
+        self.assertEqual(a.retrieve_preference("color"), "blue")
+        self.assertEqual(a.search_memory("from")[1]["data"]["content"], "From b")
+        a.close()
+        b.close()
+    
+    def test_reload_only_after_change(self):
+        """Test that reads skip reloading until another instance commits."""
+        a = LongTermMemory(self.path, shared=True)
+        b = LongTermMemory(self.path, shared=True)
+        reloads = []
+        reload = b._shared.reload
+        b._shared.reload = lambda: (reloads.append(1), reload())
+        b.retrieve_facts()
+        b.stats()
+        self.assertEqual(reloads, [])
+        a.store_fact("New fact")
+        b.retrieve_facts()
+        b.retrieve_facts()
+        self.assertEqual(len(reloads), 1)
+        b.store_fact("Own fact")
+        b.retrieve_facts()
+        self.assertEqual(len(reloads), 1)
+        a.close()
+        b.close()
+    
+    def test_shared_requires_sync_writes(self):
+        """Test that shared mode rejects journaling and deferred durability."""
+        with self.assertRaises(ValueError):
+            LongTermMemory(self.path, shared=True, journal=True)
+        with self.assertRaises(ValueError):
+            GoalsManager(os.path.join(self.test_dir, "goals.json"), shared=True,
+                         durability="deferred")
+    
+    def test_goals_are_shared(self):
+        """Test that goal ids and updates stay consistent across instances."""
+        goals_path = os.path.join(self.test_dir, "goals.json")
+        a = GoalsManager(goals_path, shared=True)
+        b = GoalsManager(goals_path, shared=True)
+        first = a.add_goal("Reach 1000 subscribers", "Grow the channel")
+        second = b.add_goal("Stream weekly", "Keep a schedule")
+        self.assertEqual((first["id"], second["id"]), (1, 2))
+        b.complete_goal(first["id"])
+        self.assertEqual([g["id"] for g in a.get_active_goals()], [2])
+        self.assertEqual([g["id"] for g in a.get_completed_goals()], [1])
+        a.close()
+        b.close()
+    
+    def test_sharded_manifest_is_shared(self):
+        """Test that categories and id blocks added by one instance reach the other."""
+        root = os.path.join(self.test_dir, "long_term")
+        a = ShardedLongTermMemory(root, shared=True)
+        b = ShardedLongTermMemory(root, shared=True)
+        a.store_fact("Streams on weekends", category="schedule")
+        b.store_fact("Hello chat", category="chat")
+        self.assertEqual(a.category_counts(), {"schedule": 1, "chat": 1})
+        b.store_fact("Streams at night", category="schedule")
+        ids = [fact["id"] for fact in a.retrieve_facts()]
+        self.assertEqual(len(set(ids)), 3)
+        a.close()
+        b.close()
+    
+    @unittest.skipIf(fcntl is None or "fork" not in multiprocessing.get_all_start_methods(),
+                     "needs fcntl and fork")
+    def test_concurrent_processes_lose_no_writes(self):
+        """Test that writers in separate processes never overwrite each other."""
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=_store_facts_in_process, args=(self.path, name, 20))
+                   for name in ("alpha", "beta", "gamma")]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+            self.assertEqual(worker.exitcode, 0)
+        memory = LongTermMemory(self.path, shared=True)
+        facts = memory.retrieve_facts()
+        self.assertEqual(len(facts), 60)
+        self.assertEqual(sorted(f["id"] for f in facts), list(range(1, 61)))
+        self.assertEqual(memory.category_counts(), {"alpha": 20, "beta": 20, "gamma": 20})
+        memory.close()
+    
+    @unittest.skipIf(fcntl is None or "fork" not in multiprocessing.get_all_start_methods(),
+                     "needs fcntl and fork")
+    def test_sharded_ids_ascend_across_processes(self):
+        """Test that pages and merges stay complete when several processes share shards."""
+        root = os.path.join(self.test_dir, "long_term")
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=_store_sharded_facts_in_process, args=(root, name, 30))
+                   for name in ("p0", "p1", "p2", "p3")]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=60)
+            self.assertEqual(worker.exitcode, 0)
+        memory = ShardedLongTermMemory(root, shared=True)
+        
+        def page_all(category=None):
+            ids, cursor = [], None
+            for _ in range(100):
+                page, cursor = memory.page_facts(category, limit=7, cursor=cursor)
+                ids.extend(fact["id"] for fact in page)
+                if cursor is None:
+                    break
+            return ids
+        
+        self.assertEqual(page_all(), list(range(1, 121)))
+        c0 = [fact["id"] for fact in memory.retrieve_facts(category="c0")]
+        self.assertEqual(len(c0), 40)
+        self.assertEqual(page_all("c0"), sorted(c0))
+        self.assertEqual([fact["id"] for fact in memory.iter_facts()], list(range(1, 121)))
+        self.assertEqual([fact["id"] for fact in memory.recent_facts(5)], list(range(116, 121)))
+        memory.close()
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """Test the reader-writer lock guarding the in-memory stores."""
+    
+    def test_readers_share_and_writers_exclude(self):
+        """Test that readers overlap while a writer waits for them."""
+        lock = ReadWriteLock()
+        events = []
+        lock.acquire_read()
+        reader = threading.Thread(target=lambda: (lock.acquire_read(), events.append("read"),
+                                                  lock.release_read()))
+        reader.start()
+        reader.join(timeout=2)
+        self.assertEqual(events, ["read"])
+        
+        writer = threading.Thread(target=lambda: (lock.acquire_write(), events.append("write"),
+                                                  lock.release_write()))
+        writer.start()
+        time.sleep(0.05)
+        self.assertEqual(events, ["read"])
+        lock.release_read()
+        writer.join(timeout=2)
+        self.assertEqual(events, ["read", "write"])
+    
+    def test_reentrancy(self):
+        """Test nested writes, reads under a write and the upgrade guard."""
+        lock = ReadWriteLock()
+        with lock.write_lock:
+            with lock.write_lock:
+                with lock.read_lock:
+                    pass
+        with lock.read_lock:
+            with lock.read_lock:
+                pass
+            with self.assertRaises(RuntimeError):
+                lock.acquire_write()
+        with lock.write_lock:
+            pass
 
 
 class TestStreamingPlatformData(unittest.TestCase):
@@ -246,6 +1927,15 @@ class TestMemoryManager(unittest.TestCase):
         self.assertEqual(history[0]["role"], "user")
         self.assertEqual(history[1]["role"], "assistant")
     
+    def test_conversation_log_survives_restart(self):
+        """Test that conversation_log=True restores each session's history."""
+        manager = MemoryManager(data_dir=self.test_dir, conversation_log=True)
+        manager.process_interaction("Hello", "Hi there!", session_id="viewer-7")
+        restarted = MemoryManager(data_dir=self.test_dir, conversation_log=True)
+        history = restarted.get_full_context("viewer-7")["conversation_history"]
+        self.assertEqual([m["content"] for m in history], ["Hello", "Hi there!"])
+        self.assertEqual(self.manager.conversational.session("viewer-7").get_history(), [])
+    
     def test_get_full_context(self):
         """Test getting full context."""
         self.manager.process_interaction("Test", "Response")
@@ -257,6 +1947,81 @@ class TestMemoryManager(unittest.TestCase):
         self.assertIn("recent_facts", context)
         self.assertIn("active_goals", context)
         self.assertIn("preferences", context)
+    
+    def test_stores_load_on_first_access(self):
+        """Test that each store is opened only when it is first used."""
+        self.assertEqual(self.manager._stores, {})
+        self.manager.goals.add_goal("Test goal", "Description")
+        self.assertEqual(list(self.manager._stores), ["goals"])
+        self.assertIs(self.manager.goals, self.manager.goals)
+        self.manager.close()
+    
+    def test_prefetch(self):
+        """Test that prefetch opens every store in the background."""
+        self.manager.long_term.store_fact("Prefetched fact")
+        self.manager.close()
+        manager = MemoryManager(data_dir=self.test_dir)
+        self.assertIs(manager.prefetch(), manager.prefetch())
+        manager.prefetch().join()
+        self.assertEqual(set(manager._stores), {"long_term", "goals"})
+        self.assertEqual(manager.long_term.retrieve_facts()[0]["content"], "Prefetched fact")
+        manager.close()
+    
+    def test_failed_prefetch_is_logged(self):
+        """Test that a store failing to open during prefetch is logged, not raised."""
+        def broken_goals():
+            raise OSError("goals unreadable")
+        self.manager._factories["goals"] = broken_goals
+        with self.assertLogs("ai_live_genie.memory_manager", level="ERROR") as logs:
+            self.manager.prefetch().join()
+        self.assertIn("Prefetching goals memory failed", logs.output[0])
+        self.assertEqual(list(self.manager._stores), ["long_term"])
+        with self.assertRaises(OSError):
+            self.manager.goals
+        self.manager.close()
+
+class TestExport(unittest.TestCase):
+    """Test streaming export of memory and goals."""
+    
+    def setUp(self):
+        self.test_dir = "/tmp/test_export"
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        self.manager = MemoryManager(data_dir=self.test_dir)
+        self.manager.long_term.store_fact("Fact one", category="a")
+        self.manager.long_term.store_fact("Fact two", category="b")
+        self.manager.long_term.store_entity("chan", {"subs": 1})
+        self.manager.goals.add_goal("Goal", "Description")
+    
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_export_records(self):
+        """Test the export generators."""
+        records = list(self.manager.long_term.export_records())
+        self.assertEqual([r["type"] for r in records], ["fact", "fact", "entity"])
+        self.assertEqual([f["content"] for f in self.manager.long_term.iter_facts("b")], ["Fact two"])
+        goals = list(self.manager.goals.export_records())
+        self.assertEqual(goals[0]["data"]["title"], "Goal")
+    
+    def test_sqlite_export_records(self):
+        """Test the SQLite export generators across batch boundaries."""
+        memory = SQLiteLongTermMemory(os.path.join(self.test_dir, "memory.db"))
+        memory.store_facts_bulk([f"Fact {i}" for i in range(1201)])
+        memory.store_preference("theme", "dark")
+        records = list(memory.export_records())
+        self.assertEqual(len(records), 1202)
+        self.assertEqual(records[1200]["data"]["content"], "Fact 1200")
+        memory.close()
+    
+    def test_cli_export(self):
+        """Test the CLI export command writes NDJSON to a file."""
+        output = os.path.join(self.test_dir, "export.ndjson")
+        export_data(argparse.Namespace(what="all", output=output, data_dir=self.test_dir))
+        with open(output) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r["type"] for r in records], ["fact", "fact", "entity", "goal"])
 
 
 def run_tests():
@@ -267,10 +2032,26 @@ def run_tests():
     
     # Add all test classes
     suite.addTests(loader.loadTestsFromTestCase(TestConversationalMemory))
+    suite.addTests(loader.loadTestsFromTestCase(TestRingBuffer))
+    suite.addTests(loader.loadTestsFromTestCase(TestConversationSessions))
+    suite.addTests(loader.loadTestsFromTestCase(TestConversationLog))
     suite.addTests(loader.loadTestsFromTestCase(TestLongTermMemory))
+    suite.addTests(loader.loadTestsFromTestCase(TestLongTermMemoryJournal))
+    suite.addTests(loader.loadTestsFromTestCase(TestTokenIndex))
+    suite.addTests(loader.loadTestsFromTestCase(TestNameIndex))
+    suite.addTests(loader.loadTestsFromTestCase(TestVectorSearch))
+    suite.addTests(loader.loadTestsFromTestCase(TestDeferredDurability))
     suite.addTests(loader.loadTestsFromTestCase(TestGoalsManager))
+    suite.addTests(loader.loadTestsFromTestCase(TestSQLiteBackend))
+    suite.addTests(loader.loadTestsFromTestCase(TestShardedBackend))
+    suite.addTests(loader.loadTestsFromTestCase(TestTenantPool))
+    suite.addTests(loader.loadTestsFromTestCase(TestReadWriteLock))
+    suite.addTests(loader.loadTestsFromTestCase(TestSharedStores))
+    suite.addTests(loader.loadTestsFromTestCase(TestCodec))
+    suite.addTests(loader.loadTestsFromTestCase(TestSegments))
     suite.addTests(loader.loadTestsFromTestCase(TestStreamingPlatformData))
     suite.addTests(loader.loadTestsFromTestCase(TestMemoryManager))
+    suite.addTests(loader.loadTestsFromTestCase(TestExport))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)